@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Import time benchmark
+
+Module measures the cold start of the command-line interface, i.e. the wall
+time of `dsx --help` in a fresh interpreter and the cumulative import time of
+the package as reported by `python -X importtime`.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from pathlib import Path
+
+from benchmarks import run
+
+COMMANDS = {
+    'interpreter': ['-c', 'pass'],
+    'help': ['-m', 'datasets18xx.cli', '--help'],
+    'download_db_help': ['-m', 'datasets18xx.cli', 'download-db', '--help']
+}
+"""The measured commands, as arguments to the interpreter."""
+
+HEAVY_MODULES = ('pandas', 'pyarrow', 'requests', 'tqdm', 'transcripts18xx')
+"""Modules which must not be imported on startup."""
+
+
+def wall_time(args: list[str], repeat: int) -> float:
+    """Measure the median wall time of a command in a fresh interpreter.
+
+    Args:
+        args: The arguments to the interpreter.
+        repeat: The number of runs.
+
+    Returns:
+        The median wall time in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, capture_output=True, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(times), 1)
+
+
+def import_time(module: str) -> tuple[float, list[str]]:
+    """Measure the cumulative import time of a module.
+
+    Args:
+        module: The module to import.
+
+    Returns:
+        The import time in milliseconds and the heavy modules imported.
+    """
+    ret = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True
+    )
+    cumulative, heavy = 0, set()
+    for line in ret.stderr.splitlines():
+        parts = [p.strip() for p in line.split('|')]
+        if len(parts) != 3 or not parts[1].isdigit():
+            continue
+        cum, name = parts[1:]
+        if name == module:
+            cumulative = int(cum)
+        if name.split('.')[0] in HEAVY_MODULES:
+            heavy.add(name.split('.')[0])
+    return round(cumulative / 1000, 1), sorted(heavy)
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Benchmark import time')
+    parser.add_argument('-r', '--repeat', type=int, default=10)
+    parser.add_argument('-o', '--out', type=Path, default=run.RESULTS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_arguments()
+    cumulative, heavy = import_time('datasets18xx.cli')
+    report = {
+        'commit': run._commit(),
+        'import_ms': cumulative,
+        'heavy_modules': heavy,
+        'wall_ms': {
+            name: wall_time(cmd, args.repeat) for name, cmd in COMMANDS.items()
+        }
+    }
+    print(json.dumps(report, indent=2))
+    args.out.mkdir(parents=True, exist_ok=True)
+    file = args.out.joinpath(f'import_time-{report["commit"]}.json')
+    file.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Benchmark suite
+
+Module runs the stages of the dataset build pipeline on synthetic databases
+and writes throughput, peak RSS and timings per stage to a JSON report. Each
+stage runs in a fresh process, such that its peak RSS is not biased by the
+previous stages. Reports of several commits can be compared with `--compare`.
+"""
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+from benchmarks import synthetic
+
+SIZES = (1000, 10000, 100000)
+"""The default number of games of the synthetic databases."""
+
+STAGES = ('make', 'context', 'inspect', 'subset', 'load')
+"""The benchmarked stages, in order of execution."""
+
+NUM_LOADS = 100
+"""The number of transcript contexts loaded in the `load` stage."""
+
+RESULTS = Path(__file__).parent.joinpath('results')
+"""The default folder of the reports."""
+
+
+def _dataset(db: Path):
+    # The default dataset of the synthetic database.
+    from datasets18xx import Dataset18xx, DefaultDatasetConfig
+    from datasets18xx.core.dataset import trx
+    return Dataset18xx(db, trx.Games.G1830, DefaultDatasetConfig())
+
+
+def _run_stage(stage: str, db: Path) -> int:
+    # Run a stage and return the number of items processed.
+    from datasets18xx import DatasetConfig
+    from datasets18xx.core.context_manager import ContextManager
+    ds = _dataset(db)
+    if stage == 'make':
+        return len(ds.make(force=True))
+    if stage == 'context':
+        ctx_manager = ContextManager(ds.root.joinpath('context.parquet'))
+        return len(ctx_manager.get_context())
+    if stage == 'inspect':
+        return ds.inspect()['size']
+    if stage == 'subset':
+        return len(ds.subset(DatasetConfig(num_players={4})).context())
+    if stage == 'load':
+        game_ids = ds.context(valid_only=True).game_id.head(NUM_LOADS)
+        for game_id in game_ids:
+            ds.load(int(game_id))
+        return len(game_ids)
+    raise ValueError(f'Unknown stage: {stage}')
+
+
+def _peak_rss_mb(who: int) -> float:
+    # Peak resident set size, reported in KiB on Linux.
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+def measure(stage: str, db: Path) -> dict:
+    """Measure a stage, to be invoked in a fresh process.
+
+    Args:
+        stage: The stage to run, see `STAGES`.
+        db: The synthetic database.
+
+    Returns:
+        The timing, throughput and peak RSS of the stage.
+    """
+    start = time.perf_counter()
+    items = _run_stage(stage, db)
+    seconds = time.perf_counter() - start
+    return {
+        'seconds': round(seconds, 3),
+        'items': items,
+        'throughput': round(items / seconds, 1) if seconds else None,
+        'peak_rss_mb': _peak_rss_mb(resource.RUSAGE_SELF),
+        'peak_children_rss_mb': _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    }
+
+
+def benchmark(num_games: int, stages: tuple[str] = STAGES,
+              seed: int = 0) -> dict:
+    """Benchmark the stages on a synthetic database.
+
+    Args:
+        num_games: The number of games of the synthetic database.
+        stages: The stages to run, `make` is required by all others.
+        seed: The seed of the synthetic database.
+
+    Returns:
+        The measurements per stage.
+    """
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp)
+        start = time.perf_counter()
+        synthetic.generate(db, num_games, seed=seed)
+        report['generate'] = {'seconds': round(time.perf_counter() - start, 3)}
+        for stage in stages:
+            with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as ex:
+                report[stage] = ex.submit(measure, stage, db).result()
+            print(f'{num_games:>7} {stage:<8} {report[stage]}')
+    return report
+
+
+def _commit() -> str:
+    # The commit of the benchmarked tree, if available.
+    ret = subprocess.run(
+        ['git', 'rev-parse', '--short', 'HEAD'],
+        capture_output=True, text=True, check=False
+    )
+    return ret.stdout.strip() or 'unknown'
+
+
+def compare(report: dict, previous: dict) -> None:
+    """Print the relative change of the timings to a previous report.
+
+    Args:
+        report: The current report.
+        previous: The previous report.
+    """
+    for size, stages in report['results'].items():
+        for stage, res in stages.items():
+            prev = previous['results'].get(size, {}).get(stage)
+            if not prev or not prev.get('seconds'):
+                continue
+            change = res['seconds'] / prev['seconds'] - 1
+            print(f'{size:>7} {stage:<8} {change:+.1%}')
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Run benchmarks')
+    parser.add_argument(
+        '-n', '--num_games', type=int, nargs='+', default=list(SIZES),
+        help='Number(s) of games of the synthetic databases'
+    )
+    parser.add_argument(
+        '-s', '--stages', nargs='+', choices=STAGES, default=list(STAGES),
+        help='Stages to run, make is required by all others'
+    )
+    parser.add_argument(
+        '-o', '--out', type=Path, default=RESULTS, help='Folder of the report'
+    )
+    parser.add_argument(
+        '-c', '--compare', type=Path, default=None,
+        help='Previous report to compare with'
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_arguments()
+    stages = ['make'] + [s for s in args.stages if s != 'make']
+    report = {
+        'commit': _commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': {
+            str(n): benchmark(n, tuple(stages)) for n in args.num_games
+        }
+    }
+    args.out.mkdir(parents=True, exist_ok=True)
+    file = args.out.joinpath(f'{report["commit"]}.json')
+    file.write_text(json.dumps(report, indent=2))
+    print(f'Report written to {file}')
+    if args.compare is not None:
+        compare(report, json.loads(args.compare.read_text()))
+
+
+if __name__ == '__main__':
+    main()
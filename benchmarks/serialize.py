@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Serialization benchmark
+
+Module measures the serialization of transcript contexts into the frame of a
+context batch, comparing the generic `io.serialize` per context with the
+schema-aware `io.serialize_records` of a whole batch. The contexts are
+synthetic, mirroring the fields of `TranscriptContext`, such that the parser
+is not required.
+"""
+import argparse
+import enum
+import json
+import random
+import statistics
+import time
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks import run
+from datasets18xx.io import io
+
+
+class _Ending(str, enum.Enum):
+    BankBroke = 'BankBroke'
+    PlayerGoesBankrupt = 'PlayerGoesBankrupt'
+
+
+@dataclass
+class _Context:
+    raw: Path
+    game_id: int
+    valid: bool
+    num_players: int
+    game_ending: _Ending
+    parse_result: str
+    verification_result: bool
+    unprocessed_lines: list[str] = field(default_factory=list)
+
+
+def contexts(n: int, seed: int = 0) -> list[_Context]:
+    """Create synthetic transcript contexts.
+
+    Args:
+        n: The number of contexts.
+        seed: The seed of the random generator.
+
+    Returns:
+        The contexts, every tenth with unprocessed lines.
+    """
+    rng = random.Random(seed)
+    result = []
+    for i in range(n):
+        game_id = 1000000 + i
+        lines = []
+        if i % 10 == 0:
+            lines = [
+                f'player{rng.randint(1, 6)} // comment {j}' for j in range(5)
+            ]
+        result.append(_Context(
+            raw=Path('1830', f'1830_{game_id}', f'1830_{game_id}.txt'),
+            game_id=game_id,
+            valid=rng.random() > .3,
+            num_players=rng.randint(2, 6),
+            game_ending=rng.choice(list(_Ending)),
+            parse_result='SUCCESS',
+            verification_result=rng.random() > .2,
+            unprocessed_lines=lines
+        ))
+    return result
+
+
+def generic(batch: list[_Context]) -> pd.DataFrame:
+    """Serialize a batch as before, one context at a time.
+
+    Args:
+        batch: The contexts.
+
+    Returns:
+        The frame of the batch.
+    """
+    return pd.DataFrame([io.serialize(ctx.__dict__) for ctx in batch])
+
+
+def columnar(batch: list[_Context]) -> pd.DataFrame:
+    """Serialize a batch into columns with the known path fields.
+
+    Args:
+        batch: The contexts.
+
+    Returns:
+        The frame of the batch.
+    """
+    return pd.DataFrame(io.serialize_records(batch))
+
+
+def measure(fn, batch: list[_Context], repeat: int) -> float:
+    """Measure the median wall time of a serializer.
+
+    Args:
+        fn: The serializer.
+        batch: The contexts.
+        repeat: The number of runs.
+
+    Returns:
+        The median wall time in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(batch)
+        times.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(times), 1)
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Benchmark serialization')
+    parser.add_argument('-n', '--num_contexts', type=int, default=100000)
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('-o', '--out', type=Path, default=run.RESULTS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_arguments()
+    batch = contexts(args.num_contexts)
+    report = {
+        'commit': run._commit(),
+        'num_contexts': args.num_contexts,
+        'wall_ms': {
+            'serialize': measure(generic, batch, args.repeat),
+            'serialize_records': measure(columnar, batch, args.repeat)
+        }
+    }
+    wall = report['wall_ms']
+    report['speedup'] = round(wall['serialize'] / wall['serialize_records'], 2)
+    print(json.dumps(report, indent=2))
+    args.out.mkdir(parents=True, exist_ok=True)
+    file = args.out.joinpath(f'serialize-{report["commit"]}.json')
+    file.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
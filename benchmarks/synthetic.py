@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Synthetic database
+
+Module implements a generator for synthetic databases. The raw transcripts of
+the test resources are cloned with new game ids and perturbed player names,
+such that databases of arbitrary size can be processed.
+"""
+import argparse
+import random
+import re
+
+from pathlib import Path
+
+from datasets18xx.io import io, local
+
+FIXTURE = Path(__file__).parents[1].joinpath('tests', 'resources')
+"""The database of the test resources to clone from."""
+
+FIRST_ID = 1_000_000
+"""The first game id of the synthetic transcripts."""
+
+
+def _players(record: Path) -> list[str]:
+    # The player names of a record as mapped in its metadata.
+    metadata = record.joinpath(f'{record.name}_metadata.json')
+    if not metadata.exists():
+        return []
+    return list(io.read_json(metadata).get('mapping', {}))
+
+
+def _sources(game: str) -> list[tuple[str, list[str]]]:
+    # The raw transcripts of the fixture with their player names.
+    sources = []
+    for raw in local.find_raw_transcripts(FIXTURE.joinpath(game)):
+        sources.append((raw.read_text(encoding='utf-8'), _players(raw.parent)))
+    return sources
+
+
+def _perturb(text: str, players: list[str], rng: random.Random) -> str:
+    # Rename the players consistently throughout the transcript.
+    if not players:
+        return text
+    suffix = rng.randrange(1 << 16)
+    names = {p: f'{p}{suffix:x}' for p in players}
+    pattern = re.compile(
+        r'\b(' + '|'.join(re.escape(p) for p in names) + r')\b'
+    )
+    return pattern.sub(lambda m: names[m.group(1)], text)
+
+
+def generate(out: Path, num_games: int, game: str = '1830',
+             seed: int = 0) -> list[Path]:
+    """Generate a synthetic database.
+
+    Args:
+        out: The folder of the synthetic database.
+        num_games: The number of raw transcripts to generate.
+        game: The game variant of the fixture to clone from.
+        seed: The seed of the random perturbations.
+
+    Returns:
+        The raw transcripts of the synthetic database.
+    """
+    rng = random.Random(seed)
+    sources = _sources(game)
+    files = []
+    for i in range(num_games):
+        text, players = rng.choice(sources)
+        file = local.raw_file(out.joinpath(game), game, FIRST_ID + i)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(_perturb(text, players, rng), encoding='utf-8')
+        files.append(file)
+    return files
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Generate synthetic database')
+    parser.add_argument('out', type=Path, help='Synthetic database folder')
+    parser.add_argument('-n', '--num_games', type=int, default=1000)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    generate(args.out, args.num_games, seed=args.seed)
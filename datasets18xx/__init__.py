@@ -1,15 +1,34 @@
-from .core.config import GameEnding, DatasetConfig, DefaultDatasetConfig
-from .core.dataset import Dataset18xx
-from .io.database import default_database, database
-from .pipeline import make_dataset, make_config
-
-__all__ = [
-    "GameEnding",
-    "DatasetConfig",
-    "DefaultDatasetConfig",
-    "Dataset18xx",
-    "default_database",
-    "database",
-    "make_config",
-    "make_dataset"
-]
+"""datasets18xx
+
+The public names are imported lazily on first access, such that importing the
+package, e.g. for the command-line interface, does not import the parser,
+pandas and further heavy dependencies.
+"""
+import importlib
+
+_LAZY = {
+    "GameEnding": ".core.config",
+    "DatasetConfig": ".core.config",
+    "DefaultDatasetConfig": ".core.config",
+    "Dataset18xx": ".core.dataset",
+    "CacheConfig": ".core.cache",
+    "StreamingLoader": ".core.loader",
+    "default_database": ".io.database",
+    "database": ".io.database",
+    "make_config": ".pipeline",
+    "make_dataset": ".pipeline"
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(list(globals()) + __all__)
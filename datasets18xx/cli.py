@@ -10,10 +10,28 @@ import json
 from pathlib import Path
 
 import click
-import transcripts18xx as trx
 
-from .io import io, database
-from . import pipeline
+from .core.config import GameEnding
+from .io import io
+
+
+class GameChoice(click.ParamType):
+    """GameChoice
+
+    Class implements the choice of a game variant by its name, e.g. `G1830`.
+    The parser is imported on conversion only, hence not for `--help` or
+    commands not requiring it.
+    """
+    name = 'game'
+
+    def convert(self, value, param, ctx):
+        import transcripts18xx as trx
+        if isinstance(value, trx.Games):
+            return value
+        try:
+            return trx.Games[value]
+        except KeyError:
+            self.fail(f'Unknown game variant: {value}', param, ctx)
 
 
 @click.group()
@@ -24,8 +42,8 @@ def app():
 @app.command()
 @click.option(
     '-g', '--game',
-    type=click.Choice(trx.Games),
-    default=trx.Games.G1830,
+    type=GameChoice(),
+    default='G1830',
     help='Game variant (e.g., -g G1830)'
 )
 @click.option(
@@ -38,7 +56,7 @@ def app():
 @click.option(
     '-e', '--game_ending',
     multiple=True,
-    type=click.Choice(pipeline.GameEnding),
+    type=click.Choice(GameEnding),
     default=None,
     help='Type(s) of game endings (e.g., -e BankBroke), defaults to None'
 )
@@ -46,14 +64,40 @@ def app():
     '-f', '--force',
     is_flag=True,
     default=False,
-    help='Force re-processing of valid transcripts, default to False'
+    help='Force re-processing of all transcripts, default to False'
 )
-def make(game, num_players, game_ending, force):
+@click.option(
+    '-c', '--columnar',
+    is_flag=True,
+    default=False,
+    help='Convert results to Parquet for faster loading, default to False'
+)
+@click.option(
+    '-p', '--profile',
+    type=click.Path(path_type=Path),
+    default=None,
+    help='Write stage timings and counters to a JSON file, defaults to None'
+)
+@click.option(
+    '--cprofile',
+    type=click.Path(file_okay=False, path_type=Path),
+    default=None,
+    help='Dump cProfile statistics per worker to a folder, defaults to None'
+)
+def make(game, num_players, game_ending, force, columnar, profile, cprofile):
     """Process a dataset."""
+    from . import pipeline
+    from .utils import profiling
     try:
         conf = pipeline.make_config(num_players, game_ending)
         ds = pipeline.make_dataset(game, conf)
-        ctx = ds.make(force=force)
+        if profile is None and cprofile is None:
+            ctx = ds.make(force=force, to_columnar=columnar)
+        else:
+            with profiling.profile(cprofile) as profiler:
+                ctx = ds.make(force=force, to_columnar=columnar)
+            if profile is not None:
+                io.write_json(profile, profiler.report())
         click.echo(ctx.head())
     except IOError as exc:
         print(exc)
@@ -64,8 +108,8 @@ def make(game, num_players, game_ending, force):
 @app.command()
 @click.option(
     '-g', '--game',
-    type=click.Choice(trx.Games),
-    default=trx.Games.G1830,
+    type=GameChoice(),
+    default='G1830',
     help='Game variant (e.g., -g G1830)'
 )
 @click.option(
@@ -78,17 +122,27 @@ def make(game, num_players, game_ending, force):
 @click.option(
     '-e', '--game_ending',
     multiple=True,
-    type=click.Choice(pipeline.GameEnding),
+    type=click.Choice(GameEnding),
     default=None,
     help='Type(s) of game endings (e.g., -e BankBroke), defaults to None'
 )
-def inspect(game, num_players, game_ending):
+@click.option(
+    '-c', '--csv',
+    is_flag=True,
+    default=False,
+    help='Export the context to context.csv, default to False'
+)
+def inspect(game, num_players, game_ending, csv):
     """Inspect a dataset."""
+    from . import pipeline
     try:
         conf = pipeline.make_config(num_players, game_ending)
         ds = pipeline.make_dataset(game, conf)
         snapshot = ds.inspect()
         click.echo(json.dumps(snapshot, indent=2))
+        if csv:
+            file = ds.export_context()
+            click.echo(f'Exported context to {io.unix_path(file)}')
     except IOError as exc:
         print(exc)
     except KeyboardInterrupt:
@@ -98,8 +152,8 @@ def inspect(game, num_players, game_ending):
 @app.command()
 @click.option(
     '-g', '--game',
-    type=click.Choice(trx.Games),
-    default=trx.Games.G1830,
+    type=GameChoice(),
+    default='G1830',
     help='Game variant (e.g., -g G1830)'
 )
 @click.option(
@@ -112,18 +166,31 @@ def inspect(game, num_players, game_ending):
 @click.option(
     '-e', '--game_ending',
     multiple=True,
-    type=click.Choice(pipeline.GameEnding),
+    type=click.Choice(GameEnding),
     default=None,
     help='Type(s) of game endings (e.g., -e BankBroke), defaults to None'
 )
-def subset(game, num_players, game_ending):
+@click.option(
+    '-m', '--materialize',
+    type=click.Choice(['link', 'copy']),
+    default=None,
+    help='Materialize records as hardlinks or copies, defaults to None'
+)
+@click.option(
+    '-f', '--filters',
+    default=None,
+    help='Further filters joined by underscores (e.g., -f '
+         'id179000-179500_score3000-_actions-2000_verified), defaults to None'
+)
+def subset(game, num_players, game_ending, materialize, filters):
     """Create subset of default dataset."""
+    from . import pipeline
     try:
         ds = pipeline.make_dataset(game, pipeline.DefaultDatasetConfig())
-        conf = pipeline.make_config(num_players, game_ending)
-        new_ds = ds.subset(conf)
+        conf = pipeline.make_config(num_players, game_ending, filters)
+        new_ds = ds.subset(conf, materialize=materialize)
         click.echo(json.dumps(new_ds.inspect(), indent=2))
-    except IOError as exc:
+    except (IOError, ValueError) as exc:
         print(exc)
     except KeyboardInterrupt:
         print('Interrupted by user')
@@ -132,8 +199,7 @@ def subset(game, num_players, game_ending):
 @app.command()
 @click.option(
     '-g', '--game',
-    type=click.Choice(trx.Games),
-    default=trx.Games.G1830,
+    default='G1830',
     help='Game variant (e.g., -g G1830)'
 )
 @click.option(
@@ -146,25 +212,264 @@ def subset(game, num_players, game_ending):
 @click.option(
     '-e', '--game_ending',
     multiple=True,
-    type=click.Choice(pipeline.GameEnding),
+    type=click.Choice(GameEnding),
     default=None,
     help='Type(s) of game endings (e.g., -e BankBroke), defaults to None'
 )
 @click.option(
     '-i', '--game_id',
+    multiple=True,
+    type=int,
+    default=None,
+    help='Game ID(s) to load processed data (e.g., -i 123456 -i 123457)'
+)
+@click.option(
+    '--ids_file',
+    type=click.File('r'),
+    default=None,
+    help='File with one game ID per line to load, defaults to None'
+)
+@click.option(
+    '-c', '--columns',
+    multiple=True,
+    default=None,
+    help='Column(s) of the final states to load for several games'
+)
+@click.option(
+    '-o', '--out',
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help='Write final states of several games to .csv or .parquet'
+)
+@click.option(
+    '-s', '--server',
+    envvar='DSX_SERVER',
+    default=None,
+    help='URL of a dataset server, see serve, defaults to None'
+)
+def load(game, num_players, game_ending, game_id, ids_file, columns, out,
+         server):
+    """Load a processed data snippet of the dataset.
+
+    A single game id prints the context and the head of the final state.
+    Several game ids load the final states at once into one table.
+    """
+    game_ids = list(game_id) + _read_ids(ids_file)
+    if server is not None:
+        _load_from_server(server, game, num_players, game_ending, game_ids)
+        return
+    from . import pipeline
+    game = GameChoice().convert(game, None, click.get_current_context())
+    try:
+        conf = pipeline.make_config(num_players, game_ending)
+        ds = pipeline.make_dataset(game, conf)
+        if len(game_ids) == 1 and out is None:
+            ctx = ds.load(game_ids[0])
+            ctx_d = io.serialize_record(ctx)
+            click.echo(json.dumps(ctx_d, indent=2))
+            click.echo(ctx.result().head())
+            return
+        df = ds.load_many(game_ids, columns=list(columns) or None, concat=True)
+        if out is None:
+            click.echo(df)
+        elif out.suffix == '.parquet':
+            df.to_parquet(out, index=False)
+        else:
+            df.to_csv(out, index=False)
+    except (IOError, ValueError) as exc:
+        print(exc)
+    except KeyboardInterrupt:
+        print('Interrupted by user')
+
+
+def _read_ids(ids_file) -> list[int]:
+    # Read game ids, one per line, ignoring blank lines and comments.
+    if ids_file is None:
+        return []
+    lines = (line.split('#')[0].strip() for line in ids_file)
+    return [int(line) for line in lines if line]
+
+
+def _load_from_server(server, game, num_players, game_ending, game_ids):
+    # Query a dataset server, without importing the dataset modules.
+    from .client import Client
+    try:
+        with Client(server) as client:
+            for game_id in game_ids:
+                res = client.load(
+                    game_id, game, num_players, game_ending, rows=5
+                )
+                click.echo(json.dumps(res['context'], indent=2))
+                click.echo(json.dumps(res['result']))
+    except (IOError, ValueError) as exc:
+        print(exc)
+    except KeyboardInterrupt:
+        print('Interrupted by user')
+
+
+@app.command()
+@click.option(
+    '--host',
+    default='127.0.0.1',
+    help='Host to listen on, defaults to 127.0.0.1'
+)
+@click.option(
+    '-p', '--port',
+    type=int,
+    default=8018,
+    help='Port to listen on, defaults to 8018'
+)
+@click.option(
+    '-s', '--socket',
+    'socket_path',
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help='Unix socket to listen on instead of the port, defaults to None'
+)
+def serve(host, port, socket_path):
+    """Serve the datasets from memory for fast queries."""
+    from . import server
+    from .io import database
+    where = io.unix_path(socket_path) if socket_path else f'{host}:{port}'
+    try:
+        print(f'Serving {io.unix_path(database.database())} on {where}')
+        server.serve(host=host, port=port, socket_path=socket_path)
+    except IOError as exc:
+        print(exc)
+    except KeyboardInterrupt:
+        print('Interrupted by user')
+
+
+@app.command()
+@click.option(
+    '-g', '--game',
+    type=GameChoice(),
+    default='G1830',
+    help='Game variant (e.g., -g G1830)'
+)
+@click.option(
+    '-n', '--num_players',
+    multiple=True,
+    type=int,
+    default=None,
+    help='Number(s) of players (e.g., -n 3 -4), defaults to None'
+)
+@click.option(
+    '-e', '--game_ending',
+    multiple=True,
+    type=click.Choice(GameEnding),
+    default=None,
+    help='Type(s) of game endings (e.g., -e BankBroke), defaults to None'
+)
+def pack(game, num_players, game_ending):
+    """Pack the processed results of a dataset into one file."""
+    from . import pipeline
+    try:
+        conf = pipeline.make_config(num_players, game_ending)
+        ds = pipeline.make_dataset(game, conf)
+        click.echo(f'Packed results to {io.unix_path(ds.pack())}')
+    except IOError as exc:
+        print(exc)
+    except KeyboardInterrupt:
+        print('Interrupted by user')
+
+
+@app.command()
+@click.option(
+    '-g', '--game',
+    type=GameChoice(),
+    default='G1830',
+    help='Game variant (e.g., -g G1830)'
+)
+@click.option(
+    '-n', '--num_players',
+    multiple=True,
     type=int,
     default=None,
-    help='Game ID to load processed data (e.g., 123456)'
+    help='Number(s) of players (e.g., -n 3 -4), defaults to None'
+)
+@click.option(
+    '-e', '--game_ending',
+    multiple=True,
+    type=click.Choice(GameEnding),
+    default=None,
+    help='Type(s) of game endings (e.g., -e BankBroke), defaults to None'
 )
-def load(game, num_players, game_ending, game_id):
-    """Load a processed data snippet of the dataset."""
+def export_tensors(game, num_players, game_ending):
+    """Export the processed results of a dataset to NumPy arrays."""
+    from . import pipeline
     try:
         conf = pipeline.make_config(num_players, game_ending)
         ds = pipeline.make_dataset(game, conf)
-        ctx = ds.load(game_id)
-        ctx_d = io.serialize(ctx.__dict__)
-        click.echo(json.dumps(ctx_d, indent=2))
-        click.echo(ctx.result().head())
+        path = ds.export_tensors()
+        click.echo(f'Exported tensors to {io.unix_path(path)}')
+    except IOError as exc:
+        print(exc)
+    except KeyboardInterrupt:
+        print('Interrupted by user')
+
+
+@app.command()
+@click.option(
+    '-g', '--game',
+    type=GameChoice(),
+    default='G1830',
+    help='Game variant (e.g., -g G1830)'
+)
+@click.option(
+    '-n', '--num_players',
+    multiple=True,
+    type=int,
+    default=None,
+    help='Number(s) of players (e.g., -n 3 -4), defaults to None'
+)
+@click.option(
+    '-e', '--game_ending',
+    multiple=True,
+    type=click.Choice(GameEnding),
+    default=None,
+    help='Type(s) of game endings (e.g., -e BankBroke), defaults to None'
+)
+@click.option(
+    '-c', '--columns',
+    multiple=True,
+    required=True,
+    help='Column(s) to aggregate (e.g., -c winner_cash -c PRR_share_price)'
+)
+@click.option(
+    '-b', '--by',
+    multiple=True,
+    default=None,
+    help='Column(s) of the final states or context to group by'
+)
+@click.option(
+    '-r', '--rows',
+    type=click.Choice(['all', 'last']),
+    default='all',
+    help='Rows of each game to aggregate, last for the final state'
+)
+@click.option(
+    '-o', '--out',
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help='Write the statistics to .csv or .parquet'
+)
+def stats(game, num_players, game_ending, columns, by, rows, out):
+    """Compute group-by statistics across the games of a dataset.
+
+    Partials per game are cached, repeated queries only read changed games.
+    """
+    from . import pipeline
+    try:
+        conf = pipeline.make_config(num_players, game_ending)
+        ds = pipeline.make_dataset(game, conf)
+        df = ds.aggregate(list(columns), by=list(by), rows=rows)
+        if out is None:
+            click.echo(df.to_string(index=False))
+        elif out.suffix == '.parquet':
+            df.to_parquet(out, index=False)
+        else:
+            df.to_csv(out, index=False)
     except (IOError, ValueError) as exc:
         print(exc)
     except KeyboardInterrupt:
@@ -172,14 +477,88 @@ def load(game, num_players, game_ending, game_id):
 
 
 @app.command()
-def download_db(out_dir: Path):
+@click.option(
+    '-s', '--sha256',
+    default=None,
+    help='Expected SHA-256 checksum of the tarball, defaults to None'
+)
+@click.option(
+    '--stream',
+    is_flag=True,
+    default=False,
+    help='Extract while downloading without storing the tarball'
+)
+@click.option(
+    '-g', '--game',
+    multiple=True,
+    type=GameChoice(),
+    default=None,
+    help='Game variant(s) to extract (e.g., -g G1830), defaults to None'
+)
+@click.option(
+    '-i', '--game_id',
+    multiple=True,
+    type=int,
+    default=None,
+    help='Game id(s) to extract (e.g., -i 123 -i 456), defaults to None'
+)
+def download_db(sha256, stream, game, game_id):
     """Download the database to the local disk."""
+    from .io import database
     url = database.create_url()
-    print(f'Downloading {url}')
-    request = database.download(url)
-    print(f'Extracting database to {io.unix_path(out_dir)}')
-    database.extract(request, database.database())
-    print('All done, Captain!')
+    out = database.database()
+    out.mkdir(parents=True, exist_ok=True)
+    games = {g.game() for g in game} or None
+    game_ids = set(game_id) or None
+    try:
+        if stream:
+            print(f'Downloading and extracting {url} to {io.unix_path(out)}')
+            count = database.stream_extract(
+                url, out, sha256, games=games, game_ids=game_ids
+            )
+        else:
+            print(f'Downloading {url}')
+            archive = database.download(
+                url, out.joinpath('database.tar.gz'), sha256
+            )
+            print(f'Extracting database to {io.unix_path(out)}')
+            count = database.extract(
+                archive, out, games=games, game_ids=game_ids
+            )
+            archive.unlink()
+        print(f'Extracted {count} files')
+        print('All done, Captain!')
+    except IOError as exc:
+        print(exc)
+    except KeyboardInterrupt:
+        print('Interrupted by user')
+
+
+@app.command()
+@click.option(
+    '-m', '--manifest',
+    default=None,
+    help='URL of the database manifest, defaults to records18xx'
+)
+@click.option(
+    '-f', '--files_url',
+    default=None,
+    help='URL of the database folder to download transcripts one by one'
+)
+def update_db(manifest, files_url):
+    """Update new or changed transcripts of the database only."""
+    from .io import database
+    url = manifest or database.create_manifest_url()
+    out = database.database()
+    try:
+        print(f'Comparing {url} with {io.unix_path(out)}')
+        report = database.update(url, out, files_url=files_url)
+        report['unchanged'] = len(report['unchanged'])
+        click.echo(json.dumps(report, indent=2))
+    except IOError as exc:
+        print(exc)
+    except KeyboardInterrupt:
+        print('Interrupted by user')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Dataset client
+
+Module implements a thin client for the dataset server, see `server`. It only
+depends on the standard library, hence starts fast, e.g. in shell loops.
+"""
+import http.client
+import json
+import logging
+import socket
+
+from urllib.parse import urlencode, urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_URL = 'http://127.0.0.1:8018'
+"""The default URL of the server."""
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    # HTTP connection over a Unix socket.
+
+    def __init__(self, path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self._path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+def _name(value) -> str:
+    # Render enum members by name, e.g. games and game endings.
+    return getattr(value, 'name', value)
+
+
+class Client:
+    """Client
+
+    Class implements a client to query a dataset server. The connection is
+    kept alive between requests.
+
+    Args:
+        url: The URL of the server, either `http://<host>:<port>` or
+            `unix://<socket path>`.
+        timeout: The timeout of a request in seconds.
+    """
+
+    def __init__(self, url: str = DEFAULT_URL, timeout: float = 60):
+        self.url = url
+        self.timeout = timeout
+        self._conn = None
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        # Open a connection to the server if not connected yet.
+        if self._conn is None:
+            parsed = urlparse(self.url)
+            if parsed.scheme == 'unix':
+                self._conn = _UnixConnection(
+                    parsed.netloc + parsed.path, self.timeout
+                )
+            else:
+                self._conn = http.client.HTTPConnection(
+                    parsed.hostname, parsed.port, timeout=self.timeout
+                )
+        return self._conn
+
+    def close(self) -> None:
+        """Close the connection to the server."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def request(self, endpoint: str, **params) -> dict:
+        """Send a request to the server.
+
+        Args:
+            endpoint: The endpoint, e.g. `load`.
+            **params: The request parameters, sequences are repeated and None
+                values are omitted.
+
+        Returns:
+            The response of the server.
+
+        Raises:
+            ValueError: If the request is invalid or nothing was found.
+            IOError: If the server failed to answer the request.
+        """
+        query = urlencode(
+            {k: v for k, v in params.items() if v is not None}, doseq=True
+        )
+        path = f'/{endpoint}?{query}'
+        try:
+            self._connect().request('GET', path)
+            response = self._conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError,
+                BrokenPipeError):
+            # The kept alive connection was closed, e.g. by a restart.
+            self.close()
+            self._connect().request('GET', path)
+            response = self._conn.getresponse()
+        body = json.loads(response.read())
+        if response.status in (400, 404):
+            raise ValueError(body['error'])
+        if response.status != 200:
+            raise IOError(body.get('error', response.reason))
+        return body
+
+    @staticmethod
+    def _dataset(game, num_players, game_ending) -> dict:
+        # The parameters defining a dataset.
+        return {
+            'game': _name(game),
+            'num_players': list(num_players or []),
+            'game_ending': [_name(e) for e in game_ending or []]
+        }
+
+    def datasets(self) -> list[str]:
+        """List the datasets resident in the server.
+
+        Returns:
+            The roots of the resident datasets.
+        """
+        return self.request('datasets')['datasets']
+
+    def load(self, game_id: int, game='G1830', num_players=None,
+             game_ending=None, rows: int = None) -> dict:
+        """Load a transcript context.
+
+        Args:
+            game_id: The game id to load.
+            game: The game variant, name or `trx.Games` member.
+            num_players: The number of players of the dataset config.
+            game_ending: The game endings of the dataset config.
+            rows: The number of final state rows to return, defaults to None
+                for all.
+
+        Returns:
+            The `context` and the `result`, i.e. the final state in `split`
+            orientation.
+        """
+        params = self._dataset(game, num_players, game_ending)
+        return self.request('load', game_id=game_id, rows=rows, **params)
+
+    def snapshot(self, game='G1830', num_players=None, game_ending=None,
+                 debug: bool = True) -> dict:
+        """Create a snapshot of a dataset without writing it.
+
+        Args:
+            game: The game variant, name or `trx.Games` member.
+            num_players: The number of players of the dataset config.
+            game_ending: The game endings of the dataset config.
+            debug: To include debug data.
+
+        Returns:
+            The snapshot of the dataset.
+        """
+        params = self._dataset(game, num_players, game_ending)
+        return self.request('snapshot', debug=int(debug), **params)
+
+    def inspect(self, game='G1830', num_players=None,
+                game_ending=None) -> dict:
+        """Create and write a snapshot of a dataset.
+
+        Args:
+            game: The game variant, name or `trx.Games` member.
+            num_players: The number of players of the dataset config.
+            game_ending: The game endings of the dataset config.
+
+        Returns:
+            The snapshot of the dataset.
+        """
+        params = self._dataset(game, num_players, game_ending)
+        return self.request('inspect', **params)
+
+    def filter(self, game='G1830', num_players=None,
+               game_ending=None) -> list[int]:
+        """Select the valid transcripts of the default dataset.
+
+        Args:
+            game: The game variant, name or `trx.Games` member.
+            num_players: The number of players to filter.
+            game_ending: The game endings to filter.
+
+        Returns:
+            The game ids matching the filter.
+        """
+        params = self._dataset(game, num_players, game_ending)
+        return self.request('filter', **params)['game_ids']
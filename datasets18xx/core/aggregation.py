@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Aggregation
+
+Module implements group-by statistics across the final state tables of many
+games in map-reduce style. Each game is mapped to partial aggregates, i.e. the
+count, sum, mean, sum of squared deviations from the mean, minimum and maximum
+of each column per group, which are merged with the parallel algorithm of
+Chan et al. and finalized to the statistics. Partials are cached per
+query and game, keyed by the record, such that a query over an unchanged
+dataset does not read any table again.
+
+Groups are either columns of the final state table, e.g. `phase`, or of the
+dataset context, e.g. `num_players`, which are joined on reduce. Besides the
+columns of the final state table, `winner_<feature>` selects the feature of
+the player leading by value in each row, e.g. `winner_cash`. On the last row,
+the leading player is the winner.
+"""
+import hashlib
+import json
+import logging
+import re
+
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ..io import columnar
+
+logger = logging.getLogger(__name__)
+
+ROWS = ('all', 'last')
+"""The rows of the final state tables to aggregate."""
+
+STATS = ('count', 'sum', 'mean', 'std', 'min', 'max')
+"""The statistics of each column and group."""
+
+_PARTIALS = ('count', 'sum', 'mean', 'm2', 'min', 'max')
+
+_WINNER = 'winner_'
+
+_VALUE = re.compile(r'player(\d+)_value')
+
+
+@dataclass(frozen=True)
+class Query:
+    """Query
+
+    Data class implements the map side of an aggregation, i.e. the columns
+    and row-level groups of the final state tables.
+
+    Attributes:
+        columns: The numeric columns to aggregate, e.g. `('winner_cash',)`.
+        by: The columns of the final state table to group by.
+        rows: The rows to aggregate, `all` or `last`.
+    """
+    columns: tuple[str, ...]
+    by: tuple[str, ...] = ()
+    rows: str = 'all'
+
+    def key(self) -> str:
+        """Create the key of the query to cache partials with.
+
+        Returns:
+            The hash of the query.
+        """
+        content = json.dumps(asdict(self), sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+
+def _winner(df: pd.DataFrame, feature: str) -> pd.Series:
+    # The feature of the player leading by value in each row.
+    players = sorted(
+        int(m.group(1)) for m in map(_VALUE.fullmatch, df.columns) if m
+    )
+    if not players:
+        return pd.Series(np.nan, index=df.index, name=feature)
+    values = df[[f'player{p}_value' for p in players]].to_numpy(dtype=float)
+    leader = np.nan_to_num(values, nan=-np.inf).argmax(axis=1)
+    features = pd.DataFrame({
+        p: df.get(f'player{p}_{feature}', np.nan) for p in players
+    }).to_numpy()
+    return pd.Series(
+        features[np.arange(len(df)), leader], index=df.index, name=feature
+    )
+
+
+def partial(df: pd.DataFrame, query: Query) -> pd.DataFrame:
+    """Map a final state table to the partial aggregates of a query.
+
+    Args:
+        df: The final state table of a game.
+        query: The query.
+
+    Returns:
+        The partials, one row per group and column.
+    """
+    if query.rows == 'last':
+        df = df.tail(1)
+    values = {}
+    for col in query.columns:
+        if col.startswith(_WINNER) and col not in df.columns:
+            values[col] = _winner(df, col.removeprefix(_WINNER))
+        elif col in df.columns:
+            values[col] = df[col]
+        else:
+            values[col] = pd.Series(np.nan, index=df.index)
+    values = pd.DataFrame(values).apply(pd.to_numeric, errors='coerce')
+    values = values.astype(float)
+    by = list(query.by)
+    for col in by:
+        # Groups as labels, such that partials of all games share a type.
+        labels = df[col] if col in df.columns else pd.Series(index=df.index)
+        values[col] = labels.astype(str).where(labels.notna())
+    long = values.melt(id_vars=by, var_name='column').dropna(
+        subset=['value']
+    )
+    keys = by + ['column']
+    mean = long.groupby(keys, dropna=False).value.transform('mean')
+    long['m2'] = (long.value - mean) ** 2
+    parts = long.groupby(keys, dropna=False).agg(
+        count=('value', 'count'), sum=('value', 'sum'),
+        mean=('value', 'mean'), m2=('m2', 'sum'), min=('value', 'min'),
+        max=('value', 'max')
+    )
+    return parts.reset_index()
+
+
+def partial_of_file(item: tuple[int, Path, Query]) -> tuple:
+    """Map a final state file to the partial aggregates of a query.
+
+    Args:
+        item: The game id, final state filepath and query.
+
+    Returns:
+        The game id and its partials, see `partial`.
+    """
+    game_id, file, query = item
+    columns = list(query.columns) + list(query.by)
+    if any(c.startswith(_WINNER) for c in query.columns):
+        columns = None
+    df = columnar.read_table(file, columns).to_pandas()
+    return game_id, partial(df, query)
+
+
+def reduce(partials: pd.DataFrame, by: list[str]) -> pd.DataFrame:
+    """Merge partial aggregates and finalize them to statistics.
+
+    Args:
+        partials: The partials of all games, with any further group columns,
+            e.g. of the context, joined.
+        by: The columns to group by.
+
+    Returns:
+        The statistics, one row per group and column, see `STATS`.
+    """
+    keys = list(by) + ['column']
+    if partials.empty:
+        return pd.DataFrame(columns=keys + list(STATS))
+    # Merge the means and the sums of squared deviations of all partials of a
+    # group at once, i.e. the parallel algorithm of Chan et al. generalized to
+    # many partials, which avoids the cancellation of sums of squares.
+    count = partials.groupby(keys, dropna=False)['count'].transform('sum')
+    partials = partials.assign(
+        weighted=partials['mean'] * partials['count'] / count
+    )
+    mean = partials.groupby(keys, dropna=False).weighted.transform('sum')
+    partials['m2'] = (
+        partials['m2'] + partials['count'] * (partials['mean'] - mean) ** 2
+    )
+    merged = partials.groupby(keys, dropna=False, sort=True).agg(
+        count=('count', 'sum'), sum=('sum', 'sum'), mean=('weighted', 'sum'),
+        m2=('m2', 'sum'), min=('min', 'min'), max=('max', 'max')
+    ).reset_index()
+    dof = (merged['count'] - 1).where(merged['count'] > 1)
+    merged['std'] = np.sqrt(merged['m2'] / dof)
+    merged['count'] = merged['count'].astype(int)
+    return merged[keys + list(STATS)]
+
+
+class PartialCache:
+    """PartialCache
+
+    Class implements the on-disk cache of the partial aggregates of a query,
+    one Parquet file per query with the partials of all games and the key of
+    the record they were computed from.
+
+    Args:
+        path: The directory of the cache.
+        query: The query.
+    """
+
+    def __init__(self, path: Path, query: Query):
+        self._file = path.joinpath(f'{query.key()}.parquet')
+
+    def read(self) -> dict[int, tuple[str, pd.DataFrame]]:
+        """Read the cached partials.
+
+        Returns:
+            The record key and partials mapped to game id.
+        """
+        if not self._file.exists():
+            return {}
+        df = pd.read_parquet(self._file)
+        if not set(_PARTIALS).issubset(df.columns):
+            # Partials of a previous format are recomputed.
+            return {}
+        return {
+            int(game_id): (group.record.iloc[0],
+                           group.drop(columns=['game_id', 'record']))
+            for game_id, group in df.groupby('game_id', sort=False)
+        }
+
+    def write(self, partials: dict[int, tuple[str, pd.DataFrame]]) -> None:
+        """Write the partials, replacing the cached ones.
+
+        Args:
+            partials: The record key and partials mapped to game id, partials
+                without a record key are not cached.
+        """
+        frames = [
+            df.assign(game_id=game_id, record=record)
+            for game_id, (record, df) in partials.items()
+            if record is not None and not df.empty
+        ]
+        if not frames:
+            return
+        self._file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._file.with_name(self._file.name + '.tmp')
+        pd.concat(frames, ignore_index=True).to_parquet(tmp, index=False)
+        tmp.replace(self._file)
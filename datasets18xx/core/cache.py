@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Cache
+
+Module implements the caches of loaded records, i.e. a bounded in-process LRU
+cache and an optional on-disk spill cache. Spilled records are keyed by the
+content hash of their transcript and the parser version, hence records
+rewritten by `make` are never served stale.
+"""
+import hashlib
+import logging
+import pickle
+import threading
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheConfig:
+    """CacheConfig
+
+    Data class implements the configuration of the record caches.
+
+    Attributes:
+        max_items: The maximum number of records kept in memory, 0 to disable
+            the in-process cache.
+        max_bytes: The maximum estimated size of the records kept in memory,
+            defaults to None for no limit.
+        spill_dir: The directory of the on-disk cache, defaults to None to
+            disable it.
+    """
+    max_items: int = 128
+    max_bytes: int = None
+    spill_dir: Path = None
+
+
+def size_of(obj) -> int:
+    """Estimate the memory size of a cached object.
+
+    Args:
+        obj: The cached object, e.g. a frame or a transcript context.
+
+    Returns:
+        The estimated size in bytes.
+    """
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class LRUCache:
+    """LRUCache
+
+    Class implements a thread-safe cache evicting the least recently used
+    entries once the number of entries or their estimated size exceeds the
+    limits.
+
+    Args:
+        max_items: The maximum number of entries, 0 to disable the cache.
+        max_bytes: The maximum estimated size of all entries, defaults to None
+            for no limit. Sizes are only estimated if a limit is set.
+    """
+
+    def __init__(self, max_items: int = 128, max_bytes: int = None):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getstate__(self) -> dict:
+        # Entries and the lock are not copied to other processes.
+        state = self.__dict__.copy()
+        state.update(_entries=OrderedDict(), _bytes=0, _lock=None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get an entry and mark it as recently used.
+
+        Args:
+            key: The key of the entry.
+
+        Returns:
+            The entry or None if not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key, value) -> None:
+        """Add an entry, evicting the least recently used entries if full.
+
+        Entries larger than the size limit are not cached.
+
+        Args:
+            key: The key of the entry.
+            value: The entry.
+        """
+        if self.max_items <= 0:
+            return
+        size = size_of(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_items or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._bytes -= self._entries.popitem(last=False)[1][1]
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self) -> dict:
+        """The statistics of the cache.
+
+        Returns:
+            The hits, misses, number and estimated size of the entries.
+        """
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'items': len(self._entries),
+            'bytes': self._bytes
+        }
+
+
+class SpillCache:
+    """SpillCache
+
+    Class implements an on-disk cache of loaded records. Transcript contexts
+    are pickled, final state tables are written as Arrow IPC files. Entries
+    are stored per game id and key, i.e. transcript hash and parser version.
+    Storing an entry removes the entries of the same game id with another
+    key.
+
+    Args:
+        path: The directory of the cache.
+    """
+
+    _SUFFIXES = {'context': '.pickle', 'result': '.arrow'}
+
+    def __init__(self, path: Path):
+        self._path = path
+
+    @staticmethod
+    def key(digest: str, parser: str) -> str:
+        """Create the key of a record.
+
+        Args:
+            digest: The content hash of the raw transcript.
+            parser: The parser version the record was processed with.
+
+        Returns:
+            The key of the record.
+        """
+        parser_hash = hashlib.sha256(parser.encode()).hexdigest()[:12]
+        return f'{digest}-{parser_hash}'
+
+    def _file(self, kind: str, game_id: int, key: str) -> Path:
+        return self._path.joinpath(
+            kind, f'{game_id}-{key}{self._SUFFIXES[kind]}'
+        )
+
+    def get(self, kind: str, game_id: int, key: str):
+        """Read an entry.
+
+        Args:
+            kind: The kind of the entry, `context` or `result`.
+            game_id: The game id of the record.
+            key: The key of the record, see `key`.
+
+        Returns:
+            The transcript context or the final state table, None if not
+            cached.
+        """
+        file = self._file(kind, game_id, key)
+        if not file.exists():
+            return None
+        if kind == 'context':
+            with open(file, 'rb') as f:
+                return pickle.load(f)
+        with pa.memory_map(str(file), 'r') as source:
+            return ipc.open_file(source).read_all()
+
+    def put(self, kind: str, game_id: int, key: str, value) -> None:
+        """Write an entry, replacing entries of outdated keys.
+
+        Args:
+            kind: The kind of the entry, `context` or `result`.
+            game_id: The game id of the record.
+            key: The key of the record, see `key`.
+            value: The transcript context or the final state table.
+        """
+        file = self._file(kind, game_id, key)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        for outdated in file.parent.glob(f'{game_id}-*'):
+            outdated.unlink(missing_ok=True)
+        tmp = file.with_name(file.name + '.tmp')
+        if kind == 'context':
+            with open(tmp, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            with ipc.new_file(str(tmp), value.schema) as writer:
+                writer.write_table(value)
+        tmp.replace(file)
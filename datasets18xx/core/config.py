@@ -43,18 +43,80 @@ class GameEnding(enum.IntEnum):
             raise ValueError(f'Unknown game end: {game_end}') from exc
 
 
+_PLAYERS = re.compile(r'(?:[2-6]p)+')
+
+_RANGE = re.compile(r'(id|score|actions)(\d*)-(\d*)')
+
+_RANGES = {'id': 'game_ids', 'score': 'winner_score', 'actions': 'num_actions'}
+
+_FLAGS = {
+    'parsed': ('parsed', True),
+    'unparsed': ('parsed', False),
+    'verified': ('verified', True),
+    'unverified': ('verified', False),
+    'unprocessed': ('unprocessed', True),
+    'clean': ('unprocessed', False)
+}
+
+
+def _parse(tokens: list[str], strict: bool) -> dict:
+    # Parse the tokens of a suffix to the fields of the config.
+    fields = {}
+    for token in tokens:
+        match = _RANGE.fullmatch(token)
+        if _PLAYERS.fullmatch(token):
+            players = {int(p) for p in token.split('p') if p}
+            fields['num_players'] = fields.get('num_players', set()) | players
+        elif token in GameEnding.__members__:
+            fields.setdefault('game_ending', set()).add(GameEnding[token])
+        elif match is not None:
+            lo, hi = (int(b) if b else None for b in match.group(2, 3))
+            fields[_RANGES[match.group(1)]] = (lo, hi)
+        elif token in _FLAGS:
+            name, value = _FLAGS[token]
+            fields[name] = value
+        elif strict:
+            raise ValueError(f'Unknown filter: {token}')
+    return fields
+
+
+def _range_suffix(prefix: str, bounds: tuple) -> str:
+    # Render a range, e.g. `id179000-179500` or `score3000-`.
+    lo, hi = ('' if b is None else str(b) for b in bounds)
+    return f'{prefix}{lo}-{hi}'
+
+
 @dataclass
 class DatasetConfig:
     """DatasetConfig
 
-    Data class implements available filters for the full dataset.
+    Data class implements available filters for the full dataset. The filters
+    are rendered to and parsed from the suffix of the dataset name, see
+    `suffix`, and compiled to masks over the context, see
+    `ContextManager.mask`.
 
     Attributes:
         num_players: Set of number of players in a game to include as int.
         game_ending: Set of game endings to include, see GameEnding.
+        game_ids: Range of game ids to include as tuple of first and last
+            game id, either may be None for an open range.
+        winner_score: Range of the final score of the winner to include.
+        num_actions: Range of the number of actions of a game to include.
+        parsed: To include only games parsed successfully, or only games
+            failing to parse.
+        verified: To include only games verified successfully, or only games
+            failing verification.
+        unprocessed: To include only games with unprocessed lines, or only
+            games without.
     """
     num_players: set = None
     game_ending: set = None
+    game_ids: tuple = None
+    winner_score: tuple = None
+    num_actions: tuple = None
+    parsed: bool = None
+    verified: bool = None
+    unprocessed: bool = None
 
     def __post_init__(self):
         if not self.num_players:
@@ -73,6 +135,19 @@ class DatasetConfig:
             if not any(isinstance(e, GameEnding) for e in self.game_ending):
                 raise ValueError('Game ending must be of type GameEnding')
 
+        for name in _RANGES.values():
+            bounds = getattr(self, name)
+            if bounds is None:
+                continue
+            if not isinstance(bounds, tuple) or len(bounds) != 2:
+                raise AttributeError(f'{name} must be a tuple of two bounds')
+            if not all(b is None or isinstance(b, int) for b in bounds):
+                raise ValueError(f'Bounds of {name} must be integers or None')
+
+        for name in ('parsed', 'verified', 'unprocessed'):
+            if getattr(self, name) not in (None, True, False):
+                raise ValueError(f'{name} must be a boolean or None')
+
     @staticmethod
     def from_db(dir_name: str) -> "DatasetConfig":
         """Build config from dataset directory name.
@@ -83,57 +158,74 @@ class DatasetConfig:
         Returns:
             Corresponding dataset config.
         """
-        np = [i for i in range(2, 7) if re.search(rf'{i}p', dir_name)]
-        ge = [e for e in GameEnding if re.search(rf'{e.name}', dir_name)]
-        return DatasetConfig.from_cli(tuple(np), tuple(ge))
+        fields = _parse(dir_name.split('_'), strict=False)
+        if not fields:
+            return DefaultDatasetConfig()
+        return DatasetConfig(**fields)
 
     @staticmethod
-    def from_cli(np: tuple[int] = None,
-                 ge: tuple[GameEnding] = None) -> "DatasetConfig":
+    def from_cli(np: tuple[int] = None, ge: tuple[GameEnding] = None,
+                 filters: str = None) -> "DatasetConfig":
         """Create dataset configuration from CLI inputs.
 
         Args:
             np: Number of players definition, default is None.
             ge: Game endings for configuration, default is None.
+            filters: Further filters in the format of the suffix, e.g.
+                `id179000-179500_score3000-_verified`, default is None.
 
         Returns:
-            The dataset config based on number of players and game ending.
+            The dataset config based on number of players, game ending and
+            further filters.
+
+        Raises:
+            ValueError: If a filter is unknown.
         """
+        fields = _parse(filters.split('_'), strict=True) if filters else {}
         if np is not None and len(np) > 0:
-            num_players = set(np)
-        else:
-            num_players = None
+            fields['num_players'] = set(np)
         if ge is not None and len(ge) > 0:
-            game_ending = set(ge)
-        else:
-            game_ending = None
-        if num_players is None and game_ending is None:
+            fields['game_ending'] = set(ge)
+        if not fields:
             return DefaultDatasetConfig()
-        return DatasetConfig(num_players=num_players, game_ending=game_ending)
+        return DatasetConfig(**fields)
+
+    def needs_metadata(self) -> bool:
+        """Check if the filters require the metadata index.
+
+        Returns:
+            True if filtering on the winner score or number of actions.
+        """
+        return self.winner_score is not None or self.num_actions is not None
 
     def suffix(self) -> str:
         """Create the suffix for the dataset name based on the config.
 
         Returns:
-            The suffix, i.e. number of players and game endings. E.g,
-            `4p_BankBroke` or `3p4p_BankBroke_PlayerGoesBankrupt`.
+            The suffix, i.e. number of players, game endings and further
+            filters. E.g, `4p_BankBroke`, `3p4p_BankBroke_PlayerGoesBankrupt`
+            or `4p_id179000-179500_score3000-_verified`.
         """
         # Create the suffix of the dataset name based on config.
-        path = str()
+        parts = []
         if self.num_players:
-            player_str = ''.join(f'{i}p' for i in sorted(self.num_players))
-            path = player_str
+            parts.append(''.join(f'{i}p' for i in sorted(self.num_players)))
         if self.game_ending:
-            end_str = '_'.join(mem.name for mem in self.game_ending)
-            if path:
-                path += '_' + end_str
-            else:
-                path = end_str
-        return path
+            parts.extend(mem.name for mem in self.game_ending)
+        for prefix, name in _RANGES.items():
+            if getattr(self, name) is not None:
+                parts.append(_range_suffix(prefix, getattr(self, name)))
+        for token, (name, value) in _FLAGS.items():
+            if getattr(self, name) is value:
+                parts.append(token)
+        return '_'.join(parts)
 
     def query(self) -> str:
         """Construct a query for a dataframe based on config.
 
+        Note: Only number of players and game endings are included, see
+        `ContextManager.mask` for all filters.
+
         Returns:
             The query to search for num_players and game_ending in context.
         """
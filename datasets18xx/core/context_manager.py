@@ -8,51 +8,284 @@ and inspect and summarize them.
 import ast
 import logging
 
+from collections.abc import Iterable, Iterator
 from itertools import chain
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import transcripts18xx as trx
 
-from ..utils import pooling
+from ..utils import pooling, profiling
 from ..io import io
 from . import config
 
 logger = logging.getLogger(__name__)
 
+CATEGORICALS = ('parse_result', 'game_ending')
+"""Columns of the context stored as categoricals."""
 
-def create_context(file_list: list[Path]) -> pd.DataFrame:
-    """Create a context from transcripts.
+
+def _to_str(obj):
+    # Render values as the CSV context did, keeping missing values.
+    if obj is None or obj is pd.NA or (isinstance(obj, float) and obj != obj):
+        return None
+    return str(obj)
+
+
+def write_context(df: pd.DataFrame, path: Path) -> pd.DataFrame:
+    """Write a context to Parquet with typed columns.
+
+    Unprocessed lines are stored as list of strings, parse results and game
+    endings as categoricals. Values which have no Parquet type, e.g. enum
+    members of the parser, are stored as strings.
 
     Args:
-        file_list: The transcript filepaths.
+        df: The context to write.
+        path: The Parquet filepath to write to.
+
+    Returns:
+        The context with the types as written.
+    """
+    # Columns are replaced, never modified in place, hence a shallow copy.
+    df = df.copy(deep=False)
+    for col in df.columns:
+        if col == 'unprocessed_lines' or df[col].dtype != object:
+            continue
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[col] = df[col].map(_to_str)
+    for col in CATEGORICALS:
+        if col in df.columns:
+            df[col] = df[col].map(_to_str).astype('category')
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if 'unprocessed_lines' in table.column_names:
+        i = table.schema.get_field_index('unprocessed_lines')
+        lines = table.column(i).cast(pa.list_(pa.string()))
+        table = table.set_column(i, 'unprocessed_lines', lines)
+    with profiling.stage('write_context'):
+        pq.write_table(table, path)
+    profiling.count_file('bytes_written', path)
+    return df
+
+
+def read_context(path: Path) -> pd.DataFrame:
+    """Read a context from Parquet, or from CSV for legacy datasets.
+
+    Args:
+        path: The context filepath.
 
     Returns:
-        The context of the transcript contexts.
+        The context.
     """
-    runner = pooling.PoolRunner(trx.TranscriptContext.from_raw, file_list)
-    ctx = runner.run()
-    return pd.DataFrame([io.serialize(c.__dict__) for c in ctx])
+    profiling.count_file('bytes_read', path)
+    with profiling.stage('read_context'):
+        if path.suffix == '.parquet':
+            return pd.read_parquet(path)
+        df = pd.read_csv(path, header=0)
+        df.unprocessed_lines = df.unprocessed_lines.apply(ast.literal_eval)
+        return df
+
+
+def create_context(file_list: list[Path]) -> Iterator[trx.TranscriptContext]:
+    """Create the contexts of transcripts.
+
+    Args:
+        file_list: The transcript filepaths.
+
+    Yields:
+        The transcript contexts as they are extracted.
+    """
+    runner = pooling.PoolRunner(
+        trx.TranscriptContext.from_raw, file_list, ordered=False
+    )
+    yield from runner.iterate()
+
+
+class ContextWriter:
+    """ContextWriter
+
+    Class implements a writer to collect transcript contexts in batches. Each
+    full batch is serialized into a columnar frame, such that only one batch
+    of context objects is kept in memory. The batches are discarded if
+    writing fails.
+
+    Args:
+        batch_size: The number of contexts to buffer before serializing.
+    """
+
+    def __init__(self, batch_size: int = 1000):
+        self._batch_size = batch_size
+        self._batch = []
+        self._frames = []
+        self._written = 0
+
+    def __enter__(self) -> "ContextWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.flush()
+            return
+        self._batch = []
+        self._frames = []
+
+    def __len__(self) -> int:
+        return self._written + len(self._batch)
+
+    def write(self, ctx: trx.TranscriptContext) -> None:
+        """Add a transcript context to the current batch.
+
+        Args:
+            ctx: The transcript context.
+        """
+        self._batch.append(ctx)
+        if len(self._batch) >= self._batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Serialize the buffered contexts into a new batch frame."""
+        if not self._batch:
+            return
+        self._frames.append(pd.DataFrame(io.serialize_records(self._batch)))
+        self._written += len(self._batch)
+        self._batch = []
+
+    def frames(self) -> list[pd.DataFrame]:
+        """Get the batch frames of all written contexts.
+
+        Returns:
+            The batch frames in order of writing.
+        """
+        return list(self._frames)
+
+    def read(self) -> pd.DataFrame:
+        """Read all written contexts.
+
+        Returns:
+            The written contexts, empty if none were written.
+        """
+        if not self._frames:
+            return pd.DataFrame()
+        # Types of the batches may differ, e.g. batches without any
+        # unprocessed lines, hence the batches are concatenated in pandas.
+        return pd.concat(self._frames, ignore_index=True)
 
 
 class ContextManager:
     """ContextManager
 
     Class implements a manager to handle the context of a dataset. Upon
-    initialization, the context will be loaded if available.
+    initialization, the context will be loaded if available. A legacy CSV
+    context with the same name is migrated to Parquet.
 
     Args:
-        context_path: Path to the dataset's context file.
+        context_path: Path to the dataset's Parquet context file.
     """
 
     def __init__(self, context_path: Path):
         self._context_path = context_path
+        self._meta = None
+        legacy_path = self._context_path.with_suffix('.csv')
         if self._context_path.exists():
-            self._df = pd.read_csv(self._context_path, header=0)
-            self._df.unprocessed_lines = self._df.unprocessed_lines.apply(
-                ast.literal_eval)
+            self._df = read_context(self._context_path)
+        elif legacy_path.exists():
+            logger.info('Migrating context %s', legacy_path)
+            self.add_context(read_context(legacy_path))
         else:
             self._df = pd.DataFrame()
+        self._invalidate()
+
+    def _invalidate(self) -> None:
+        # Drop the lookup structures derived from the context.
+        self._index = None
+        self._bitmaps = {}
+        self._arrays = {}
+
+    def _game_index(self) -> dict[int, int]:
+        # Map game ids to their row, built on first lookup. The index is
+        # only published once complete, such that concurrent lookups never
+        # see a partial index.
+        index = self._index
+        if index is None:
+            index = {}
+            if not self._df.empty:
+                for row, game_id in enumerate(self._df.game_id.tolist()):
+                    index.setdefault(game_id, row)
+            self._index = index
+        return index
+
+    def _bitmap(self, column: str, value) -> np.ndarray:
+        # Mask of the rows with the given value, built per column on first
+        # lookup and published once complete.
+        bitmaps = self._bitmaps
+        masks = bitmaps.get(column)
+        if masks is None:
+            codes, uniques = pd.factorize(self._df[column])
+            masks = {u: codes == i for i, u in enumerate(uniques)}
+            bitmaps[column] = masks
+        mask = masks.get(value)
+        if mask is None:
+            return np.zeros(len(self._df), dtype=bool)
+        return mask
+
+    def _any(self, column: str, values) -> np.ndarray:
+        # Mask of the rows with any of the given values.
+        mask = np.zeros(len(self._df), dtype=bool)
+        for value in values:
+            mask |= self._bitmap(column, value)
+        return mask
+
+    def _numeric(self, column: str) -> np.ndarray:
+        # Values of a context or metadata column aligned to the rows of the
+        # context, missing values as NaN, built per column on first lookup
+        # and published once complete.
+        arrays = self._arrays
+        values = arrays.get(column)
+        if values is None:
+            if column in self._df.columns:
+                values = pd.to_numeric(self._df[column], errors='coerce')
+                values = values.to_numpy(dtype=float)
+            elif self._meta is not None and column in self._meta.columns:
+                rows = pd.Index(self._meta.game_id).get_indexer(
+                    self._df.game_id
+                )
+                values = pd.to_numeric(self._meta[column], errors='coerce')
+                values = values.to_numpy(dtype=float)
+                values = np.where(rows >= 0, values[rows], np.nan)
+            else:
+                raise ValueError(
+                    f'Filter on {column} requires the metadata index'
+                )
+            arrays[column] = values
+        return values
+
+    def _range(self, column: str, bounds: tuple) -> np.ndarray:
+        # Mask of the rows within the bounds, missing values never match.
+        values = self._numeric(column)
+        lo, hi = bounds
+        mask = ~np.isnan(values)
+        if lo is not None:
+            mask &= values >= lo
+        if hi is not None:
+            mask &= values <= hi
+        return mask
+
+    def _has_unprocessed(self) -> np.ndarray:
+        # Mask of the rows with unprocessed lines, built on first lookup.
+        arrays = self._arrays
+        mask = arrays.get('unprocessed_lines')
+        if mask is None:
+            lines = self._df.unprocessed_lines
+            mask = np.fromiter(
+                (x is not None and len(x) > 0 for x in lines),
+                dtype=bool, count=len(lines)
+            )
+            arrays['unprocessed_lines'] = mask
+        return mask
 
     def _size(self) -> int:
         # Get the full size of the dataset.
@@ -73,7 +306,8 @@ class ContextManager:
 
     def _game_ending(self) -> dict:
         # Get the game endings of the valid dataset.
-        return self._valid_ctx().game_ending.value_counts().to_dict()
+        dist = self._valid_ctx().game_ending.value_counts()
+        return dist[dist > 0].to_dict()
 
     def _unprocessed_lines(self) -> list[str]:
         # Combine the unprocessed lines for debug purposes.
@@ -83,15 +317,14 @@ class ContextManager:
     def _parsing_failed(self) -> dict:
         # Get the parsing errors and their transcripts for debug purposes.
         errors = self._df[self._df.parse_result != 'SUCCESS']
-        grouped = errors.groupby('parse_result')['raw'].apply(list).to_dict()
-        result = {k: io.serialize(v) for k, v in grouped.items()}
-        return result
+        grouped = errors.groupby('parse_result', observed=True)['raw']
+        # The transcripts are rendered as unix-filepaths on write already.
+        return grouped.apply(list).to_dict()
 
     def _verification_failed(self) -> list[str]:
         # Get the verification errors and transcripts for debug purposes.
         file_list = self._df[self._df.verification_result == False].raw.tolist()
-        result = io.serialize(file_list)
-        return result
+        return file_list
 
     def add_context(self, df: pd.DataFrame) -> None:
         """Add a dataset context to the manager.
@@ -101,8 +334,72 @@ class ContextManager:
         Args:
             df: The dataset context.
         """
-        self._df = df
-        self._df.to_csv(self._context_path, index=False)
+        self._df = write_context(df, self._context_path)
+        self._invalidate()
+
+    def update_context(self, df: pd.DataFrame, file_list: list[Path]) -> None:
+        """Merge transcript contexts into the dataset context.
+
+        Existing contexts of the same transcripts are replaced, contexts of
+        transcripts no longer part of the dataset are removed. The context is
+        sorted by raw transcript.
+
+        Note: The context will be saved immediately.
+
+        Args:
+            df: The contexts of the new or changed transcripts.
+            file_list: The raw transcripts of the dataset.
+        """
+        self._merge([df], file_list)
+
+    def stream_context(self, contexts: Iterable[trx.TranscriptContext],
+                       file_list: list[Path]) -> None:
+        """Merge transcript contexts as they arrive into the dataset context.
+
+        The contexts are serialized in batches into columnar frames as they
+        arrive, hence the context objects are never collected in memory. The
+        batch frames are merged with the context of the manager in a single
+        concatenation.
+
+        Note: The context will be saved immediately.
+
+        Args:
+            contexts: The contexts of the new or changed transcripts, e.g.
+                yielded from the parser workers.
+            file_list: The raw transcripts of the dataset.
+        """
+        with ContextWriter() as writer:
+            for ctx in contexts:
+                writer.write(ctx)
+        with profiling.stage('merge_context'):
+            self._merge(writer.frames(), file_list)
+
+    def _merge(self, frames: list[pd.DataFrame],
+               file_list: list[Path]) -> None:
+        # Empty frames are left out, their columns may have no type.
+        frames = [df for df in frames if not df.empty]
+        if not self._df.empty:
+            keep = self._df.raw.isin(io.serialize_paths(file_list))
+            for df in frames:
+                keep &= ~self._df.raw.isin(df.raw)
+            if keep.any():
+                frames.insert(0, self._df[keep])
+        if not frames:
+            self.add_context(self._df.iloc[:0])
+            return
+        merged = pd.concat(frames, ignore_index=True)
+        self.add_context(merged.sort_values('raw', ignore_index=True))
+
+    def export_csv(self, path: Path) -> None:
+        """Export the context to CSV.
+
+        Args:
+            path: The CSV filepath to write to.
+        """
+        df = self._df.copy()
+        if 'unprocessed_lines' in df.columns:
+            df.unprocessed_lines = df.unprocessed_lines.map(list)
+        df.to_csv(path, index=False)
 
     def get_context(self) -> pd.DataFrame:
         """Get the dataset context.
@@ -161,17 +458,104 @@ class ContextManager:
         """Filter the context based on dataset config.
 
         Args:
-            conf: The dataset config, describing desired players and/or game
-                endings.
+            conf: The dataset config, see `mask`.
 
         Returns:
             List of raw transcripts matching the filter.
         """
-        subset = self._df.query(conf.query())
+        subset = self.subset_context(conf)
         if subset.empty:
             return []
         return [Path(f) for f in subset.raw.tolist()]
 
+    def set_metadata(self, meta: pd.DataFrame) -> None:
+        """Set the metadata index to filter on, see `mask`.
+
+        Args:
+            meta: The metadata index of the dataset, with one row per game id.
+        """
+        if meta is not self._meta:
+            self._meta = meta
+            self._arrays = {}
+
+    def mask(self, conf: config.DatasetConfig) -> np.ndarray:
+        """Compile the dataset config to a mask over the context.
+
+        The mask combines bitmaps of the categorical columns and range masks
+        over numeric columns, built once per column, such that repeated
+        filtering does not scan the context again. Filters on the winner
+        score or number of actions require the metadata, see `set_metadata`.
+
+        Args:
+            conf: The dataset config.
+
+        Returns:
+            The boolean mask of the rows matching the config.
+
+        Raises:
+            ValueError: If a filter requires the metadata, which is not set.
+        """
+        mask = np.ones(len(self._df), dtype=bool)
+        if self._df.empty:
+            return mask
+        if conf.num_players is not None:
+            mask &= self._any('num_players', conf.num_players)
+        if conf.game_ending is not None:
+            endings = [ending.name for ending in conf.game_ending]
+            mask &= self._any('game_ending', endings)
+        if conf.game_ids is not None:
+            mask &= self._range('game_id', conf.game_ids)
+        if conf.winner_score is not None:
+            mask &= self._range('winner_score', conf.winner_score)
+        if conf.num_actions is not None:
+            mask &= self._range('num_actions', conf.num_actions)
+        if conf.parsed is not None:
+            parsed = self._bitmap('parse_result', 'SUCCESS')
+            mask &= parsed if conf.parsed else ~parsed
+        if conf.verified is not None:
+            verified = self._bitmap('verification_result', True)
+            mask &= verified if conf.verified else ~verified
+        if conf.unprocessed is not None:
+            unprocessed = self._has_unprocessed()
+            mask &= unprocessed if conf.unprocessed else ~unprocessed
+        return mask
+
+    def subset_context(self, conf: config.DatasetConfig) -> pd.DataFrame:
+        """Slice the context based on dataset config.
+
+        Args:
+            conf: The dataset config, see `mask`.
+
+        Returns:
+            The contexts of the transcripts matching the filter.
+        """
+        if self._df.empty:
+            return self._df
+        return self._df[self.mask(conf)].reset_index(drop=True)
+
+    def raw_transcripts(self, game_ids: Iterable[int]) -> dict[int, str]:
+        """Resolve the raw transcripts of several game ids at once.
+
+        Args:
+            game_ids: The game IDs to load raw transcript paths.
+
+        Returns:
+            The raw transcript file paths mapped to game id, in order of the
+            game ids. Game ids which either do not exist or are not valid are
+            omitted.
+        """
+        index = self._game_index()
+        if not index:
+            return {}
+        valid = self._bitmap('valid', True)
+        raw = self._df.raw
+        found = {}
+        for game_id in game_ids:
+            row = index.get(game_id)
+            if row is not None and valid[row]:
+                found[game_id] = raw.iat[row]
+        return found
+
     def raw_transcript(self, game_id: int) -> str | None:
         """Load the raw transcript with given game id.
 
@@ -182,7 +566,7 @@ class ContextManager:
             The raw transcript file path or None if either game id does not
             exist or is not valid.
         """
-        if game_id in self._valid_ctx().game_id.values:
-            # There is only one unique game id.
-            return self._df[self._df.game_id == game_id].iloc[0].raw
-        return None
+        row = self._game_index().get(game_id)
+        if row is None or not self._bitmap('valid', True)[row]:
+            return None
+        return self._df.raw.iat[row]
@@ -5,21 +5,83 @@
 Module implements the handling of a 18xx dataset with raw transcript and
 processed result paths.
 """
+import functools
 import logging
 import os
+import shutil
 
+from collections.abc import Iterable, Iterator
 from pathlib import Path
-from tqdm import tqdm
 
 import pandas as pd
+import pyarrow.dataset as pds
 import transcripts18xx as trx
 
-from ..io import io, local
-from ..utils import pooling
-from . import config, context_manager
+from ..io import columnar, io, local, pack, tensors
+from ..utils import pooling, profiling
+from . import aggregation, cache, config, context_manager, manifest
+from . import metadata_index
 
 logger = logging.getLogger(__name__)
 
+_PROCESSED_SUFFIXES = [
+    '.json', '.csv', '.h5', '.parquet', '.arrow', '.npy'
+]
+
+# Minimum number of tables to read through the pool, see `load_many`.
+_MIN_PARALLEL = 64
+
+
+def _invoke_parser(file: Path, game: trx.Games,
+                   to_columnar: bool) -> tuple[trx.TranscriptContext, dict]:
+    # Invoke the parser in a thread-safe manner and return the context and
+    # the metadata index row of the freshly written record, so no second
+    # pass over the records is required.
+    profiling.count_file('bytes_read', file)
+    with profiling.stage('parse'):
+        trx.TranscriptParser(file, game.select()).parse()
+    result = local.result_file(file)
+    num_actions = None
+    if to_columnar and result.exists():
+        with profiling.stage('convert'):
+            num_actions = columnar.convert(result, local.columnar_file(file))
+    else:
+        # A columnar table of a previous run would shadow the new results.
+        local.columnar_file(file).unlink(missing_ok=True)
+    with profiling.stage('extract_context'):
+        ctx = trx.TranscriptContext.from_raw(file)
+    with profiling.stage('metadata_row'):
+        row = metadata_index.read_row(file, num_actions)
+    profiling.count('transcripts')
+    return ctx, row
+
+
+def _split_rows(results: Iterable[tuple],
+                writer: metadata_index.RowWriter) -> Iterator:
+    # Yield the contexts of the parser results, writing their metadata
+    # index rows in batches as they pass.
+    for ctx, row in results:
+        if row is not None:
+            writer.write(row)
+        yield ctx
+
+
+def _has_result(raw: Path) -> bool:
+    # Whether a record holds a columnar or CSV final state table.
+    return (local.columnar_file(raw).exists()
+            or local.result_file(raw).exists())
+
+
+def _read_frame(file: Path, columns: list[str] = None) -> pd.DataFrame:
+    # Read the final state table of a game.
+    return columnar.read_table(file, columns).to_pandas()
+
+
+def _read_result(item: tuple[int, Path, list[str] | None]) -> tuple:
+    # Read the final state table of a game in a worker.
+    game_id, file, columns = item
+    return game_id, _read_frame(file, columns)
+
 
 class Dataset18xx:
     """Dataset18xx
@@ -27,10 +89,14 @@ class Dataset18xx:
     Class to maintain a dataset for a given 18xx game. The class is used to
     access the raw transcript and processed result files.
 
+    Loaded records are cached, see `load` and `result`.
+
     Args:
         db: Path to the database.
         game: The game to load the dataset.
         conf: The dataset config.
+        cache_config: The configuration of the record caches, defaults to None
+            to use the default `CacheConfig`.
 
     Attributes:
         game: The game to load the dataset.
@@ -38,19 +104,41 @@ class Dataset18xx:
         root: The root folder of the dataset.
     """
 
-    def __init__(self, db: Path, game: trx.Games, conf: config.DatasetConfig):
+    def __init__(self, db: Path, game: trx.Games, conf: config.DatasetConfig,
+                 cache_config: cache.CacheConfig = None):
         self.db = db
         self.game = game
         self.conf = conf
 
         self.root = self._create_root()
 
-        self._raw = local.find_raw_transcripts(self.root)
-
         self._metadata_path = self.root.joinpath('metadata.json')
-        self._context_path = self.root.joinpath('context.csv')
+        self._context_path = self.root.joinpath('context.parquet')
+        self._pack_path = self.root.joinpath('results.arrow')
+        self._tensors_path = local.derived_path(self.root, 'tensors')
+        self._aggregates_path = local.derived_path(self.root, 'aggregates')
+        self._manifest_path = self.root.joinpath('manifest.json')
+        self._view_path = self.root.joinpath('view.json')
+        self._view = None
+        self._metadata_index = metadata_index.MetadataIndex(
+            self.root.joinpath('metadata.parquet')
+        )
+        if self._view_path.exists():
+            self._view = io.read_json(self._view_path)
         self._ctx_manager = context_manager.ContextManager(self._context_path)
 
+        cache_config = cache_config or cache.CacheConfig()
+        self._cache = cache.LRUCache(
+            cache_config.max_items, cache_config.max_bytes
+        )
+        self._spill = None
+        if cache_config.spill_dir is not None:
+            self._spill = cache.SpillCache(cache_config.spill_dir)
+        self._records = None
+        self._packed = None
+        if self._view is not None and self._view_is_stale():
+            self._slice_view()
+
     @staticmethod
     def from_db(root: Path) -> "Dataset18xx":
         """Build dataset from dataset root.
@@ -73,46 +161,197 @@ class Dataset18xx:
             raise IOError(f'Dataset does not exist: {root}')
         return root
 
-    def _invoke_parser(self, file: Path) -> None:
-        # Invoke the parser in a thread-safe manner.
-        trx.TranscriptParser(file, self.game.select()).parse()
+    @functools.cached_property
+    def _raw(self) -> list[Path]:
+        # Walk the dataset only if the raw transcripts are required. Records
+        # of a view are resolved from its game ids without walking.
+        if self._view is None:
+            with profiling.stage('find_raw_transcripts'):
+                return local.find_raw_transcripts(self.root)
+        if self._view['materialized']:
+            root = self.root
+        else:
+            root = self.db.joinpath(self._view['parent'])
+        return [
+            local.raw_file(root, self.game.game(), game_id)
+            for game_id in self._view['game_ids']
+        ]
+
+    def _result_file(self, raw: Path) -> Path:
+        # The columnar final state table of a record, or its CSV.
+        file = local.columnar_file(raw)
+        if not file.exists():
+            file = local.result_file(raw)
+        return file
+
+    def _result_files(self, game_ids: list[int] = None) -> dict[int, Path]:
+        # Map valid game ids to their columnar or CSV final state table.
+        ctx = self.context(valid_only=True)
+        if game_ids is not None:
+            ctx = ctx[ctx.game_id.isin(game_ids)]
+        files = {}
+        for game_id, raw in zip(ctx.game_id, ctx.raw):
+            files[int(game_id)] = self._result_file(Path(raw))
+        return files
+
+    def _record_key(self, raw: Path) -> str | None:
+        # Key of a record in the spill cache, from the manifest of the
+        # dataset, or the default dataset for views.
+        if self._records is None:
+            path = self._manifest_path
+            if self._view is not None:
+                path = self.db.joinpath(self._view['parent'], path.name)
+            self._records = manifest.Manifest(path)
+        digest, parser = self._records.digest(raw), self._records.parser()
+        if digest is None or parser is None:
+            return None
+        return cache.SpillCache.key(digest, parser)
+
+    def _packed_results(self) -> pack.PackedResults | None:
+        # The pack of the dataset, opened once, or None if not packed.
+        if self._packed is None and self._pack_path.exists():
+            self._packed = pack.PackedResults(self._pack_path)
+        return self._packed
+
+    def _cached(self, kind: str, game_id: int, raw: Path, read):
+        # Look up a record in the spill cache, read and spill it on a miss.
+        key = self._record_key(raw) if self._spill is not None else None
+        if key is None:
+            return read()
+        value = self._spill.get(kind, game_id, key)
+        if value is None:
+            value = read()
+            self._spill.put(kind, game_id, key, value)
+        return value
+
+    def _parent_stamp(self) -> list[int] | None:
+        # Size and modification time of the manifest of the default dataset
+        # of a view, which is saved last whenever the default one is made.
+        path = self.db.joinpath(self._view['parent'], self._manifest_path.name)
+        if not path.exists():
+            return None
+        stat = path.stat()
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _view_is_stale(self) -> bool:
+        # Views own their records once copied, their context is only sliced
+        # on creation. Views sharing the records of the default dataset
+        # follow it.
+        materialize = self._view.get(
+            'materialize', 'copy' if self._view['materialized'] else None
+        )
+        if materialize == 'copy':
+            return not self._context_path.exists()
+        return ('parent_manifest' not in self._view
+                or self._view['parent_manifest'] != self._parent_stamp())
+
+    def _slice_view(self) -> None:
+        # Slice the context and metadata index of a view from the default
+        # dataset by the game ids of the view.
+        parent = self.db.joinpath(self._view['parent'])
+        logger.info('Slicing %s from %s', self.root.name, parent.name)
+        stamp = self._parent_stamp()
+        ctx = context_manager.ContextManager(
+            parent.joinpath(self._context_path.name)
+        ).get_context()
+        if not ctx.empty:
+            ctx = ctx[ctx.game_id.isin(self._view['game_ids'])]
+            ctx = ctx.reset_index(drop=True)
+        if self._view['materialized'] and not ctx.empty:
+            raw = [Path(f) for f in ctx.raw]
+            ctx.raw = io.serialize_paths(
+                [self.root.joinpath(f.parent.name, f.name) for f in raw]
+            )
+        self._ctx_manager.add_context(ctx)
+        index = metadata_index.MetadataIndex(
+            parent.joinpath('metadata.parquet')
+        )
+        if index.exists() and not ctx.empty:
+            meta = index.get()
+            meta = meta[meta.game_id.isin(ctx.game_id)].copy()
+            meta.raw = meta.game_id.map(dict(zip(ctx.game_id, ctx.raw)))
+            self._metadata_index.write(meta.reset_index(drop=True))
+        else:
+            self.root.joinpath('metadata.parquet').unlink(missing_ok=True)
+            self._metadata_index = metadata_index.MetadataIndex(
+                self.root.joinpath('metadata.parquet')
+            )
+        self._view['parent_manifest'] = stamp
+        io.write_json(self._view_path, self._view)
+        if self._metadata_path.exists():
+            self.inspect()
 
     def _create_context(self) -> None:
         # Create the context if it does not exist.
         if not self._context_path.exists():
-            context = context_manager.create_context(self._raw)
-            self._ctx_manager.add_context(context)
+            contexts = context_manager.create_context(self._raw)
+            self._ctx_manager.stream_context(contexts, self._raw)
 
     def prune(self):
-        """Delete processed data from the dataset.
+        """Delete processed and derived data from the dataset.
+
+        The definition of a subset, `view.json`, is kept.
         """
+        shutil.rmtree(self.root.joinpath(local.DERIVED_DIR), ignore_errors=True)
         file_list = []
         for root, _, file in os.walk(self.root):
             for f in file:
                 p = Path(root).joinpath(f)
-                if p.suffix in ['.json', '.csv', '.h5']:
+                if p.suffix in _PROCESSED_SUFFIXES and p != self._view_path:
                     file_list.append(p)
         for file in file_list:
             os.remove(file)
 
-    def make(self, force: bool = False) -> pd.DataFrame:
+    def make(self, force: bool = False,
+             to_columnar: bool = False) -> pd.DataFrame:
         """Invokes the transcript parser on the raw transcripts.
 
+        Only new or changed transcripts are parsed, see the dataset's
+        `manifest.json`. Updating the parser leads to parsing all transcripts.
+
         Args:
-            force: Enforce parsing of valid transcripts without errors such as
-                failed verification, missing game finish. Otherwise, only
-                transcripts with noted failures will be parsed.
+            force: Enforce parsing of all transcripts, otherwise only new or
+                changed transcripts will be parsed.
+            to_columnar: Convert the final state tables to Parquet as well,
+                see `read_results`.
 
         Returns:
             The parsed dataset context.
+
+        Note: An existing pack and tensor export of the dataset are removed,
+        see `pack` and `export_tensors`.
         """
-        if not force and self._context_path.exists():
-            file_list = self._ctx_manager.failed_transcripts()
-        else:
+        self._packed = None
+        self._pack_path.unlink(missing_ok=True)
+        shutil.rmtree(self._tensors_path, ignore_errors=True)
+        records = manifest.Manifest(self._manifest_path)
+        if force or not self._context_path.exists():
             file_list = self._raw
-        runner = pooling.PoolRunner(self._invoke_parser, file_list)
-        runner.run()
-        self._create_context()
+        else:
+            with profiling.stage('manifest'):
+                file_list = records.stale(self._raw)
+        target = functools.partial(
+            _invoke_parser, game=self.game, to_columnar=to_columnar
+        )
+        runner = pooling.PoolRunner(target, file_list, ordered=False)
+        with metadata_index.RowWriter() as rows:
+            with profiling.stage('process'):
+                contexts = _split_rows(runner.iterate(), rows)
+                self._ctx_manager.stream_context(contexts, self._raw)
+            if not self._metadata_index.exists():
+                # Records processed before the index existed are read once.
+                parsed = set(file_list)
+                missing = [f for f in self._raw if f not in parsed]
+                if missing:
+                    with profiling.stage('metadata_index'):
+                        for row in metadata_index.read_rows(missing):
+                            rows.write(row)
+        with profiling.stage('metadata_index'):
+            self._metadata_index.merge(rows.frames(), self._raw, file_list)
+        with profiling.stage('manifest'):
+            records.update(self._raw)
+            records.save()
+        self.clear_cache()
         return self._ctx_manager.get_context()
 
     def context(self, valid_only: bool = False) -> pd.DataFrame:
@@ -129,47 +368,176 @@ class Dataset18xx:
             return df[df.valid]
         return df
 
+    def export_context(self, file: Path = None) -> Path:
+        """Export the transcript context to CSV.
+
+        Args:
+            file: The CSV filepath, defaults to None for `context.csv` in the
+                dataset root.
+
+        Returns:
+            The filepath of the exported context.
+        """
+        if file is None:
+            file = self._context_path.with_suffix('.csv')
+        self._create_context()
+        self._ctx_manager.export_csv(file)
+        return file
+
+    def snapshot(self, debug: bool = True) -> dict:
+        """Create a snapshot of the dataset without writing it.
+
+        Args:
+            debug: To include debug data.
+
+        Returns:
+            The snapshot including sizes, distributions and debug data.
+        """
+        self._create_context()
+        return self._ctx_manager.create_snapshot(debug=debug)
+
     def inspect(self) -> dict:
         """Create and write a snapshot of the dataset.
 
+        The debug data also lists the valid transcripts without final state
+        table, e.g. of records not made yet, whose records are checked
+        concurrently, see `io.read_many`.
+
         Returns:
             The snapshot including sizes, distributions, debug data.
         """
-        self._create_context()
-        snapshot = self._ctx_manager.create_snapshot(debug=True)
+        snapshot = self.snapshot(debug=True)
+        ctx = self._ctx_manager.get_context()
+        raw = [] if ctx.empty else ctx[ctx.valid].raw.tolist()
+        found = io.read_many([Path(f) for f in raw], _has_result)
+        snapshot['debug']['missing_results'] = [
+            f for f, exists in zip(raw, found) if not exists
+        ]
         io.write_json(self._metadata_path, snapshot)
         return snapshot
 
-    def subset(self, conf: config.DatasetConfig) -> "Dataset18xx":
+    def _metadata_table(self) -> pd.DataFrame:
+        # The metadata index, built on first access for datasets made before.
+        if not self._metadata_index.exists():
+            self._create_context()
+            rows = metadata_index.read_rows(self._raw)
+            self._metadata_index.update(rows, self._raw)
+        return self._metadata_index.get()
+
+    def _subset_context(self, conf: config.DatasetConfig) -> pd.DataFrame:
+        # Slice the context, joined with the metadata index if required.
+        if conf.needs_metadata():
+            self._ctx_manager.set_metadata(self._metadata_table())
+        return self._ctx_manager.subset_context(conf)
+
+    def metadata(self, conf: config.DatasetConfig = None,
+                 valid_only: bool = True) -> pd.DataFrame:
+        """Get the metadata index, one row per game.
+
+        The index is built by `make` from the metadata of the records, or on
+        first access for datasets made before. It holds the game ending, the
+        winner, the ranks and scores and the flattened final state, e.g.
+        `winner_cash`, `player1_shares_PRR` or `PRR_share_price`.
+
+        Args:
+            conf: The dataset config to filter the games with, defaults to
+                None to include all games.
+            valid_only: To only include valid transcripts.
+
+        Returns:
+            The metadata of the games.
+        """
+        df = self._metadata_table()
+        if df.empty:
+            return df
+        if valid_only:
+            valid = self.context(valid_only=True).game_id
+            df = df[df.game_id.isin(valid)]
+        if conf is not None:
+            df = df[df.game_id.isin(self._subset_context(conf).game_id)]
+        return df.reset_index(drop=True)
+
+    def filter_context(self, conf: config.DatasetConfig) -> pd.DataFrame:
+        """Select the contexts of valid transcripts matching a config.
+
+        In contrast to `subset`, no dataset is created.
+
+        Args:
+            conf: The dataset config, describing desired players, game
+                endings and further filters, see `DatasetConfig`.
+
+        Returns:
+            The contexts of the valid transcripts matching the config.
+        """
+        ctx = self._subset_context(conf)
+        if ctx.empty:
+            return ctx
+        return ctx[ctx.valid].reset_index(drop=True)
+
+    def subset(self, conf: config.DatasetConfig,
+               materialize: str = None) -> "Dataset18xx":
         """Create a subset of the current dataset.
 
         The subset can be created based on the full dataset, not on a subset.
-        Can filter number of players and/or game endings.
+        Can filter number of players, game endings, game id ranges, winner
+        scores, number of actions and the parse and verification results.
+
+        The subset is a view on the records of the full dataset, defined by
+        its game ids in `view.json`. Its context and metadata index are sliced
+        from the full dataset, again on load once the full dataset was made
+        since. Optionally, the records are materialized in the subset, either
+        as hardlinks sharing the content with the full dataset or as copies,
+        which keep the context sliced on creation.
 
         Args:
             conf: The dataset config, i.e. number of players, game endings to
                 keep.
+            materialize: To materialize the records, either `link` or `copy`,
+                defaults to None to create a view only.
 
         Returns:
             The new dataset instance.
         """
         if not isinstance(self.conf, config.DefaultDatasetConfig):
             raise AttributeError('Can only filter default dataset')
+        if materialize not in (None, 'link', 'copy'):
+            raise ValueError(f'Unknown materialization: {materialize}')
         self._create_context()
-        raw_transcripts = self._ctx_manager.filter_context(conf)
+        ctx = self._subset_context(conf)
         target = local.create_root(self.db, self.game.game(), conf.suffix())
         if target.exists():
             raise FileExistsError('Dataset already exists, delete it first.')
         target.mkdir(parents=True, exist_ok=True)
-        for file in tqdm(raw_transcripts):
-            io.copy_record(file, target)
+        if materialize is not None:
+            raw = [Path(f) for f in ctx.raw]
+            io.copy_many(
+                raw, target, link=materialize == 'link', progress=True
+            )
+        view = {
+            'parent': self.root.name,
+            'game_ids': [int(g) for g in ctx.game_id],
+            'materialized': materialize is not None,
+            'materialize': materialize
+        }
+        io.write_json(target.joinpath(self._view_path.name), view)
+        # The context and metadata index are sliced on load of the view.
         new_ds = Dataset18xx(self.db, self.game, conf)
         new_ds.inspect()
         return new_ds
 
+    def _raw_transcript(self, game_id: int) -> Path:
+        # The raw transcript of a valid game.
+        transcript = self._ctx_manager.raw_transcript(game_id)
+        if transcript is None:
+            raise ValueError(f'Game ID {game_id} does not exist or is invalid.')
+        return Path(transcript)
+
     def load(self, game_id: int) -> trx.TranscriptContext:
         """Load a transcript context.
 
+        Loaded contexts are kept in an LRU cache and, if configured, in the
+        spill cache. Note that cached contexts are shared between callers.
+
         Args:
             game_id: The game id to load context from.
 
@@ -179,7 +547,288 @@ class Dataset18xx:
         Raises:
             ValueError: If game id does not exist of transcript is invalid.
         """
-        transcript = self._ctx_manager.raw_transcript(game_id)
-        if transcript is None:
-            raise ValueError(f'Game ID {game_id} does not exist or is invalid.')
-        return trx.TranscriptContext.from_raw(Path(transcript))
+        ctx = self._cache.get(('context', game_id))
+        if ctx is None:
+            raw = self._raw_transcript(game_id)
+            ctx = self._cached(
+                'context', game_id, raw,
+                lambda: trx.TranscriptContext.from_raw(raw)
+            )
+            self._cache.put(('context', game_id), ctx)
+        return ctx
+
+    def result(self, game_id: int, columns: list[str] = None) -> pd.DataFrame:
+        """Load the final state table of a game.
+
+        Slices the table from the pack if available, see `pack`, otherwise
+        reads the columnar file if available, or the CSV file. Loaded tables
+        are cached as `load` does. A copy of the cached table is returned,
+        hence callers may modify it.
+
+        Args:
+            game_id: The game id to load the final state from.
+            columns: The columns to read, defaults to None for all columns.
+
+        Returns:
+            The final state table.
+
+        Raises:
+            ValueError: If game id does not exist or transcript is invalid.
+        """
+        key = ('result', game_id, None if columns is None else tuple(columns))
+        df = self._cache.get(key)
+        if df is None:
+            raw = self._raw_transcript(game_id)
+            packed = self._packed_results()
+            if packed is not None and game_id in packed:
+                table = packed.result(game_id, columns)
+            else:
+                file = self._result_file(raw)
+                table = self._cached(
+                    'result', game_id, raw, lambda: columnar.read_table(file)
+                )
+                if columns is not None:
+                    table = table.select(
+                        [c for c in columns if c in table.column_names]
+                    )
+            df = table.to_pandas()
+            self._cache.put(key, df)
+        return df.copy()
+
+    def _resolve(self, game_ids: list[int]) -> dict[int, str]:
+        # Resolve the raw transcripts of valid games in one pass.
+        found = self._ctx_manager.raw_transcripts(game_ids)
+        missing = [g for g in game_ids if g not in found]
+        if missing:
+            raise ValueError(
+                f'Game IDs {missing[:10]} do not exist or are invalid.'
+            )
+        return found
+
+    def _iter_results(self, found: dict[int, str], columns: list[str] | None,
+                      processes: int | None) -> Iterator[tuple]:
+        # Yield cached tables first, read the others through the pool, or
+        # through threads for few tables.
+        key = None if columns is None else tuple(columns)
+        items = []
+        for game_id, raw in found.items():
+            df = self._cache.get(('result', game_id, key))
+            if df is not None:
+                yield game_id, df
+            else:
+                file = self._result_file(Path(raw))
+                items.append((game_id, file, columns))
+        if len(items) < _MIN_PARALLEL or processes == 1:
+            read = functools.partial(_read_frame, columns=columns)
+            frames = io.read_many([file for _, file, _ in items], read)
+            results = zip([game_id for game_id, _, _ in items], frames)
+        else:
+            runner = pooling.PoolRunner(
+                _read_result, items, processes=processes, progress=False
+            )
+            results = runner.iterate()
+        for game_id, df in results:
+            self._cache.put(('result', game_id, key), df)
+            yield game_id, df
+
+    def load_many(self, game_ids: Iterable[int], columns: list[str] = None,
+                  concat: bool = False, processes: int = None):
+        """Load the final state tables of many games at once.
+
+        The game ids are resolved in one pass over the context index. Tables
+        not cached are read in parallel through the pool, or on threads for
+        few tables, or sliced from the pack if available and `concat` is set,
+        see `pack`.
+
+        Args:
+            game_ids: The game ids to load.
+            columns: The columns to read, defaults to None for all columns.
+            concat: To return one frame instead of a generator.
+            processes: The number of worker processes, defaults to None to use
+                `default_processes`.
+
+        Returns:
+            A generator of game id and final state table pairs, cached tables
+            first, or the concatenated frame with the game id as first column
+            if `concat` is set.
+
+        Raises:
+            ValueError: If a game id does not exist or is invalid.
+        """
+        game_ids = list(dict.fromkeys(int(g) for g in game_ids))
+        found = self._resolve(game_ids)
+        packed = self._packed_results()
+        if concat and packed is not None:
+            return packed.read(list(found), columns)
+        results = self._iter_results(found, columns, processes)
+        if not concat:
+            # Cached tables are copied, such that callers may modify them.
+            return ((game_id, df.copy()) for game_id, df in results)
+        frames = []
+        for game_id, df in results:
+            frames.append(df.assign(game_id=game_id))
+        if not frames:
+            return pd.DataFrame(columns=['game_id'] + list(columns or []))
+        df = pd.concat(frames, ignore_index=True)
+        return df[['game_id'] + [c for c in df.columns if c != 'game_id']]
+
+    def aggregate(self, columns: list[str], by: list[str] = None,
+                  rows: str = 'all', game_ids: list[int] = None,
+                  processes: int = None) -> pd.DataFrame:
+        """Compute group-by statistics across the valid transcripts.
+
+        Each game is mapped to partial aggregates in parallel, which are merged
+        to the statistics. The partials are cached in
+        `.datasets18xx/aggregates` in the dataset root per query and game, and
+        only recomputed for records that changed since, see `aggregation`.
+
+        Args:
+            columns: The numeric columns to aggregate, e.g. `['winner_cash']`
+                for the cash of the winner with `rows='last'`.
+            by: The columns to group by, of the final state table, e.g.
+                `phase`, or of the context, e.g. `num_players`.
+            rows: The rows of each game to aggregate, `all` or `last`.
+            game_ids: The game ids to aggregate, defaults to None for all
+                valid transcripts.
+            processes: The number of worker processes, defaults to None to use
+                `default_processes`.
+
+        Returns:
+            The statistics, one row per group and column.
+
+        Raises:
+            ValueError: If the rows to aggregate are unknown.
+        """
+        if rows not in aggregation.ROWS:
+            raise ValueError(f'Unknown rows to aggregate: {rows}')
+        by = list(by or [])
+        ctx = self.context(valid_only=True)
+        if game_ids is not None:
+            ctx = ctx[ctx.game_id.isin(game_ids)]
+        ctx_by = [c for c in by if c in ctx.columns and c != 'game_id']
+        query = aggregation.Query(
+            tuple(columns), tuple(c for c in by if c not in ctx_by), rows
+        )
+        partial_cache = aggregation.PartialCache(self._aggregates_path, query)
+        cached = partial_cache.read()
+        partials, records, items = {}, {}, []
+        for game_id, raw in zip(ctx.game_id, ctx.raw):
+            game_id, raw = int(game_id), Path(raw)
+            records[game_id] = self._record_key(raw)
+            hit = cached.get(game_id)
+            if hit is not None and hit[0] == records[game_id]:
+                partials[game_id] = hit
+            else:
+                items.append((game_id, self._result_file(raw), query))
+        if len(items) < _MIN_PARALLEL or processes == 1:
+            results = map(aggregation.partial_of_file, items)
+        else:
+            runner = pooling.PoolRunner(
+                aggregation.partial_of_file, items, processes=processes,
+                progress=False
+            )
+            results = runner.iterate()
+        for game_id, df in results:
+            partials[game_id] = (records[game_id], df)
+        if items:
+            partial_cache.write({**cached, **partials})
+        logger.info('Aggregated %d games, %d from cache',
+                    len(partials), len(partials) - len(items))
+        frames = [df.assign(game_id=g) for g, (_, df) in partials.items()]
+        if not frames:
+            return aggregation.reduce(pd.DataFrame(), by)
+        df = pd.concat(frames, ignore_index=True)
+        if ctx_by:
+            groups = ctx[['game_id'] + ctx_by].astype({'game_id': int})
+            df = df.merge(groups, on='game_id')
+        return aggregation.reduce(df, by)
+
+    def clear_cache(self) -> None:
+        """Drop the records cached in memory, e.g. after external changes.
+
+        Note: `make` clears the cache. The spill cache needs no invalidation,
+        since its entries are keyed by transcript hash and parser version.
+        """
+        self._cache.clear()
+        self._records = None
+        self._packed = None
+
+    def cache_info(self) -> dict:
+        """The statistics of the in-memory record cache.
+
+        Returns:
+            The hits, misses, number and estimated size of cached records.
+        """
+        return self._cache.info()
+
+    def read_results(self, columns: list[str] = None,
+                     game_ids: list[int] = None,
+                     filters: pds.Expression = None) -> pd.DataFrame:
+        """Read the final state tables of valid transcripts.
+
+        Uses the pack created with `pack` if available. Otherwise, uses the
+        columnar files created with `make(to_columnar=True)` and falls back to
+        the CSV files for records without one. Only the requested columns are
+        read and records not matching the game ids are not opened.
+
+        Args:
+            columns: The columns to read, e.g. `['player1_cash']`, defaults to
+                None for all columns.
+            game_ids: The game ids to read, defaults to None for all valid
+                transcripts.
+            filters: The predicate on the rows to read, e.g.
+                `pyarrow.dataset.field('type') == 'Bid'`, defaults to None.
+
+        Returns:
+            The concatenated final states, with the game id as first column.
+        """
+        packed = self._packed_results()
+        if packed is not None:
+            return packed.read(game_ids, columns, filters)
+        files = self._result_files(game_ids)
+        return columnar.read_results(files, columns, filters)
+
+    def pack(self) -> Path:
+        """Pack the final state tables of valid transcripts into one file.
+
+        The pack is a single Arrow IPC file, memory-mapped by `read_results`,
+        `load_many` and `result` to slice games without opening the
+        individual records. It is removed when the dataset is made again.
+
+        Returns:
+            The filepath of the pack.
+        """
+        self._create_context()
+        self._packed = None
+        pack.pack(self._result_files(), self._pack_path)
+        self._cache.clear()
+        return self._pack_path
+
+    def export_tensors(self) -> Path:
+        """Export the final state tables of valid transcripts to tensors.
+
+        The per-player and per-company columns are stacked into fixed-schema
+        arrays, privates are encoded as multi-hot vectors. The bundle is
+        removed when the dataset is made again, see `tensors.export` for its
+        layout.
+
+        Returns:
+            The folder of the bundle.
+        """
+        self._create_context()
+        shutil.rmtree(self._tensors_path, ignore_errors=True)
+        tensors.export(self._result_files(), self._tensors_path)
+        return self._tensors_path
+
+    def read_tensors(self) -> tensors.TensorBundle:
+        """Open the tensor bundle created with `export_tensors`.
+
+        Returns:
+            The memory-mapped bundle.
+
+        Raises:
+            IOError: If the tensors were not exported yet.
+        """
+        if not self._tensors_path.exists():
+            raise IOError(f'No tensors exported: {self._tensors_path}')
+        return tensors.TensorBundle(self._tensors_path)
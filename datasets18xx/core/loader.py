@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Streaming loader
+
+Module implements a streaming loader for training on a processed dataset. It
+yields fixed-size batches of the per-action state rows of the final state
+tables as NumPy arrays, with shuffle buffers, sharding by game id and
+background prefetching. PyTorch is not required. To use the loader with a
+`torch.utils.data.DataLoader`, wrap it in an `IterableDataset` and disable
+the automatic batching:
+
+    class Stream(torch.utils.data.IterableDataset):
+        def __iter__(self):
+            return iter(loader)
+
+    DataLoader(Stream(), batch_size=None, num_workers=4)
+
+The games are then sharded across the DataLoader workers as well.
+"""
+import logging
+import sys
+
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .dataset import Dataset18xx
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_info(worker_id: int, num_workers: int) -> tuple[int, int]:
+    # The worker of a torch DataLoader, without importing torch.
+    if 'torch' in sys.modules:
+        info = sys.modules['torch'].utils.data.get_worker_info()
+        if info is not None:
+            return info.id, info.num_workers
+    return worker_id, num_workers
+
+
+class StreamingLoader:
+    """StreamingLoader
+
+    Class implements an iterable over batches of state rows of a dataset.
+    Each batch maps the columns and `game_id` to NumPy arrays of length
+    `batch_size`. Numeric columns are cast to `dtype`, other columns are
+    returned as object arrays.
+
+    The valid games are ordered, shuffled per epoch if `shuffle_buffer` is
+    set, and split into disjoint shards across nodes (`rank`, `world_size`)
+    and worker processes (`worker_id`, `num_workers`). Rows are shuffled
+    across games within a buffer of `shuffle_buffer` rows. Final state tables
+    are read ahead by `prefetch` threads.
+
+    Args:
+        ds: The processed dataset.
+        batch_size: The number of rows per batch.
+        columns: The columns to load, defaults to None to use the columns of
+            the first game. Columns missing in a game are filled with NaN.
+        game_ids: The games to load, defaults to None for all valid games.
+        shuffle_buffer: The number of rows to shuffle within, defaults to 0
+            to keep the order of the games and rows.
+        seed: The seed of the shuffling, identical on all shards.
+        rank: The index of the node.
+        world_size: The number of nodes.
+        worker_id: The index of the worker process on the node, taken from
+            torch if loaded within a DataLoader worker.
+        num_workers: The number of worker processes on the node.
+        prefetch: The number of threads reading ahead, 0 to read inline.
+        drop_last: To drop the last batch if incomplete.
+        dtype: The type of the numeric columns.
+    """
+
+    def __init__(self, ds: Dataset18xx, batch_size: int,
+                 columns: list[str] = None, game_ids: list[int] = None,
+                 shuffle_buffer: int = 0, seed: int = 0, rank: int = 0,
+                 world_size: int = 1, worker_id: int = 0,
+                 num_workers: int = 1, prefetch: int = 4,
+                 drop_last: bool = False, dtype=np.float32):
+        if not 0 <= rank < world_size or not 0 <= worker_id < num_workers:
+            raise ValueError('Shard index out of range')
+        self.ds = ds
+        self.batch_size = batch_size
+        self.columns = None if columns is None else list(columns)
+        self.game_ids = game_ids
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.rank = rank
+        self.world_size = world_size
+        self.worker_id = worker_id
+        self.num_workers = num_workers
+        self.prefetch = prefetch
+        self.drop_last = drop_last
+        self.dtype = dtype
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int) -> None:
+        """Set the epoch to shuffle the games and rows differently.
+
+        Args:
+            epoch: The epoch, identical on all shards.
+        """
+        self.epoch = epoch
+
+    def shard(self) -> list[int]:
+        """The game ids of the shard of this loader in the current epoch.
+
+        Returns:
+            The game ids to load, in order.
+        """
+        if self.game_ids is None:
+            ctx = self.ds.context(valid_only=True)
+            game_ids = sorted(int(g) for g in ctx.game_id)
+        else:
+            game_ids = sorted(int(g) for g in self.game_ids)
+        if self.shuffle_buffer:
+            rng = np.random.default_rng([self.seed, self.epoch])
+            game_ids = [game_ids[i] for i in rng.permutation(len(game_ids))]
+        worker_id, num_workers = _worker_info(
+            self.worker_id, self.num_workers
+        )
+        index = self.rank * num_workers + worker_id
+        return game_ids[index::self.world_size * num_workers]
+
+    def _read(self, game_id: int, columns: list[str]) -> dict:
+        # Read the state rows of a game as arrays, missing columns as NaN.
+        # Arrays are copied, such that batches never alias cached tables.
+        df = self.ds.result(game_id, columns)
+        rows = len(df)
+        arrays = {'game_id': np.full(rows, game_id, dtype=np.int64)}
+        for col in columns:
+            if col not in df.columns:
+                arrays[col] = np.full(rows, np.nan, dtype=self.dtype)
+            elif pd.api.types.is_numeric_dtype(df[col].dtype):
+                arrays[col] = df[col].to_numpy(
+                    dtype=self.dtype, copy=True, na_value=np.nan
+                )
+            else:
+                arrays[col] = df[col].to_numpy(dtype=object, copy=True)
+        return arrays
+
+    def _tables(self, game_ids: list[int],
+                columns: list[str]) -> Iterator[dict]:
+        # Read the games in order, with a bounded number read ahead.
+        if not self.prefetch:
+            for game_id in game_ids:
+                yield self._read(game_id, columns)
+            return
+        with ThreadPoolExecutor(self.prefetch) as executor:
+            pending = deque()
+            for game_id in game_ids:
+                pending.append(
+                    executor.submit(self._read, game_id, columns)
+                )
+                if len(pending) > self.prefetch:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def __iter__(self) -> Iterator[dict[str, np.ndarray]]:
+        game_ids = self.shard()
+        if not game_ids:
+            return
+        columns = self.columns
+        if columns is None:
+            columns = list(self.ds.result(game_ids[0]).columns)
+        rng = np.random.default_rng([self.seed, self.epoch, self.rank])
+        threshold = max(self.shuffle_buffer, self.batch_size)
+        buffer = None
+        for arrays in self._tables(game_ids, columns):
+            buffer = arrays if buffer is None else {
+                k: np.concatenate([v, arrays[k]]) for k, v in buffer.items()
+            }
+            while len(buffer['game_id']) >= threshold:
+                buffer, batch = self._take(buffer, rng)
+                yield batch
+        while buffer is not None and len(buffer['game_id']) and (
+                len(buffer['game_id']) >= self.batch_size or
+                not self.drop_last
+        ):
+            buffer, batch = self._take(buffer, rng)
+            yield batch
+
+    def _take(self, buffer: dict, rng: np.random.Generator) -> tuple:
+        # Take a batch from the buffer, at random if shuffling.
+        size = len(buffer['game_id'])
+        n = min(self.batch_size, size)
+        if not self.shuffle_buffer:
+            return (
+                {k: v[n:] for k, v in buffer.items()},
+                {k: v[:n] for k, v in buffer.items()}
+            )
+        # Move the rows at the end of the buffer into the picked slots.
+        picked = rng.choice(size, n, replace=False)
+        holes = picked[picked < size - n]
+        tail = np.ones(n, dtype=bool)
+        tail[picked[picked >= size - n] - (size - n)] = False
+        fillers = np.arange(size - n, size)[tail]
+        batch = {}
+        for k, v in buffer.items():
+            batch[k] = v[picked]
+            v[holes] = v[fillers]
+        return {k: v[:size - n] for k, v in buffer.items()}, batch
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Manifest
+
+Module implements a manifest of the raw transcripts of a dataset, i.e. their
+content hashes and the parser version they were processed with. It is used
+to only process new or changed transcripts.
+"""
+import json
+import logging
+
+from importlib import metadata
+from pathlib import Path
+
+from ..io import io
+
+logger = logging.getLogger(__name__)
+
+
+def parser_version() -> str:
+    """The version of the installed transcript parser.
+
+    Includes the commit if the parser was installed from a repository, since
+    the package version is not bumped for every change.
+
+    Returns:
+        The parser version, or `unknown` if the parser is not installed.
+    """
+    try:
+        dist = metadata.distribution('transcripts18xx')
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+    version = dist.version
+    direct_url = dist.read_text('direct_url.json')
+    if direct_url:
+        commit = json.loads(direct_url).get('vcs_info', {}).get('commit_id')
+        if commit:
+            version += '+' + commit
+    return version
+
+
+class Manifest:
+    """Manifest
+
+    Class implements the manifest of the processed raw transcripts. Each
+    transcript is recorded with its content hash. File size and modification
+    time are kept to skip hashing of untouched files.
+
+    Args:
+        path: Path to the dataset's manifest file.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        if self._path.exists():
+            content = io.read_json(self._path)
+        else:
+            content = {}
+        self._parser = content.get('parser')
+        self._entries = content.get('transcripts', {})
+        self._hashes = {}
+
+    @staticmethod
+    def _stat(file: Path) -> dict:
+        # File attributes to detect untouched files without hashing.
+        stat = file.stat()
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def _hash(self, file: Path) -> str:
+        # Hash each file at most once per manifest instance.
+        if file not in self._hashes:
+            self._hashes[file] = io.file_hash(file)
+        return self._hashes[file]
+
+    def _untouched(self, file: Path) -> bool:
+        # Check the file attributes against the manifest entry.
+        entry = self._entries.get(file.name)
+        if entry is None:
+            return False
+        return all(entry[k] == v for k, v in self._stat(file).items())
+
+    def _hash_many(self, file_list: list[Path]) -> None:
+        # Hash the new and touched files in one concurrent batch, such that
+        # the latency of reading many small files overlaps.
+        files = [
+            f for f in file_list
+            if f not in self._hashes and not self._untouched(f)
+        ]
+        for file, digest in zip(files, io.read_many(files, io.file_hash)):
+            self._hashes[file] = digest
+
+    def _changed(self, file: Path) -> bool:
+        # Check a transcript against its manifest entry.
+        entry = self._entries.get(file.name)
+        if entry is None:
+            return True
+        if self._untouched(file):
+            return False
+        return entry['sha256'] != self._hash(file)
+
+    def parser(self) -> str | None:
+        """The parser version the manifest was recorded with.
+
+        Returns:
+            The parser version or None for a new manifest.
+        """
+        return self._parser
+
+    def stale(self, file_list: list[Path]) -> list[Path]:
+        """Find the transcripts to process.
+
+        Args:
+            file_list: The raw transcripts of the dataset.
+
+        Returns:
+            The transcripts which are new or changed since recorded. All
+            transcripts if the parser version changed.
+        """
+        if self._parser != parser_version():
+            return list(file_list)
+        self._hash_many(file_list)
+        return [f for f in file_list if self._changed(f)]
+
+    def update(self, file_list: list[Path]) -> None:
+        """Record processed transcripts with the current parser version.
+
+        Note: All recorded transcripts not part of the file list are removed,
+        hence the full list of raw transcripts must be passed.
+
+        Args:
+            file_list: The raw transcripts of the dataset.
+        """
+        self._hash_many(file_list)
+        entries = {}
+        for file in file_list:
+            entry = self._entries.get(file.name)
+            if entry is None or self._changed(file):
+                entry = {'sha256': self._hash(file)}
+            entry.update(self._stat(file))
+            entries[file.name] = entry
+        self._entries = entries
+        self._parser = parser_version()
+
+    def save(self) -> None:
+        """Write the manifest to disk."""
+        content = {'parser': self._parser, 'transcripts': self._entries}
+        io.write_json(self._path, content)
+
+    def digest(self, file: Path) -> str | None:
+        """The recorded content hash of a transcript.
+
+        Args:
+            file: The raw transcript filepath.
+
+        Returns:
+            The content hash or None if the transcript is not recorded.
+        """
+        entry = self._entries.get(file.name)
+        if entry is None:
+            return None
+        return entry['sha256']
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Metadata index
+
+Module implements a consolidated index of the processed metadata of the
+records of a dataset, i.e. one row per game flattened from its
+`<game>_<id>_metadata.json`. It holds the game ending, the ranking and scores,
+the winner and the flattened final state, e.g. `player1_cash`,
+`player1_shares_PRR` or `PRR_trains_D`, and the number of actions, such that
+filters on results do not open the records.
+"""
+import logging
+import re
+
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+import pandas as pd
+
+from ..io import columnar, io, local
+from ..utils import pooling, profiling
+
+logger = logging.getLogger(__name__)
+
+PLAYER_ID = re.compile(r'player\d+')
+"""Ids the parser maps the player names to, e.g. `player1`."""
+
+
+def _flatten(obj: dict, prefix: str, row: dict) -> None:
+    # Flatten nested dicts, joining the keys with underscores.
+    for key, value in obj.items():
+        if key == 'name':
+            continue
+        name = f'{prefix}_{key}'
+        if isinstance(value, dict):
+            _flatten(value, name, row)
+        else:
+            row[name] = value
+
+
+def flatten(meta: dict) -> dict:
+    """Flatten the metadata of a record to a row of the index.
+
+    Args:
+        meta: The content of the metadata JSON.
+
+    Players are keyed by their `playerN` id. Names the parser failed to map
+    to an id, e.g. of players who left the game, are skipped, such that they
+    do not add sparse columns to the index.
+
+    Returns:
+        The flat row, with the game id, game ending, winner, ranks and scores
+        of the players and the flattened final state.
+    """
+    result = meta.get('result') or {}
+    winner = meta.get('winner')
+    row = {
+        'game_id': int(meta['id']),
+        'game': meta.get('game'),
+        'num_players': meta.get('num_players'),
+        'game_ending': meta.get('finished'),
+        'parse_result': meta.get('parse_result'),
+        'verified': (meta.get('verification') or {}).get('success'),
+        'winner': winner,
+        'winner_score': result.get(winner)
+    }
+    final_state = meta.get('final_state') or {}
+    players = final_state.get('players') or {}
+    if winner in players:
+        row['winner_cash'] = players[winner].get('cash')
+        row['winner_value'] = players[winner].get('value')
+    for rank, (player, score) in enumerate(result.items(), start=1):
+        if PLAYER_ID.fullmatch(player):
+            row[f'{player}_rank'] = rank
+            row[f'{player}_score'] = score
+    for name, player in players.items():
+        if PLAYER_ID.fullmatch(name):
+            _flatten(player, name, row)
+    for name, company in (final_state.get('companies') or {}).items():
+        _flatten(company, name, row)
+    return row
+
+
+def read_row(raw: Path, num_actions: int = None) -> dict | None:
+    """Read the metadata of a record as row of the index.
+
+    Args:
+        raw: The raw transcript of the record.
+        num_actions: The number of actions if known, e.g. from converting the
+            final state table, defaults to None to count the rows of the
+            final state table.
+
+    Returns:
+        The flat row, see `flatten`, with the number of actions of the
+        final state table, or None if the record has no metadata.
+    """
+    file = local.metadata_file(raw)
+    if not file.exists():
+        return None
+    row = flatten(io.read_json(file))
+    if num_actions is None:
+        for table in (local.columnar_file(raw), local.result_file(raw)):
+            if table.exists():
+                num_actions = columnar.num_rows(table)
+                break
+    if num_actions is not None:
+        row['num_actions'] = num_actions
+    row['raw'] = io.unix_path(raw)
+    return row
+
+
+def read_rows(file_list: list[Path]) -> Iterator[dict]:
+    """Read the metadata of several records in parallel.
+
+    Args:
+        file_list: The raw transcripts of the records.
+
+    Yields:
+        The flat rows of the records with metadata.
+    """
+    runner = pooling.PoolRunner(
+        read_row, file_list, ordered=False, progress=False
+    )
+    for row in runner.iterate():
+        if row is not None:
+            yield row
+
+
+class RowWriter:
+    """RowWriter
+
+    Class implements a writer to collect rows of the index in batches. Each
+    full batch is converted into a columnar frame, such that only one batch
+    of flat rows is kept in memory. The batches are discarded if writing
+    fails.
+
+    Args:
+        batch_size: The number of rows to buffer before converting.
+    """
+
+    def __init__(self, batch_size: int = 1000):
+        self._batch_size = batch_size
+        self._batch = []
+        self._frames = []
+        self._written = 0
+
+    def __enter__(self) -> "RowWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.flush()
+            return
+        self._batch = []
+        self._frames = []
+
+    def __len__(self) -> int:
+        return self._written + len(self._batch)
+
+    def write(self, row: dict) -> None:
+        """Add a row to the current batch.
+
+        Args:
+            row: The flat row, see `read_row`.
+        """
+        self._batch.append(row)
+        if len(self._batch) >= self._batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Convert the buffered rows into a new batch frame."""
+        if not self._batch:
+            return
+        self._frames.append(pd.DataFrame(self._batch))
+        self._written += len(self._batch)
+        self._batch = []
+
+    def frames(self) -> list[pd.DataFrame]:
+        """Get the batch frames of all written rows.
+
+        Returns:
+            The batch frames in order of writing.
+        """
+        return list(self._frames)
+
+
+class MetadataIndex:
+    """MetadataIndex
+
+    Class implements the metadata index of a dataset, stored as Parquet file.
+    The index is read on first access.
+
+    Args:
+        path: Path to the dataset's Parquet metadata index.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._df = None
+
+    def exists(self) -> bool:
+        """Check if the index was created.
+
+        Returns:
+            True if the index file exists.
+        """
+        return self._path.exists()
+
+    def get(self) -> pd.DataFrame:
+        """Get the metadata index.
+
+        Returns:
+            The index, one row per game, empty if not created.
+        """
+        if self._df is None:
+            if self.exists():
+                profiling.count_file('bytes_read', self._path)
+                self._df = pd.read_parquet(self._path)
+            else:
+                self._df = pd.DataFrame()
+        return self._df
+
+    def write(self, df: pd.DataFrame) -> None:
+        """Write the metadata index, replacing the existing one.
+
+        Args:
+            df: The index.
+        """
+        df.to_parquet(self._path, index=False)
+        profiling.count_file('bytes_written', self._path)
+        self._df = df
+
+    def update(self, rows: Iterable[dict], file_list: list[Path],
+               stale: list[Path] = None) -> None:
+        """Merge the rows of new or changed records into the index.
+
+        Existing rows of the same or stale records are replaced, rows of
+        records no longer part of the dataset are removed. The index is sorted
+        by raw transcript.
+
+        Args:
+            rows: The rows of the new or changed records, see `read_row`.
+            file_list: The raw transcripts of the dataset.
+            stale: The raw transcripts of the new or changed records, whose
+                rows are removed even if they have no metadata anymore.
+        """
+        with RowWriter() as writer:
+            for row in rows:
+                writer.write(row)
+        self.merge(writer.frames(), file_list, stale)
+
+    def merge(self, frames: list[pd.DataFrame], file_list: list[Path],
+              stale: list[Path] = None) -> None:
+        """Merge batch frames of new or changed records into the index.
+
+        See `update`, with the rows converted in batches, e.g. by a
+        `RowWriter`, and merged in a single concatenation.
+
+        Args:
+            frames: The batch frames of the new or changed records.
+            file_list: The raw transcripts of the dataset.
+            stale: The raw transcripts of the new or changed records, whose
+                rows are removed even if they have no metadata anymore.
+        """
+        # Empty frames are left out, their columns may have no type.
+        frames = [df for df in frames if not df.empty]
+        current = self.get()
+        if not current.empty:
+            keep = current.raw.isin(io.serialize_paths(file_list))
+            if stale:
+                keep &= ~current.raw.isin(io.serialize_paths(stale))
+            for df in frames:
+                keep &= ~current.raw.isin(df.raw)
+            if keep.any():
+                frames.insert(0, current[keep])
+        if not frames:
+            self.write(current.iloc[:0])
+            return
+        df = pd.concat(frames, ignore_index=True)
+        # Records failing to parse have no number of players.
+        df.num_players = df.num_players.astype('Int64')
+        self.write(df.sort_values('raw', ignore_index=True))
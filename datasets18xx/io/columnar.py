@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Columnar module
+
+Module implements a columnar store for the processed final state tables. The
+tables are converted to typed Parquet files with dictionary-encoded
+categoricals and can be read with column projection and predicate pushdown.
+"""
+import logging
+
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.dataset as pds
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+CATEGORICALS = ('type', 'parent', 'company', 'player', 'major_round')
+"""Columns of the final state table stored as dictionary-encoded strings."""
+
+_CATEGORICAL_SUFFIXES = ('_privates', '_president')
+
+
+def _is_categorical(name: str) -> bool:
+    # Low cardinality string columns, e.g. the `{}` literals of privates.
+    return name in CATEGORICALS or name.endswith(_CATEGORICAL_SUFFIXES)
+
+
+def read_csv(file: Path, columns: list[str] = None) -> pa.Table:
+    """Read a final state table from CSV into a typed table.
+
+    Args:
+        file: The final state CSV filepath.
+        columns: The columns to read, defaults to None for all columns.
+
+    Returns:
+        The typed table with categorical columns dictionary-encoded.
+    """
+    table = pv.read_csv(
+        file,
+        convert_options=pv.ConvertOptions(
+            strings_can_be_null=True,
+            include_columns=columns
+        )
+    )
+    for i, field in enumerate(table.schema):
+        if _is_categorical(field.name) and pa.types.is_string(field.type):
+            table = table.set_column(
+                i, field.name, table.column(i).dictionary_encode()
+            )
+    return table
+
+
+def convert(file: Path, out: Path) -> int:
+    """Convert a final state table from CSV to Parquet.
+
+    Args:
+        file: The final state CSV filepath.
+        out: The Parquet filepath to write to.
+
+    Returns:
+        The number of rows converted, i.e. the number of actions.
+    """
+    table = read_csv(file)
+    pq.write_table(table, out)
+    return table.num_rows
+
+
+def read_table(file: Path, columns: list[str] = None,
+               filters: pds.Expression = None) -> pa.Table:
+    """Read a final state table with projection and pushdown.
+
+    Parquet files are read with row group statistics to skip data not matching
+    the filter. CSV files are supported as fallback for records not yet
+    converted. Requested columns not present in the table, e.g. `player6_cash`
+    in a 4-player game, are ignored.
+
+    Args:
+        file: The final state filepath, either Parquet or CSV.
+        columns: The columns to read, defaults to None for all columns.
+        filters: The predicate on the rows to read, defaults to None.
+
+    Returns:
+        The table with the projected columns and filtered rows.
+    """
+    if file.suffix == '.parquet':
+        dataset = pds.dataset(file, format='parquet')
+    else:
+        dataset = pds.dataset(read_csv(file))
+    if columns is not None:
+        columns = [c for c in columns if c in dataset.schema.names]
+    return dataset.to_table(columns=columns, filter=filters)
+
+
+def num_rows(file: Path) -> int:
+    """Count the rows of a final state table, i.e. the number of actions.
+
+    Parquet files are counted from their footer, CSV files are read with a
+    single column.
+
+    Args:
+        file: The final state filepath, either Parquet or CSV.
+
+    Returns:
+        The number of rows.
+    """
+    if file.suffix == '.parquet':
+        return pq.ParquetFile(file).metadata.num_rows
+    with open(file, newline='') as f:
+        first = f.readline().split(',', 1)[0].strip()
+    options = pv.ConvertOptions(include_columns=[first])
+    return pv.read_csv(file, convert_options=options).num_rows
+
+
+def read_results(files: dict[int, Path], columns: list[str] = None,
+                 filters: pds.Expression = None) -> pd.DataFrame:
+    """Read the final state tables of several records into one frame.
+
+    Args:
+        files: The final state filepaths mapped to their game id.
+        columns: The columns to read, defaults to None for all columns.
+        filters: The predicate on the rows to read, defaults to None.
+
+    Returns:
+        The concatenated frame, with the game id as first column.
+    """
+    tables = []
+    for game_id, file in files.items():
+        table = read_table(file, columns, filters)
+        game_ids = pa.array([game_id] * table.num_rows, type=pa.int64())
+        tables.append(table.add_column(0, 'game_id', game_ids))
+    if not tables:
+        return pd.DataFrame(columns=['game_id'] + list(columns or []))
+    # Types may differ between records, e.g. phases `3` and `3+D`.
+    return pd.concat([t.to_pandas() for t in tables], ignore_index=True)
@@ -5,13 +5,29 @@
 Module implements functions to download the database and provides a default
 entry point to it.
 """
-import tarfile
-import os.path
+import contextlib
+import hashlib
 import io
+import json
+import os.path
+import shutil
+import tarfile
 
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+from . import local
+from .io import file_hash, read_json, read_many, write_json
 
-import requests
+CHUNK_SIZE = 1 << 20
+"""Number of bytes read at once while downloading."""
+
+WRITE_THREADS = 8
+"""Default number of threads writing extracted members to disk."""
 
 
 def database() -> Path:
@@ -45,30 +61,396 @@ def create_url() -> str:
     return f'https://{domain}/{user}/{repo}/raw/main/{file}'
 
 
-def download(url: str) -> requests.Response:
-    """Download the database tarball.
+def create_manifest_url() -> str:
+    """Creates the URL to download the database manifest.
 
-    Args:
-        url: The URL from which to download the file.
+    The manifest maps the path of each raw transcript in the database to the
+    SHA-256 checksum of its content, e.g.
+    `{"transcripts": {"1830/1830_123/1830_123.txt": "<sha256>"}}`.
 
     Returns:
-        The response from the get request.
+        The url to the manifest located in records18xx package.
     """
-    req = requests.get(url, stream=True)
+    return create_url().replace('database.tar.gz', 'manifest.json')
+
+
+def _target(out: Path, name: str) -> Path:
+    # Resolve a member of the database, refusing paths outside of it.
+    target = out.joinpath(name).resolve()
+    if not target.is_relative_to(out.resolve()):
+        raise IOError(f'Refusing to write outside of database: {name}')
+    return target
+
+
+def _read_file(file: Path, offset: int) -> Iterator[bytes]:
+    # Read a local file in chunks from the offset on.
+    with open(file, 'rb') as f:
+        f.seek(offset)
+        yield from iter(lambda: f.read(CHUNK_SIZE), b'')
+
+
+def _validator(headers) -> str | None:
+    # Strong validator of a response to resume with, weak ETags may not be
+    # used in `If-Range`.
+    etag = headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return headers.get('Last-Modified')
+
+
+def _stream(url: str, offset: int = 0,
+            validator: str = None) -> tuple[Iterator[bytes], int, str | None]:
+    # Stream the content of the URL from the offset on, if the content still
+    # matches the validator of the partial content and the server supports
+    # ranges. Otherwise the content is streamed from the start. Also supports
+    # `file://` URLs, e.g. for local mirrors, validated by size and mtime.
+    parsed = urlparse(url)
+    if parsed.scheme == 'file':
+        file = Path(url2pathname(parsed.path))
+        stat = file.stat()
+        current = f'{stat.st_size}-{stat.st_mtime_ns}'
+        if current != validator:
+            offset = 0
+        return _read_file(file, offset), offset, current
+    import requests
+    headers = {}
+    if offset and validator is not None:
+        headers = {'Range': f'bytes={offset}-', 'If-Range': validator}
+    req = requests.get(url, headers=headers, stream=True, timeout=60)
+    if headers and req.status_code == 416:
+        # Range not satisfiable, the partial content is complete.
+        return iter(()), offset, validator
     req.raise_for_status()
-    return req
+    if req.status_code != 206:
+        offset = 0
+    return req.iter_content(CHUNK_SIZE), offset, _validator(req.headers)
+
+
+def _verify(digest, sha256: str | None) -> None:
+    # Compare the digest to the expected checksum, if any.
+    if sha256 is not None and digest.hexdigest() != sha256.lower():
+        raise IOError(
+            f'Checksum mismatch: expected {sha256}, got {digest.hexdigest()}'
+        )
+
+
+def download(url: str, file: Path, sha256: str = None) -> Path:
+    """Download the database tarball to disk.
+
+    The tarball is downloaded in chunks to `<file>.part` and renamed once
+    complete. The validator of the response, i.e. its ETag or last
+    modification, is stored to `<file>.part.validator`. An interrupted
+    download is resumed from the partial file if the server supports ranges
+    and the content still matches the validator, otherwise it is restarted.
+
+    Args:
+        url: The URL from which to download the file, `https` or `file`.
+        file: The filepath to download to.
+        sha256: The expected SHA-256 checksum of the file, defaults to None
+            to skip verification.
+
+    Returns:
+        The downloaded file.
+
+    Raises:
+        IOError: If the checksum does not match, the partial file is removed.
+    """
+    part = file.with_name(file.name + '.part')
+    stored = part.with_name(part.name + '.validator')
+    offset, validator = 0, None
+    if part.exists() and stored.exists():
+        offset, validator = part.stat().st_size, stored.read_text()
+    chunks, offset, validator = _stream(url, offset, validator)
+    if validator is None:
+        stored.unlink(missing_ok=True)
+    else:
+        stored.write_text(validator)
+    digest = hashlib.sha256()
+    if offset:
+        for chunk in _read_file(part, 0):
+            digest.update(chunk)
+    with open(part, 'ab' if offset else 'wb') as f:
+        for chunk in chunks:
+            digest.update(chunk)
+            f.write(chunk)
+    stored.unlink(missing_ok=True)
+    try:
+        _verify(digest, sha256)
+    except IOError:
+        part.unlink()
+        raise
+    part.replace(file)
+    return file
+
+
+def _wanted(name: str, members: set[str] | None, games: set[str] | None,
+            game_ids: set[int] | None) -> bool:
+    # Match a member against the filters, e.g. `1830/1830_123/1830_123.txt`.
+    name = name.removeprefix('./')
+    if members is not None and name not in members:
+        return False
+    parts = name.split('/')
+    if games is not None and parts[0] not in games:
+        return False
+    if game_ids is not None:
+        if len(parts) < 2:
+            return False
+        game_id = parts[1].rpartition('_')[2]
+        if not game_id.isdigit() or int(game_id) not in game_ids:
+            return False
+    return True
+
+
+def _write(file: Path, data: bytes, mtime: float) -> None:
+    # Write an extracted member, keeping its modification time.
+    file.parent.mkdir(parents=True, exist_ok=True)
+    file.write_bytes(data)
+    os.utime(file, (mtime, mtime))
 
 
-def extract(request: requests.Response, out: Path) -> None:
-    """Extract the content from the get request to the target path.
+def _extract(tf: tarfile.TarFile, out: Path, members: set[str] | None,
+             games: set[str] | None, game_ids: set[int] | None,
+             threads: int) -> int:
+    # Decompress sequentially, write the selected members in parallel.
+    # The number of pending writes is bounded to keep memory constant.
+    count, pending = 0, deque()
+    with ThreadPoolExecutor(threads) as executor:
+        for member in tf:
+            if not member.isfile():
+                continue
+            if not _wanted(member.name, members, games, game_ids):
+                continue
+            file = _target(out, member.name.removeprefix('./'))
+            data = tf.extractfile(member).read()
+            pending.append(
+                executor.submit(_write, file, data, member.mtime)
+            )
+            while len(pending) > threads * 4:
+                pending.popleft().result()
+            count += 1
+        for future in pending:
+            future.result()
+    return count
+
+
+def extract(archive: Path, out: Path, members: set[str] = None,
+            games: set[str] = None, game_ids: set[int] = None,
+            threads: int = WRITE_THREADS) -> int:
+    """Extract the database tarball to the target path.
 
     Extracting the database will overwrite existing files with the same name,
-    processed data however will remain untouched.
+    processed data however will remain untouched. The tarball is read as a
+    stream, i.e. in constant memory, while the selected members are written
+    by a thread pool. Only regular files are extracted, members resolving to
+    a path outside of the target are refused.
 
     Args:
-        request: The downloaded database as tarball.
+        archive: The database tarball.
         out: The folder to extract database to.
+        members: The names of the members to extract, defaults to None to
+            extract all.
+        games: The 18xx game variants to extract, e.g. `{'1830'}`, defaults
+            to None to extract all.
+        game_ids: The game ids to extract, defaults to None to extract all.
+        threads: The number of threads writing to disk.
+
+    Returns:
+        The number of extracted members.
+
+    Raises:
+        IOError: If a member would be written outside of the target path.
     """
     out.mkdir(parents=True, exist_ok=True)
-    with tarfile.open(fileobj=io.BytesIO(request.content), mode='r:gz') as tf:
-        tf.extractall(out)
+    with tarfile.open(archive, mode='r|gz') as tf:
+        return _extract(tf, out, members, games, game_ids, threads)
+
+
+class _ChunkReader(io.RawIOBase):
+    # File-like view on a chunk iterator which hashes all bytes read.
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b''
+        self.digest = hashlib.sha256()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            self._buffer = next(self._chunks, b'')
+            if not self._buffer:
+                return 0
+            self.digest.update(self._buffer)
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def _move_into(staging: Path, out: Path) -> None:
+    # Move the extracted members from the staging directory into place.
+    for file in sorted(staging.rglob('*')):
+        if file.is_file():
+            target = out.joinpath(file.relative_to(staging))
+            target.parent.mkdir(parents=True, exist_ok=True)
+            file.replace(target)
+
+
+def stream_extract(url: str, out: Path, sha256: str = None,
+                   members: set[str] = None, games: set[str] = None,
+                   game_ids: set[int] = None,
+                   threads: int = WRITE_THREADS) -> int:
+    """Download and extract the database tarball without storing it.
+
+    The response is piped through gzip and tar in constant memory. In contrast
+    to `download`, an interrupted transfer cannot be resumed. Members are
+    filtered and written as with `extract`, though to the staging directory
+    `.datasets18xx/staging` of the database first. They are moved into place
+    once the whole tarball is verified.
+
+    Args:
+        url: The URL from which to download the file, `https` or `file`.
+        out: The folder to extract database to.
+        sha256: The expected SHA-256 checksum of the tarball, defaults to None
+            to skip verification.
+        members: The names of the members to extract, defaults to None to
+            extract all.
+        games: The 18xx game variants to extract, defaults to None to
+            extract all.
+        game_ids: The game ids to extract, defaults to None to extract all.
+        threads: The number of threads writing to disk.
+
+    Returns:
+        The number of extracted members.
+
+    Raises:
+        IOError: If the checksum does not match, the database is left
+            untouched.
+    """
+    chunks, _, _ = _stream(url)
+    reader = _ChunkReader(chunks)
+    staging = local.derived_path(out, 'staging')
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    try:
+        with io.BufferedReader(reader, CHUNK_SIZE) as f:
+            with tarfile.open(fileobj=f, mode='r|gz') as tf:
+                count = _extract(
+                    tf, staging, members, games, game_ids, threads
+                )
+            # Consume the padding after the end of the archive.
+            while f.read(CHUNK_SIZE):
+                pass
+        _verify(reader.digest, sha256)
+        _move_into(staging, out)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+        # Drop the directory of derived files unless other files remain.
+        with contextlib.suppress(OSError):
+            staging.parent.rmdir()
+    return count
+
+
+def read_manifest(url: str) -> dict[str, str]:
+    """Read the database manifest.
+
+    Args:
+        url: The URL of the manifest, `https` or `file`.
+
+    Returns:
+        The paths of the raw transcripts mapped to their SHA-256 checksum.
+    """
+    chunks, _, _ = _stream(url)
+    return json.loads(b''.join(chunks))['transcripts']
+
+
+def _stat(file: Path) -> dict:
+    # File attributes to detect untouched files without hashing.
+    stat = file.stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def diff(manifest: dict[str, str], out: Path) -> dict[str, list[str]]:
+    """Compare the database manifest with the local database.
+
+    Local transcripts are only hashed if new or touched since the last
+    comparison, i.e. their size or modification time differs. The digests
+    are cached in `.datasets18xx/digests.json` of the local database.
+
+    Args:
+        manifest: The paths of the raw transcripts mapped to their checksum.
+        out: The folder of the local database.
+
+    Returns:
+        The paths of `added`, `changed` and `unchanged` raw transcripts.
+    """
+    cache = local.derived_path(out, 'digests.json')
+    cached = read_json(cache) if cache.exists() else {}
+    files = {name: _target(out, name) for name in manifest}
+    stats = {n: _stat(f) for n, f in files.items() if f.exists()}
+    digests, touched = {}, []
+    for name, stat in stats.items():
+        entry = cached.get(name)
+        if entry is not None and all(entry[k] == v for k, v in stat.items()):
+            digests[name] = entry['sha256']
+        else:
+            touched.append(name)
+    hashes = read_many([files[name] for name in touched], file_hash)
+    digests.update(zip(touched, hashes))
+
+    report = {'added': [], 'changed': [], 'unchanged': []}
+    for name, sha256 in sorted(manifest.items()):
+        if name not in digests:
+            report['added'].append(name)
+        elif digests[name] != sha256:
+            report['changed'].append(name)
+        else:
+            report['unchanged'].append(name)
+    if touched or digests.keys() != cached.keys():
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        write_json(cache, {
+            name: {'sha256': digest, **stats[name]}
+            for name, digest in sorted(digests.items())
+        })
+    return report
+
+
+def _fetch(url: str, file: Path, sha256: str) -> None:
+    # Download a single file, replace the local file only if verified.
+    file.parent.mkdir(parents=True, exist_ok=True)
+    download(url, file.with_name(file.name + '.new'), sha256).replace(file)
+
+
+def update(manifest_url: str, out: Path, files_url: str = None,
+           archive_url: str = None) -> dict[str, list[str]]:
+    """Update the local database with new or changed raw transcripts only.
+
+    The remote manifest is compared with the local database. New or changed
+    transcripts are downloaded one by one from `files_url` if given, otherwise
+    only they are extracted from the streamed database tarball. Unchanged
+    transcripts and processed data are not touched.
+
+    Args:
+        manifest_url: The URL of the database manifest.
+        out: The folder of the local database.
+        files_url: The URL of the database folder, such that the transcripts
+            are located at `<files_url>/<path>`, defaults to None.
+        archive_url: The URL of the database tarball, defaults to None to use
+            the records18xx database.
+
+    Returns:
+        The paths of `added`, `changed` and `unchanged` raw transcripts.
+    """
+    manifest = read_manifest(manifest_url)
+    report = diff(manifest, out)
+    names = report['added'] + report['changed']
+    if not names:
+        return report
+    if files_url is not None:
+        for name in names:
+            url = files_url.rstrip('/') + '/' + name
+            _fetch(url, _target(out, name), manifest[name])
+    else:
+        stream_extract(archive_url or create_url(), out, members=set(names))
+    return report
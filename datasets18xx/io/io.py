@@ -2,17 +2,30 @@
 # -*- coding: utf-8 -*-
 """I/O module
 
-Module implements general usage input/output functionalities.
+Module implements general usage input/output functionalities. Operations on
+many small files, e.g. the records of a dataset, are batched on a bounded
+thread pool, see `read_many`, `write_many` and `copy_many`, such that the
+latency of single files on network filesystems or cold caches overlaps.
 """
+import functools
+import hashlib
 import json
 import os.path
 import logging
 import shutil
 
-from pathlib import Path
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from pathlib import Path, PurePath
+
+from ..utils import profiling
 
 logger = logging.getLogger(__name__)
 
+# Default number of concurrent file operations of the batched I/O.
+CONCURRENCY = 16
+
 
 def home() -> Path:
     """Expand the `~` to the user home.
@@ -44,6 +57,7 @@ def write_json(file: Path, content: dict) -> None:
     """
     with open(file, 'w', encoding='utf-8') as f:
         f.write(json.dumps(content, indent=2))
+    profiling.count_file('bytes_written', file)
 
 
 def read_json(file: Path) -> dict:
@@ -62,9 +76,24 @@ def read_json(file: Path) -> dict:
         raise FileNotFoundError(file)
     with open(file, 'r', encoding='utf-8') as f:
         content = json.load(f)
+    profiling.count_file('bytes_read', file)
     return content
 
 
+def file_hash(file: Path) -> str:
+    """Hash the content of a file.
+
+    Args:
+        file: The filepath to hash.
+
+    Returns:
+        The SHA-256 hex digest of the file content.
+    """
+    profiling.count_file('bytes_read', file)
+    with open(file, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
 def copy_record(file: Path, dest: Path) -> None:
     """Copy a full record to a new directory.
 
@@ -75,10 +104,107 @@ def copy_record(file: Path, dest: Path) -> None:
     shutil.copytree(file.parent, dest.joinpath(file.parent.name))
 
 
+def _link(src: str, dst: str) -> None:
+    # Hardlink a file, copy it if linking is not possible, e.g. across devices.
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def link_record(file: Path, dest: Path) -> None:
+    """Hardlink a full record to a new directory.
+
+    The files share their content with the original record, no additional
+    disk space is used. Falls back to copying where hardlinks are not
+    supported.
+
+    Args:
+        file: The raw transcript filepath.
+        dest: The root folder of the new dataset.
+    """
+    shutil.copytree(
+        file.parent, dest.joinpath(file.parent.name), copy_function=_link
+    )
+
+
+def _map(fn: Callable, items: list, concurrency: int,
+         progress: bool = False) -> list:
+    # Apply a blocking file operation to each item on a bounded thread pool,
+    # results in order of the items. Small batches are run inline.
+    from tqdm import tqdm
+    if concurrency < 1:
+        raise ValueError('Concurrency must be at least 1')
+    if concurrency == 1 or len(items) <= 1:
+        return [fn(item) for item in tqdm(items, disable=not progress)]
+    with ThreadPoolExecutor(min(concurrency, len(items))) as executor:
+        results = executor.map(fn, items)
+        return list(tqdm(results, total=len(items), disable=not progress))
+
+
+def read_many(files: Iterable[Path], read: Callable = None,
+              concurrency: int = CONCURRENCY) -> list:
+    """Read many files concurrently.
+
+    Args:
+        files: The filepaths to read.
+        read: The function reading a single file, defaults to None for
+            `read_json`.
+        concurrency: The maximum number of files read at once.
+
+    Returns:
+        The contents of the files in order of the filepaths.
+
+    Raises:
+        FileNotFoundError: If a file does not exist.
+        ValueError: If the concurrency is less than 1.
+    """
+    return _map(read or read_json, list(files), concurrency)
+
+
+def write_many(items: Iterable[tuple[Path, dict]], write: Callable = None,
+               concurrency: int = CONCURRENCY) -> None:
+    """Write many files concurrently.
+
+    Args:
+        items: The filepaths to write to and their contents.
+        write: The function writing a single file, taking the filepath and
+            its content, defaults to None for `write_json`.
+        concurrency: The maximum number of files written at once.
+
+    Raises:
+        ValueError: If the concurrency is less than 1.
+    """
+    write = write or write_json
+    _map(lambda item: write(*item), list(items), concurrency)
+
+
+def copy_many(files: Iterable[Path], dest: Path, link: bool = False,
+              concurrency: int = CONCURRENCY, progress: bool = False) -> None:
+    """Copy many full records to a new directory concurrently.
+
+    Args:
+        files: The raw transcript filepaths of the records.
+        dest: The root folder of the new dataset.
+        link: To hardlink the records instead of copying, see `link_record`.
+        concurrency: The maximum number of records copied at once.
+        progress: To show a progress bar.
+
+    Raises:
+        ValueError: If the concurrency is less than 1.
+    """
+    copy = link_record if link else copy_record
+    _map(
+        lambda file: copy(file, dest), list(files), concurrency,
+        progress=progress
+    )
+
+
 def serialize(obj):
     """Serialize an object for JSON.
 
-    Renders WindowsPaths to unix-filepaths.
+    Renders WindowsPaths to unix-filepaths. Every string is treated as path,
+    see `serialize_record` for records with known path fields.
 
     Args:
         obj: The object to serialize paths.
@@ -95,3 +221,136 @@ def serialize(obj):
     if isinstance(obj, str):
         return unix_path(Path(obj))
     return obj
+
+
+def serialize_paths(files: Iterable[Path | str]) -> list[str]:
+    """Render filepaths to unix-filepaths.
+
+    Args:
+        files: The filepaths.
+
+    Returns:
+        The unix-filepaths.
+    """
+    return [unix_path(Path(f)) for f in files]
+
+
+@functools.cache
+def path_fields(cls: type) -> frozenset[str]:
+    """Find the fields of a class annotated as paths.
+
+    Args:
+        cls: The class of the records, e.g. `TranscriptContext`.
+
+    Returns:
+        The names of the fields annotated with `Path`, including optional
+        paths and containers of paths.
+    """
+    fields = set()
+    for klass in cls.__mro__:
+        annotations = vars(klass).get('__annotations__', {})
+        for name, annotation in annotations.items():
+            # Annotations may be postponed, i.e. strings.
+            if not isinstance(annotation, str):
+                annotation = repr(annotation)
+            if 'Path' in annotation:
+                fields.add(name)
+    return frozenset(fields)
+
+
+# Classes of values which are serialized as is.
+_PLAIN = frozenset({str, int, float, bool, type(None)})
+
+
+def _render(obj):
+    # Render the paths in an object. Containers without paths are returned
+    # as is, str subclasses, e.g. enum members, as their string.
+    cls = obj.__class__
+    if cls in _PLAIN:
+        return obj
+    if isinstance(obj, PurePath):
+        return unix_path(obj)
+    if isinstance(obj, str):
+        return str(obj)
+    if cls is list:
+        out = None
+        for i, x in enumerate(obj):
+            if x.__class__ in _PLAIN:
+                continue
+            y = _render(x)
+            if y is not x:
+                if out is None:
+                    out = list(obj)
+                out[i] = y
+        return obj if out is None else out
+    if cls is dict:
+        out = None
+        for k, x in obj.items():
+            y = _render(x)
+            if y is not x:
+                if out is None:
+                    out = dict(obj)
+                out[k] = y
+        return obj if out is None else out
+    return obj
+
+
+def _render_path(obj):
+    # Render a value of a path field, strings are parsed as paths.
+    if isinstance(obj, PurePath):
+        return unix_path(obj)
+    if isinstance(obj, str):
+        return unix_path(Path(obj))
+    if isinstance(obj, list):
+        return [_render_path(x) for x in obj]
+    return obj
+
+
+def serialize_record(obj) -> dict:
+    """Serialize a record, e.g. a transcript context, for JSON.
+
+    In contrast to `serialize`, only the fields annotated as paths are parsed
+    as paths, see `path_fields`. Other strings are kept, containers without
+    paths are not copied.
+
+    Args:
+        obj: The record.
+
+    Returns:
+        The fields of the record with rendered paths.
+    """
+    paths = path_fields(type(obj))
+    return {
+        k: _render_path(v) if k in paths else _render(v)
+        for k, v in vars(obj).items()
+    }
+
+
+def serialize_records(objs: Iterable) -> dict[str, list]:
+    """Serialize records into columns, e.g. to create a frame or table.
+
+    The records are serialized column by column, see `serialize_record`,
+    without creating a dict per record.
+
+    Args:
+        objs: The records.
+
+    Returns:
+        The columns in order of first appearance, mapped to their values.
+        Fields missing in a record are None.
+    """
+    objs = list(objs)
+    records = [vars(obj) for obj in objs]
+    paths = set()
+    for cls in {type(obj) for obj in objs}:
+        paths |= path_fields(cls)
+    columns = {}
+    for k in dict.fromkeys(chain.from_iterable(records)):
+        values = [r.get(k) for r in records]
+        if k in paths:
+            columns[k] = [_render_path(v) for v in values]
+        else:
+            columns[k] = [
+                v if v.__class__ in _PLAIN else _render(v) for v in values
+            ]
+    return columns
@@ -5,28 +5,38 @@
 Module implements functionality regarding the local database.
 """
 import logging
+import re
 
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+RECORD_PATTERN = re.compile(r'[^_/]+_\d+')
+"""Pattern of the `<game>_<id>` directory of a record."""
+
+DERIVED_DIR = '.datasets18xx'
+"""Directory of files derived from the records, kept apart from them."""
+
 
 def find_raw_transcripts(dataset_dir: Path) -> list[Path]:
     """Loads the raw transcripts from dataset.
 
+    Only directories of the `<game>_<id>` structure which contain the raw
+    transcript are records, other directories, e.g. of derived files, are
+    skipped.
+
     Args:
         dataset_dir: The directory of the dataset.
 
     Returns:
         List of raw transcript filepaths which are part of the dataset.
     """
-    # TODO: check if dir is <game>_<id> structure
-    return sorted(
-        [
-            d.joinpath(d.name + '.txt') for d in dataset_dir.iterdir()
-            if d.is_dir()
-        ]
-    )
+    file_list = []
+    for d in dataset_dir.iterdir():
+        raw = d.joinpath(d.name + '.txt')
+        if RECORD_PATTERN.fullmatch(d.name) and raw.is_file():
+            file_list.append(raw)
+    return sorted(file_list)
 
 
 def create_root(root: Path, game: str, conf_suffix: str) -> Path:
@@ -44,3 +54,67 @@ def create_root(root: Path, game: str, conf_suffix: str) -> Path:
     if not conf_suffix:
         return base
     return base.parent.joinpath(base.name + '_' + conf_suffix)
+
+
+def derived_path(dataset_dir: Path, name: str) -> Path:
+    """The location of a file or directory derived from the records.
+
+    Args:
+        dataset_dir: The directory of the dataset.
+        name: The name of the derived file or directory.
+
+    Returns:
+        Path to the `.datasets18xx/<name>` in the dataset.
+    """
+    return dataset_dir.joinpath(DERIVED_DIR, name)
+
+
+def raw_file(dataset_dir: Path, game: str, game_id: int) -> Path:
+    """The raw transcript of a record.
+
+    Args:
+        dataset_dir: The directory of the dataset.
+        game: The game variant of the dataset.
+        game_id: The game id of the record.
+
+    Returns:
+        Path to the `<game>_<id>/<game>_<id>.txt` in the dataset.
+    """
+    name = f'{game}_{game_id}'
+    return dataset_dir.joinpath(name, name + '.txt')
+
+
+def result_file(raw: Path) -> Path:
+    """The processed final state table of a record.
+
+    Args:
+        raw: The raw transcript filepath.
+
+    Returns:
+        Path to the `<game>_<id>_final.csv` next to the raw transcript.
+    """
+    return raw.with_name(raw.stem + '_final.csv')
+
+
+def columnar_file(raw: Path) -> Path:
+    """The columnar final state table of a record.
+
+    Args:
+        raw: The raw transcript filepath.
+
+    Returns:
+        Path to the `<game>_<id>_final.parquet` next to the raw transcript.
+    """
+    return raw.with_name(raw.stem + '_final.parquet')
+
+
+def metadata_file(raw: Path) -> Path:
+    """The processed metadata of a record.
+
+    Args:
+        raw: The raw transcript filepath.
+
+    Returns:
+        Path to the `<game>_<id>_metadata.json` next to the raw transcript.
+    """
+    return raw.with_name(raw.stem + '_metadata.json')
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Pack module
+
+Module implements a consolidated container for the final state tables of a
+dataset. All records are written to a single Arrow IPC file, one record batch
+per game, with a game id index in the schema metadata. The file is
+memory-mapped on read, so single games are sliced without copies or filesystem
+walks. The columns of each game are kept in the schema metadata as well, such
+that single games are read with their own columns only.
+"""
+import json
+import logging
+import tempfile
+
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as pds
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from . import columnar
+
+logger = logging.getLogger(__name__)
+
+_INDEX_KEY = b'datasets18xx.index'
+
+_COLUMNS_KEY = b'datasets18xx.columns'
+
+
+def _spool(file: Path, sink: pa.NativeFile) -> tuple[pa.Schema, tuple]:
+    # Parse a CSV table once and append it as IPC stream to the spool file,
+    # returning its schema and its offset and length in the spool.
+    table = columnar.read_table(file)
+    start = sink.tell()
+    with ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return table.schema, (start, sink.tell() - start)
+
+
+def _columns(schemas: dict[int, pa.Schema]) -> dict:
+    # The columns of each game, games with the same columns share a list.
+    sets, games = {}, {}
+    for game_id, schema in schemas.items():
+        games[game_id] = sets.setdefault(tuple(schema.names), len(sets))
+    return {'columns': [list(names) for names in sets], 'games': games}
+
+
+def _decode(t: pa.DataType) -> pa.DataType:
+    # The IPC file format cannot replace dictionaries between batches.
+    if pa.types.is_dictionary(t):
+        return t.value_type
+    return t
+
+
+def _unify(types: set[pa.DataType]) -> pa.DataType:
+    # Resolve the type of a column across records, e.g. `3` and `3+D`.
+    types = {_decode(t) for t in types} - {pa.null()}
+    if not types:
+        return pa.null()
+    if len(types) == 1:
+        return types.pop()
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+        return pa.float64()
+    return pa.string()
+
+
+def _unify_schemas(schemas: list[pa.Schema]) -> pa.Schema:
+    # Union of all columns in order of appearance, game id first.
+    types = {'game_id': {pa.int64()}}
+    for schema in schemas:
+        for field in schema:
+            types.setdefault(field.name, set()).add(field.type)
+    return pa.schema([(name, _unify(t)) for name, t in types.items()])
+
+
+def _conform(table: pa.Table, game_id: int, schema: pa.Schema) -> pa.Table:
+    # Add the game id, missing columns and cast to the unified schema.
+    columns = []
+    for field in schema:
+        if field.name == 'game_id':
+            columns.append(pa.array([game_id] * table.num_rows, pa.int64()))
+        elif field.name in table.column_names:
+            column = table.column(field.name)
+            columns.append(column.cast(field.type))
+        else:
+            columns.append(pa.nulls(table.num_rows, field.type))
+    return pa.Table.from_arrays(columns, schema=schema).combine_chunks()
+
+
+def pack(files: dict[int, Path], out: Path) -> dict[int, int]:
+    """Pack the final state tables of several records into one file.
+
+    Args:
+        files: The final state filepaths, Parquet or CSV, mapped to game id.
+        out: The Arrow IPC filepath to write to.
+
+    Returns:
+        The index of the pack, i.e. game id mapped to its record batch.
+    """
+    schemas, index, spooled = {}, {}, {}
+    with tempfile.TemporaryDirectory(dir=out.parent) as tmp:
+        # The schema is required before writing, hence CSV tables are parsed
+        # once into a spool file, Parquet tables have it in their footer.
+        spool = Path(tmp).joinpath('spool.arrows')
+        with pa.OSFile(str(spool), 'wb') as sink:
+            for game_id, file in files.items():
+                index[game_id] = len(index)
+                if file.suffix == '.parquet':
+                    schemas[game_id] = pq.read_schema(file)
+                else:
+                    schemas[game_id], spooled[game_id] = _spool(file, sink)
+        schema = _unify_schemas(list(schemas.values())).with_metadata({
+            _INDEX_KEY: json.dumps(index).encode(),
+            _COLUMNS_KEY: json.dumps(_columns(schemas)).encode()
+        })
+        with pa.memory_map(str(spool), 'r') as source, \
+                ipc.new_file(out, schema) as writer:
+            buffer = source.read_buffer()
+            for game_id, file in files.items():
+                if game_id in spooled:
+                    start, length = spooled[game_id]
+                    stream = ipc.open_stream(buffer.slice(start, length))
+                    table = stream.read_all()
+                else:
+                    table = columnar.read_table(file)
+                batch = _conform(table, game_id, schema).to_batches()
+                if batch:
+                    writer.write_batch(batch[0])
+                else:
+                    writer.write_batch(pa.RecordBatch.from_pylist([], schema))
+    return index
+
+
+class PackedResults:
+    """PackedResults
+
+    Class implements read access to a pack created with `pack`. The file is
+    memory-mapped, tables of single games are zero-copy slices of it.
+
+    Args:
+        file: The Arrow IPC filepath of the pack.
+    """
+
+    def __init__(self, file: Path):
+        self._reader = ipc.open_file(pa.memory_map(str(file), 'r'))
+        metadata = self._reader.schema.metadata
+        index = json.loads(metadata[_INDEX_KEY])
+        self._index = {int(k): v for k, v in index.items()}
+        self._columns = None
+        if _COLUMNS_KEY in metadata:
+            self._columns = json.loads(metadata[_COLUMNS_KEY])
+
+    def __contains__(self, game_id: int) -> bool:
+        return game_id in self._index
+
+    def game_ids(self) -> list[int]:
+        """The game ids in the pack.
+
+        Returns:
+            The game ids in order of the pack.
+        """
+        return list(self._index)
+
+    def table(self, game_id: int) -> pa.Table:
+        """Slice the final state table of a game from the pack.
+
+        Args:
+            game_id: The game id to slice.
+
+        Returns:
+            The final state table with the unified schema of the pack.
+
+        Raises:
+            KeyError: If the game id is not in the pack.
+        """
+        batch = self._reader.get_batch(self._index[game_id])
+        return pa.Table.from_batches([batch])
+
+    def result(self, game_id: int, columns: list[str] = None) -> pa.Table:
+        """Slice the final state table of a game with its own columns.
+
+        In contrast to `table`, the game id and the columns added by the
+        unified schema are dropped. The types are the unified types of the
+        pack.
+
+        Args:
+            game_id: The game id to slice.
+            columns: The columns to read, defaults to None for all columns of
+                the game.
+
+        Returns:
+            The final state table of the game.
+
+        Raises:
+            KeyError: If the game id is not in the pack.
+        """
+        table = self.table(game_id)
+        if self._columns is None:
+            names = [n for n in table.column_names if n != 'game_id']
+        else:
+            i = self._columns['games'][str(game_id)]
+            names = self._columns['columns'][i]
+        if columns is not None:
+            names = [c for c in columns if c in names]
+        return table.select(names)
+
+    def read(self, game_ids: list[int] = None, columns: list[str] = None,
+             filters: pds.Expression = None) -> pd.DataFrame:
+        """Read the final state tables of several games.
+
+        Args:
+            game_ids: The game ids to read, defaults to None for all.
+            columns: The columns to read, defaults to None for all.
+            filters: The predicate on the rows to read, defaults to None.
+
+        Returns:
+            The concatenated final states, with the game id as first column.
+        """
+        if game_ids is None:
+            game_ids = self.game_ids()
+        batches = [
+            self._reader.get_batch(self._index[g]) for g in game_ids
+            if g in self._index
+        ]
+        dataset = pds.dataset(batches, schema=self._reader.schema)
+        if columns is not None:
+            names = dataset.schema.names
+            columns = ['game_id'] + [
+                c for c in columns if c in names and c != 'game_id'
+            ]
+        return dataset.to_table(columns=columns, filter=filters).to_pandas()
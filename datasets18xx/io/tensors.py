@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Tensors module
+
+Module implements the export of the final state tables of a dataset to
+fixed-schema NumPy arrays. The flattened per-player and per-company columns,
+e.g. `player1_cash` or `PRR_trains_2`, are stacked along a player and a
+company axis, privates are encoded as multi-hot vectors and the action type
+and phase as codes of a vocabulary. The bundle is a folder of `.npy` files
+which are memory-mapped on read:
+
+* `players.npy`: float32 of shape (actions, players, player features).
+* `companies.npy`: float32 of shape (actions, companies, company features).
+* `actions.npy`: int32 of shape (actions, 2), the type and phase codes.
+* `index.npy`: int64 of shape (games, 4), the game id, offset of its first
+  action, number of actions and number of players per game.
+* `schema.json`: The names along each axis and the vocabularies.
+
+The actions of all games are concatenated, the actions of a game are sliced
+with its offset and length. Players beyond the number of players of a game
+and missing values are zero.
+"""
+import csv
+import json
+import logging
+import re
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from . import columnar
+from .io import read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+_PLAYER = re.compile(r'player(\d+)_(.+)')
+
+_ACTION_FEATURES = ('type', 'phase')
+
+
+def _columns(file: Path) -> list[str]:
+    # The column names of a final state table, without reading its rows.
+    if file.suffix == '.parquet':
+        return pq.read_schema(file).names
+    with open(file, newline='') as f:
+        return next(csv.reader(f), [])
+
+
+def _append(names: list[str], name: str) -> None:
+    # Append to a list in order of first appearance.
+    if name not in names:
+        names.append(name)
+
+
+def _to_object(df: pd.DataFrame) -> pd.DataFrame:
+    # Dictionary-encoded columns are read as categoricals.
+    cats = df.select_dtypes('category').columns
+    return df.astype({c: object for c in cats}) if len(cats) else df
+
+
+def _labels(values: pd.Series) -> pd.Series:
+    # String labels of a column, e.g. the phase `2` read as `2.0` with nulls.
+    if pd.api.types.is_float_dtype(values.dtype):
+        values = values.astype('Int64')
+    return values.astype(str).where(values.notna())
+
+
+def _privates(values) -> list[str]:
+    # The names of the privates in the `{"name": value}` literals.
+    names = []
+    for value in values:
+        if isinstance(value, str):
+            for name in json.loads(value):
+                _append(names, name)
+    return names
+
+
+def scan(files: dict[int, Path]) -> tuple[dict, dict[int, tuple]]:
+    """Derive the fixed schema of the final state tables of several games.
+
+    Reads the column names as well as the privates, type and phase columns
+    of each table.
+
+    Args:
+        files: The final state filepaths, Parquet or CSV, mapped to game id.
+
+    Returns:
+        The schema, i.e. the maximum number of players, the names of the
+        companies, privates and features and the vocabularies of the action
+        features, and the number of actions and players per game id.
+    """
+    players, companies = 0, []
+    player_features, company_features, privates = [], [], []
+    vocab = {k: [] for k in _ACTION_FEATURES}
+    games = {}
+    for game_id, file in files.items():
+        names = _columns(file)
+        num_players = 0
+        for name in names:
+            if name.endswith('_president'):
+                _append(companies, name.removesuffix('_president'))
+        for name in names:
+            match = _PLAYER.fullmatch(name)
+            if match is not None:
+                num_players = max(num_players, int(match.group(1)))
+                if match.group(2) != 'privates':
+                    _append(player_features, match.group(2))
+                continue
+            company, _, feature = name.partition('_')
+            if company in companies and feature != 'privates':
+                _append(company_features, feature)
+        read = [c for c in names if c.endswith('_privates')]
+        table = columnar.read_table(file, read + list(_ACTION_FEATURES))
+        df = _to_object(table.to_pandas())
+        games[game_id] = (len(df), num_players)
+        players = max(players, num_players)
+        for col in read:
+            for name in _privates(df[col].unique()):
+                _append(privates, name)
+        for col in _ACTION_FEATURES:
+            if col in df.columns:
+                for value in _labels(df[col]).dropna().unique():
+                    _append(vocab[col], value)
+    multi_hot = [f'private_{p}' for p in privates]
+    schema = {
+        'players': players,
+        'companies': companies,
+        'privates': privates,
+        'player_features': player_features + multi_hot,
+        'company_features': company_features + multi_hot,
+        'action_features': list(_ACTION_FEATURES),
+        'vocab': vocab
+    }
+    return schema, games
+
+
+def _numeric(values: pd.Series) -> np.ndarray:
+    # Numeric values of a column, e.g. cash or shares, missing values as 0.
+    if values.dtype == object:
+        values = pd.to_numeric(values, errors='coerce')
+    return values.fillna(0).to_numpy(dtype=np.float32)
+
+
+def _president(values: pd.Series) -> np.ndarray:
+    # The player number of the president, e.g. `player2` as 2, none as 0.
+    if values.dtype == object:
+        values = values.str.removeprefix('player')
+    return _numeric(values)
+
+
+def _multi_hot(values: pd.Series, privates: list[str]) -> np.ndarray:
+    # Each distinct literal is parsed once, rows index into the encodings.
+    codes, uniques = pd.factorize(values)
+    encoded = np.zeros((len(uniques) + 1, len(privates)), dtype=np.float32)
+    index = {name: i for i, name in enumerate(privates)}
+    for i, value in enumerate(uniques):
+        for name in json.loads(value):
+            encoded[i, index[name]] = 1.
+    # Missing values have code -1, i.e. the last row of zeros.
+    return encoded[codes]
+
+
+def _codes(values: pd.Series, vocab: list[str]) -> np.ndarray:
+    # The codes of the values in the vocabulary, missing values as -1.
+    cat = pd.Categorical(_labels(values), vocab)
+    return cat.codes.astype(np.int32)
+
+
+def encode(df: pd.DataFrame, schema: dict) -> dict[str, np.ndarray]:
+    """Encode a final state table to the fixed schema.
+
+    Args:
+        df: The final state table of a game.
+        schema: The schema, see `scan`.
+
+    Returns:
+        The `players`, `companies` and `actions` arrays of the game.
+    """
+    df = _to_object(df)
+    n, privates = len(df), schema['privates']
+    n_features = len(schema['player_features']) - len(privates)
+    players = np.zeros(
+        (n, schema['players'], len(schema['player_features'])), np.float32
+    )
+    for i in range(schema['players']):
+        for j, feature in enumerate(schema['player_features'][:n_features]):
+            col = f'player{i + 1}_{feature}'
+            if col in df.columns:
+                players[:, i, j] = _numeric(df[col])
+        col = f'player{i + 1}_privates'
+        if col in df.columns:
+            players[:, i, n_features:] = _multi_hot(df[col], privates)
+    n_features = len(schema['company_features']) - len(privates)
+    companies = np.zeros(
+        (n, len(schema['companies']), len(schema['company_features'])),
+        np.float32
+    )
+    for i, company in enumerate(schema['companies']):
+        for j, feature in enumerate(schema['company_features'][:n_features]):
+            col = f'{company}_{feature}'
+            if col not in df.columns:
+                continue
+            if feature == 'president':
+                companies[:, i, j] = _president(df[col])
+            else:
+                companies[:, i, j] = _numeric(df[col])
+        col = f'{company}_privates'
+        if col in df.columns:
+            companies[:, i, n_features:] = _multi_hot(df[col], privates)
+    actions = np.full((n, len(_ACTION_FEATURES)), -1, np.int32)
+    for j, col in enumerate(_ACTION_FEATURES):
+        if col in df.columns:
+            actions[:, j] = _codes(df[col], schema['vocab'][col])
+    return {'players': players, 'companies': companies, 'actions': actions}
+
+
+def export(files: dict[int, Path], out: Path) -> dict:
+    """Export the final state tables of several games to a tensor bundle.
+
+    The schema is derived from all tables first, such that the arrays are
+    allocated once and each game is encoded into its slice of them.
+
+    Args:
+        files: The final state filepaths, Parquet or CSV, mapped to game id.
+        out: The folder of the bundle, existing arrays are overwritten.
+
+    Returns:
+        The schema of the bundle.
+    """
+    schema, games = scan(files)
+    total = sum(n for n, _ in games.values())
+    out.mkdir(parents=True, exist_ok=True)
+    shapes = {
+        'players': (
+            np.float32,
+            (total, schema['players'], len(schema['player_features']))
+        ),
+        'companies': (
+            np.float32,
+            (total, len(schema['companies']), len(schema['company_features']))
+        ),
+        'actions': (np.int32, (total, len(_ACTION_FEATURES)))
+    }
+    arrays = {
+        name: np.lib.format.open_memmap(
+            out.joinpath(f'{name}.npy'), mode='w+', dtype=dtype, shape=shape
+        ) for name, (dtype, shape) in shapes.items()
+    }
+    index = np.zeros((len(files), 4), dtype=np.int64)
+    offset = 0
+    for i, (game_id, file) in enumerate(files.items()):
+        encoded = encode(columnar.read_table(file).to_pandas(), schema)
+        n, num_players = games[game_id]
+        for name, array in arrays.items():
+            array[offset:offset + n] = encoded[name]
+        index[i] = (game_id, offset, n, num_players)
+        offset += n
+    for array in arrays.values():
+        array.flush()
+    np.save(out.joinpath('index.npy'), index)
+    write_json(out.joinpath('schema.json'), schema)
+    logger.info('Exported %d actions of %d games', total, len(files))
+    return schema
+
+
+class TensorBundle:
+    """TensorBundle
+
+    Class implements read access to a bundle created with `export`. The
+    arrays are memory-mapped, the arrays of single games are slices of them.
+
+    Args:
+        path: The folder of the bundle.
+    """
+
+    def __init__(self, path: Path):
+        self.schema = read_json(path.joinpath('schema.json'))
+        self.players = np.load(path.joinpath('players.npy'), mmap_mode='r')
+        self.companies = np.load(
+            path.joinpath('companies.npy'), mmap_mode='r'
+        )
+        self.actions = np.load(path.joinpath('actions.npy'), mmap_mode='r')
+        self.index = np.load(path.joinpath('index.npy'))
+        self._rows = {int(row[0]): i for i, row in enumerate(self.index)}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, game_id: int) -> bool:
+        return game_id in self._rows
+
+    def game_ids(self) -> list[int]:
+        """The game ids in the bundle.
+
+        Returns:
+            The game ids in order of the bundle.
+        """
+        return list(self._rows)
+
+    def game(self, game_id: int) -> dict[str, np.ndarray]:
+        """Slice the arrays of a game from the bundle.
+
+        Args:
+            game_id: The game id to slice.
+
+        Returns:
+            The `players`, `companies` and `actions` arrays of the game.
+
+        Raises:
+            KeyError: If the game id is not in the bundle.
+        """
+        _, offset, n, _ = self.index[self._rows[game_id]]
+        return {
+            'players': self.players[offset:offset + n],
+            'companies': self.companies[offset:offset + n],
+            'actions': self.actions[offset:offset + n]
+        }
@@ -14,19 +14,26 @@ from .io.database import database
 
 
 def make_config(num_players: tuple[int] = None,
-                game_ending: tuple[GameEnding] = None) -> DatasetConfig:
+                game_ending: tuple[GameEnding] = None,
+                filters: str = None) -> DatasetConfig:
     """Create dataset configuration.
 
     Args:
         num_players: Number of players definition.
         game_ending: Game endings for configuration.
+        filters: Further filters in the format of the dataset suffix, e.g.
+            `id179000-179500_verified`, defaults to None.
 
     Returns:
-        The dataset config based on number of players and game ending.
+        The dataset config based on number of players, game ending and
+        further filters.
+
+    Raises:
+        ValueError: If a filter is unknown.
     """
-    if game_ending is None and num_players is None:
+    if game_ending is None and num_players is None and not filters:
         return DefaultDatasetConfig()
-    return DatasetConfig.from_cli(num_players, game_ending)
+    return DatasetConfig.from_cli(num_players, game_ending, filters)
 
 
 def make_dataset(game: trx.Games = trx.Games.G1830,
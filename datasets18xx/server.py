@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Dataset server
+
+Module implements a server keeping datasets and their contexts resident in
+memory. It answers load, snapshot, inspect and filter requests with JSON
+responses over HTTP, either on a TCP port or a Unix socket. See `client` for
+the matching client.
+
+Requests are `GET /<endpoint>?<params>` with the parameters:
+
+* `game`: The game variant, e.g. `G1830`, defaults to `G1830`.
+* `num_players`, `game_ending`: The config of the dataset, may be repeated.
+* `game_id`: The game id to load, `load` only.
+* `rows`: The number of rows of the final state to return, `load` only.
+* `debug`: To include debug data, `0` or `1`, `snapshot` only.
+"""
+import contextlib
+import http.server
+import json
+import logging
+import socketserver
+import threading
+
+from collections.abc import Iterator
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import transcripts18xx as trx
+
+from .core.config import DatasetConfig, DefaultDatasetConfig, GameEnding
+from .core.dataset import Dataset18xx
+from .io import io, local
+from .io.database import database
+from .pipeline import make_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+"""The default host of the server."""
+
+DEFAULT_PORT = 8018
+"""The default port of the server."""
+
+WATCHED_FILES = (
+    'context.parquet', 'manifest.json', 'metadata.parquet', 'results.arrow'
+)
+"""Files of a dataset root, a resident dataset is reloaded if any changed."""
+
+
+class BadRequest(ValueError):
+    """Raised on missing or malformed request parameters."""
+
+
+class DatasetService:
+    """DatasetService
+
+    Class implements the request handling on resident datasets. Datasets are
+    created on first request and kept in memory, such that their contexts
+    are read only once. A resident dataset is reloaded once the dataset is
+    made or packed again, see `WATCHED_FILES`. Requests on the same dataset
+    are serialized, see `using`.
+
+    Args:
+        db: Path to the database, defaults to None to use `database`.
+    """
+
+    def __init__(self, db: Path = None):
+        self.db = db or database()
+        self._datasets = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _game(params: dict) -> trx.Games:
+        # Parse the game variant from the request.
+        name = params.get('game', ['G1830'])[0]
+        try:
+            return trx.Games[name]
+        except KeyError as exc:
+            raise BadRequest(f'Unknown game variant: {name}') from exc
+
+    @staticmethod
+    def _config(params: dict) -> DatasetConfig:
+        # Parse the dataset config from the request.
+        try:
+            num_players = tuple(int(n) for n in params.get('num_players', []))
+            game_ending = tuple(
+                GameEnding.argparse(e) for e in params.get('game_ending', [])
+            )
+        except ValueError as exc:
+            raise BadRequest(str(exc)) from exc
+        return make_config(num_players, game_ending)
+
+    @staticmethod
+    def _int(params: dict, name: str, default: int = None) -> int | None:
+        # Parse an integer parameter from the request.
+        if name not in params:
+            if default is None:
+                raise BadRequest(f'Missing parameter: {name}')
+            return default
+        try:
+            return int(params[name][0])
+        except ValueError as exc:
+            raise BadRequest(f'Invalid parameter: {name}') from exc
+
+    @staticmethod
+    def _version(root: Path) -> tuple:
+        # The modification times of the watched files of a dataset.
+        version = []
+        for name in WATCHED_FILES:
+            try:
+                version.append(root.joinpath(name).stat().st_mtime_ns)
+            except FileNotFoundError:
+                version.append(None)
+        return tuple(version)
+
+    def _resident(self, game: trx.Games,
+                  conf: DatasetConfig) -> tuple[Dataset18xx, threading.Lock]:
+        # The resident dataset and the lock serializing its use, created on
+        # first access and recreated if the dataset changed on disk since.
+        key = (game.name, conf.suffix())
+        root = local.create_root(self.db, game.game(), conf.suffix())
+        version = self._version(root)
+        with self._lock:
+            resident = self._datasets.get(key)
+            if resident is None or resident[0] != version:
+                action = 'Loading' if resident is None else 'Reloading'
+                logger.info('%s dataset %s %s', action, *key)
+                ds = Dataset18xx(self.db, game, conf)
+                resident = (version, ds, threading.Lock())
+                self._datasets[key] = resident
+            return resident[1], resident[2]
+
+    def dataset(self, game: trx.Games,
+                conf: DatasetConfig) -> Dataset18xx:
+        """Get a resident dataset, created on first access and recreated if
+        the dataset changed on disk since.
+
+        Note: The lazy state of a dataset is not thread-safe, use `using` to
+        access it from concurrent requests.
+
+        Args:
+            game: The game of the dataset.
+            conf: The dataset config.
+
+        Returns:
+            The dataset.
+
+        Raises:
+            IOError: If the dataset does not exist.
+        """
+        return self._resident(game, conf)[0]
+
+    @contextlib.contextmanager
+    def using(self, game: trx.Games,
+              conf: DatasetConfig) -> Iterator[Dataset18xx]:
+        """Use a resident dataset exclusively, see `dataset`.
+
+        Requests on the same dataset are serialized, such that its lazily
+        built state, e.g. the context lookups or the pack, is built once and
+        files of the dataset are not written concurrently. Requests on other
+        datasets are not blocked.
+
+        Args:
+            game: The game of the dataset.
+            conf: The dataset config.
+
+        Yields:
+            The dataset, while holding its lock.
+
+        Raises:
+            IOError: If the dataset does not exist.
+        """
+        ds, lock = self._resident(game, conf)
+        with lock:
+            yield ds
+
+    def datasets(self, params: dict) -> dict:
+        """List the resident datasets.
+
+        Args:
+            params: The request parameters, unused.
+
+        Returns:
+            The roots of the resident datasets.
+        """
+        with self._lock:
+            resident = [r[1] for r in self._datasets.values()]
+        return {'datasets': [io.unix_path(ds.root) for ds in resident]}
+
+    def load(self, params: dict) -> dict:
+        """Load a transcript context.
+
+        Args:
+            params: The request parameters.
+
+        Returns:
+            The transcript context and its final state in `split` orientation.
+        """
+        game_id = self._int(params, 'game_id')
+        rows = self._int(params, 'rows', -1)
+        with self.using(self._game(params), self._config(params)) as ds:
+            ctx = ds.load(game_id)
+            result = ctx.result()
+        if rows >= 0:
+            result = result.head(rows)
+        return {
+            'context': io.serialize_record(ctx),
+            'result': json.loads(result.to_json(orient='split', index=False))
+        }
+
+    def snapshot(self, params: dict) -> dict:
+        """Create a snapshot of a dataset without writing it.
+
+        Args:
+            params: The request parameters.
+
+        Returns:
+            The snapshot of the dataset.
+        """
+        debug = bool(self._int(params, 'debug', 1))
+        with self.using(self._game(params), self._config(params)) as ds:
+            return ds.snapshot(debug=debug)
+
+    def inspect(self, params: dict) -> dict:
+        """Create and write a snapshot of a dataset.
+
+        Args:
+            params: The request parameters.
+
+        Returns:
+            The snapshot of the dataset.
+        """
+        with self.using(self._game(params), self._config(params)) as ds:
+            return ds.inspect()
+
+    def filter(self, params: dict) -> dict:
+        """Select the valid transcripts of the default dataset by config.
+
+        Args:
+            params: The request parameters, the config is used as filter.
+
+        Returns:
+            The game ids matching the filter.
+        """
+        conf = self._config(params)
+        with self.using(self._game(params), DefaultDatasetConfig()) as ds:
+            ctx = ds.filter_context(conf)
+        game_ids = [] if ctx.empty else ctx.game_id.astype(int).tolist()
+        return {'size': len(game_ids), 'game_ids': game_ids}
+
+    def handle(self, endpoint: str, params: dict) -> dict:
+        """Dispatch a request to its endpoint.
+
+        Args:
+            endpoint: The endpoint, e.g. `load`.
+            params: The request parameters as parsed with `parse_qs`.
+
+        Returns:
+            The response.
+
+        Raises:
+            LookupError: If the endpoint does not exist.
+        """
+        handlers = {
+            'datasets': self.datasets,
+            'load': self.load,
+            'snapshot': self.snapshot,
+            'inspect': self.inspect,
+            'filter': self.filter
+        }
+        if endpoint not in handlers:
+            raise LookupError(f'Unknown endpoint: {endpoint}')
+        return handlers[endpoint](params)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    # Request handler shared by the TCP and Unix socket servers.
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        try:
+            status = 200
+            body = self.server.service.handle(
+                url.path.strip('/'), parse_qs(url.query)
+            )
+        except BadRequest as exc:
+            status, body = 400, {'error': str(exc)}
+        except (LookupError, ValueError, IOError) as exc:
+            status, body = 404, {'error': str(exc)}
+        except Exception as exc:
+            logger.exception('Request failed: %s', self.path)
+            status, body = 500, {'error': str(exc)}
+        data = json.dumps(body, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args) -> None:
+        logger.debug(fmt, *args)
+
+
+class _TCPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(service: DatasetService, host: str = DEFAULT_HOST,
+                  port: int = DEFAULT_PORT,
+                  socket_path: Path = None) -> socketserver.BaseServer:
+    """Create a server for the dataset service.
+
+    Args:
+        service: The service handling the requests.
+        host: The host to listen on, defaults to localhost only.
+        port: The port to listen on, `0` to pick a free one.
+        socket_path: The Unix socket to listen on instead of TCP, defaults to
+            None. An existing socket file is replaced.
+
+    Returns:
+        The server, not yet serving.
+    """
+    if socket_path is not None:
+        if socket_path.is_socket():
+            socket_path.unlink()
+        server = _UnixServer(str(socket_path), _Handler)
+    else:
+        server = _TCPServer((host, port), _Handler)
+    server.service = service
+    return server
+
+
+def serve(db: Path = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          socket_path: Path = None) -> None:
+    """Serve the datasets of a database until interrupted.
+
+    Args:
+        db: Path to the database, defaults to None to use `database`.
+        host: The host to listen on, defaults to localhost only.
+        port: The port to listen on.
+        socket_path: The Unix socket to listen on instead of TCP, defaults to
+            None.
+    """
+    server = create_server(DatasetService(db), host, port, socket_path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if socket_path is not None and socket_path.is_socket():
+            socket_path.unlink()
@@ -4,14 +4,29 @@
 
 Module implements functionality to run a pool executor.
 """
+import functools
 import logging
 import multiprocessing as mp
+import time
+
+from collections.abc import Callable, Iterable, Iterator
 
 from tqdm import tqdm
 
+from . import profiling
+
 logger = logging.getLogger(__name__)
 
 
+def default_processes() -> int:
+    """The default number of worker processes.
+
+    Returns:
+        The number of CPUs minus one for the parent, at least one.
+    """
+    return max(1, mp.cpu_count() - 1)
+
+
 class PoolRunner:
     """PoolRunner
 
@@ -20,28 +35,149 @@ class PoolRunner:
     Note that this is not race-condition proof. Hence, calling a function that
     writes to a common object, this method will fail.
 
+    The pool is started on demand and closed after each run. To reuse the
+    workers across several runs, use the runner as context manager:
+
+        with PoolRunner(target) as runner:
+            first = runner.run(items)
+            second = runner.run(other_items)
+
     Args:
         target: The function to be executed.
-        items: The arguments to invoke the function.
+        items: The arguments to invoke the function, defaults to None to pass
+            them on run.
+        processes: The number of worker processes, defaults to None to use
+            `default_processes`.
+        chunksize: The number of items sent to a worker at once, defaults to
+            None to adapt to the number of items and workers.
+        ordered: To yield results in order of the items, otherwise in order of
+            completion.
+        initializer: Function to call in each worker on start, defaults to
+            None.
+        initargs: The arguments to invoke the initializer.
+        progress: To display a progress bar.
     """
 
-    def __init__(self, target, items):
+    def __init__(self, target: Callable, items: Iterable = None,
+                 processes: int = None, chunksize: int = None,
+                 ordered: bool = True, initializer: Callable = None,
+                 initargs: tuple = (), progress: bool = True):
         self.target = target
         self.items = items
+        self.processes = processes or default_processes()
+        self.chunksize = chunksize
+        self.ordered = ordered
+        self.initializer = initializer
+        self.initargs = initargs
+        self.progress = progress
+        self._pool = None
+        self._managed = False
+
+    def __enter__(self) -> "PoolRunner":
+        self._start()
+        self._managed = True
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._managed = False
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
 
-    def run(self):
+    def _start(self) -> None:
+        # Start the worker processes if not running yet.
+        if self._pool is None:
+            initializer, initargs = self.initializer, self.initargs
+            profiler = profiling.active()
+            if profiler is not None and profiler.cprofile_dir is not None:
+                initializer = functools.partial(
+                    profiling.init_worker, profiler.cprofile_dir,
+                    self.initializer, self.initargs
+                )
+                initargs = ()
+            with profiling.stage('pool_start'):
+                self._pool = mp.Pool(
+                    processes=self.processes,
+                    initializer=initializer,
+                    initargs=initargs
+                )
+
+    def _chunksize(self, total: int | None) -> int:
+        # Send about four chunks per worker, as `Pool.map` does.
+        if self.chunksize is not None:
+            return self.chunksize
+        if not total:
+            return 1
+        chunksize, extra = divmod(total, self.processes * 4)
+        return chunksize + 1 if extra else chunksize
+
+    def close(self) -> None:
+        """Wait for the workers to finish and stop them."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def terminate(self) -> None:
+        """Stop the workers immediately."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def iterate(self, items: Iterable = None) -> Iterator:
+        """Run the pool executor and yield the results as they arrive.
+
+        Args:
+            items: The arguments to invoke the function, defaults to None to
+                use the items of the runner.
+
+        Yields:
+            The results of the processes.
+        """
+        if items is None:
+            items = self.items
+        total = len(items) if hasattr(items, '__len__') else None
+        self._start()
+        if self.ordered:
+            imap = self._pool.imap
+        else:
+            imap = self._pool.imap_unordered
+        profiler = profiling.active()
+        target = self.target
+        if profiler is not None:
+            target = profiling.ProfiledTarget(target)
+        start = time.perf_counter()
+        results = imap(target, items, self._chunksize(total))
+        completed = False
+        try:
+            with tqdm(total=total, disable=not self.progress) as pbar:
+                for res in results:
+                    pbar.update()
+                    if profiler is not None:
+                        res, pid, busy, drained = res
+                        profiler.add_task(pid, busy)
+                        profiler.merge(drained)
+                    yield res
+            completed = True
+        finally:
+            if profiler is not None:
+                profiler.add_pool(time.perf_counter() - start)
+            if not self._managed:
+                if completed:
+                    self.close()
+                else:
+                    self.terminate()
+
+    def run(self, items: Iterable = None) -> list:
         """Run the pool executor.
 
+        Args:
+            items: The arguments to invoke the function, defaults to None to
+                use the items of the runner.
+
         Returns:
             The results gathered from the processes.
         """
-        pool = mp.Pool(processes=mp.cpu_count() - 1)
-        results = []
-        with tqdm(total=len(self.items)) as pbar:
-            for res in pool.imap(self.target, self.items):
-                pbar.update()
-                results.append(res)
-                pbar.refresh()
-        pool.close()
-        pool.join()
-        return results
+        return list(self.iterate(items))
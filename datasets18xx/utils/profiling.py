@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Profiling
+
+Module implements a lightweight instrumentation of the dataset pipeline, i.e.
+stage timers, counters such as bytes read and written, and the busy and idle
+time of the pool workers. Instrumentation is a no-op unless enabled with
+`profile`, the profilers are imported on demand only:
+
+    with profiling.profile() as profiler:
+        ds.make()
+    report = profiler.report()
+
+Optionally, each worker process is profiled with `cProfile` and dumped to
+`worker-<pid>.prof`, the parent process to `main.prof`.
+"""
+import contextlib
+import logging
+import os
+import threading
+import time
+
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_profiler = None
+
+
+class Profiler:
+    """Profiler
+
+    Class implements a collector of stage timings and counters of a process.
+    Timings and counters of the workers are merged into the profiler of the
+    parent process.
+
+    Args:
+        cprofile_dir: The directory to dump the cProfile statistics of the
+            workers to, defaults to None to not profile the workers.
+    """
+
+    def __init__(self, cprofile_dir: Path = None):
+        self.cprofile_dir = cprofile_dir
+        self.pid = os.getpid()
+        self._start = time.perf_counter()
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._workers = {}
+        self._pool_seconds = 0.
+
+    def add_stage(self, name: str, seconds: float, calls: int = 1) -> None:
+        """Record the time spent in a stage.
+
+        Args:
+            name: The name of the stage.
+            seconds: The time spent.
+            calls: The number of times the stage was entered.
+        """
+        stage = self._stages.setdefault(name, {'seconds': 0., 'calls': 0})
+        stage['seconds'] += seconds
+        stage['calls'] += calls
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Increase a counter.
+
+        Args:
+            name: The name of the counter.
+            value: The value to add.
+        """
+        # Counters are increased from the threads of the batched I/O, too.
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def add_task(self, pid: int, seconds: float) -> None:
+        """Record a task completed by a worker.
+
+        Args:
+            pid: The process id of the worker.
+            seconds: The time the worker was busy with the task.
+        """
+        worker = self._workers.setdefault(
+            pid, {'tasks': 0, 'busy_seconds': 0.}
+        )
+        worker['tasks'] += 1
+        worker['busy_seconds'] += seconds
+
+    def add_pool(self, seconds: float) -> None:
+        """Record the time a pool of workers was running.
+
+        Args:
+            seconds: The time from submitting the first to receiving the last
+                task.
+        """
+        self._pool_seconds += seconds
+
+    def drain(self) -> dict:
+        """Take the stages and counters recorded so far.
+
+        Returns:
+            The recorded stages and counters, which are reset.
+        """
+        drained = {'stages': self._stages, 'counters': self._counters}
+        self._stages, self._counters = {}, {}
+        return drained
+
+    def merge(self, drained: dict) -> None:
+        """Merge the stages and counters of another profiler.
+
+        Args:
+            drained: The stages and counters, see `drain`.
+        """
+        for name, stage in drained['stages'].items():
+            self.add_stage(name, stage['seconds'], stage['calls'])
+        for name, value in drained['counters'].items():
+            self.count(name, value)
+
+    def report(self) -> dict:
+        """Create the report of the recorded stages and counters.
+
+        Returns:
+            The wall time, stages, counters, throughput and per-worker busy
+            and idle time.
+        """
+        wall = time.perf_counter() - self._start
+        stages = {
+            k: {'seconds': round(v['seconds'], 6), 'calls': v['calls']}
+            for k, v in self._stages.items()
+        }
+        workers = {
+            str(pid): {
+                'tasks': w['tasks'],
+                'busy_seconds': round(w['busy_seconds'], 6),
+                'idle_seconds': round(
+                    max(0., self._pool_seconds - w['busy_seconds']), 6
+                )
+            } for pid, w in self._workers.items()
+        }
+        transcripts = self._counters.get('transcripts', 0)
+        return {
+            'wall_seconds': round(wall, 6),
+            'stages': stages,
+            'counters': dict(self._counters),
+            'transcripts_per_second': round(transcripts / wall, 3),
+            'workers': workers
+        }
+
+
+def active() -> Profiler | None:
+    """The profiler of the current process.
+
+    Returns:
+        The profiler if profiling is enabled, otherwise None.
+    """
+    return _profiler
+
+
+@contextlib.contextmanager
+def profile(cprofile_dir: Path = None) -> Iterator[Profiler]:
+    """Enable profiling within the context.
+
+    Args:
+        cprofile_dir: The directory to dump cProfile statistics to, defaults
+            to None to not run cProfile.
+
+    Yields:
+        The profiler collecting the timings and counters.
+    """
+    global _profiler
+    previous, _profiler = _profiler, Profiler(cprofile_dir)
+    prof = None
+    if cprofile_dir is not None:
+        import cProfile
+        cprofile_dir.mkdir(parents=True, exist_ok=True)
+        prof = cProfile.Profile()
+        prof.enable()
+    try:
+        yield _profiler
+    finally:
+        if prof is not None:
+            prof.disable()
+            prof.dump_stats(cprofile_dir.joinpath('main.prof'))
+        _profiler = previous
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a stage, if profiling is enabled.
+
+    Args:
+        name: The name of the stage.
+    """
+    if _profiler is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _profiler.add_stage(name, time.perf_counter() - start)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Increase a counter, if profiling is enabled.
+
+    Args:
+        name: The name of the counter.
+        value: The value to add.
+    """
+    if _profiler is not None:
+        _profiler.count(name, value)
+
+
+def count_file(name: str, file: Path) -> None:
+    """Increase a counter by the size of a file, if profiling is enabled.
+
+    Args:
+        name: The name of the counter, e.g. `bytes_written`.
+        file: The file to add the size of.
+    """
+    if _profiler is not None:
+        _profiler.count(name, file.stat().st_size)
+
+
+class ProfiledTarget:
+    """ProfiledTarget
+
+    Class wraps the target of a pool worker to record its busy time as well
+    as the stages and counters recorded in the worker.
+
+    Args:
+        target: The function executed by the worker.
+    """
+
+    def __init__(self, target: Callable):
+        self.target = target
+
+    def __call__(self, item) -> tuple:
+        global _profiler
+        # Forked workers inherit the profiler of the parent, replace it.
+        if _profiler is None or _profiler.pid != os.getpid():
+            _profiler = Profiler()
+        start = time.perf_counter()
+        res = self.target(item)
+        busy = time.perf_counter() - start
+        return res, os.getpid(), busy, _profiler.drain()
+
+
+def _dump(prof, file: Path) -> None:
+    # Dump the statistics of a worker on its exit.
+    prof.disable()
+    prof.dump_stats(file)
+
+
+def init_worker(cprofile_dir: Path, initializer: Callable = None,
+                initargs: tuple = ()) -> None:
+    """Run cProfile in a worker until it exits.
+
+    The statistics are dumped to `worker-<pid>.prof` when the worker exits
+    normally, i.e. not when the pool is terminated.
+
+    Args:
+        cprofile_dir: The directory to dump the statistics to.
+        initializer: The initializer of the worker to run, defaults to None.
+        initargs: The arguments to invoke the initializer.
+    """
+    import cProfile
+    from multiprocessing import util
+    prof = cProfile.Profile()
+    file = cprofile_dir.joinpath(f'worker-{os.getpid()}.prof')
+    util.Finalize(None, _dump, args=(prof, file), exitpriority=10)
+    if initializer is not None:
+        initializer(*initargs)
+    prof.enable()
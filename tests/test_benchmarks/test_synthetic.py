@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from benchmarks import synthetic
+
+
+class TestSynthetic(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = Path(self.tmp.name)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_generate(self):
+        files = synthetic.generate(self.out, 25)
+        self.assertEqual(25, len(files))
+        self.assertEqual(
+            self.out.joinpath('1830', '1830_1000000', '1830_1000000.txt'),
+            files[0]
+        )
+        self.assertEqual(25, len(list(self.out.joinpath('1830').iterdir())))
+
+    def test_generate_perturbed(self):
+        source = synthetic.FIXTURE.joinpath('1830', '1830_179003')
+        players = synthetic._players(source)
+        text = source.joinpath('1830_179003.txt').read_text(encoding='utf-8')
+        perturbed = synthetic._perturb(text, players, synthetic.random.Random())
+        self.assertEqual(len(text.splitlines()), len(perturbed.splitlines()))
+        for player in players:
+            self.assertNotRegex(perturbed, rf'\b{player}\b')
+
+    def test_generate_seed(self):
+        first = synthetic.generate(self.out.joinpath('a'), 5, seed=1)
+        second = synthetic.generate(self.out.joinpath('b'), 5, seed=1)
+        for a, b in zip(first, second):
+            self.assertEqual(a.read_bytes(), b.read_bytes())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import subprocess
+import sys
+import unittest
+
+import click
+import transcripts18xx as trx
+
+from click.testing import CliRunner
+
+from datasets18xx import cli
+
+HEAVY_MODULES = ('pandas', 'pyarrow', 'requests', 'tqdm', 'transcripts18xx')
+
+
+class TestCli(unittest.TestCase):
+
+    def test_lazy_imports(self):
+        code = (
+            'import sys\n'
+            'from datasets18xx import cli\n'
+            'try:\n'
+            '    cli.app(["--help"])\n'
+            'except SystemExit:\n'
+            '    pass\n'
+            'print(",".join(sorted(sys.modules)))\n'
+        )
+        ret = subprocess.run(
+            [sys.executable, '-c', code],
+            capture_output=True, text=True, check=True
+        )
+        modules = {m.split('.')[0] for m in ret.stdout.strip().split(',')}
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_lazy_package(self):
+        import datasets18xx
+        from datasets18xx.core import config
+        self.assertIn('Dataset18xx', dir(datasets18xx))
+        self.assertIs(config.GameEnding, datasets18xx.GameEnding)
+        with self.assertRaises(AttributeError):
+            getattr(datasets18xx, 'missing')
+
+    def test_game_choice(self):
+        choice = cli.GameChoice()
+        self.assertEqual(trx.Games.G1830, choice.convert('G1830', None, None))
+        self.assertEqual(
+            trx.Games.G1830, choice.convert(trx.Games.G1830, None, None)
+        )
+        with self.assertRaises(click.BadParameter):
+            choice.convert('G0000', None, None)
+
+    def test_help(self):
+        result = CliRunner().invoke(cli.app, ['make', '--help'])
+        self.assertEqual(0, result.exit_code)
+        self.assertIn('--game GAME', result.output)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import tempfile
+import unittest
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from datasets18xx.core import aggregation
+from datasets18xx.io import columnar, local
+
+from tests import context
+
+
+class TestAggregation(unittest.TestCase):
+
+    def setUp(self) -> None:
+        db = context.mocked_database().joinpath('1830')
+        self.files = {}
+        for game_id in [179003, 179005, 179051]:
+            raw = db.joinpath(f'1830_{game_id}', f'1830_{game_id}.txt')
+            self.files[game_id] = local.result_file(raw)
+        self.tables = {
+            g: columnar.read_table(f).to_pandas()
+            for g, f in self.files.items()
+        }
+
+    def test_winner(self):
+        query = aggregation.Query(('winner_cash',), rows='last')
+        for game_id, file in self.files.items():
+            _, df = aggregation.partial_of_file((game_id, file, query))
+            last = self.tables[game_id].iloc[-1]
+            winner = last.filter(regex=r'player\d+_value').astype(float)
+            winner = winner.idxmax().removesuffix('_value')
+            self.assertEqual(last[f'{winner}_cash'], df['sum'].iloc[0])
+            self.assertEqual(1, df['count'].iloc[0])
+
+    def test_winner_missing(self):
+        df = pd.DataFrame({'player1_cash': [10, 20]})
+        query = aggregation.Query(('winner_cash',))
+        self.assertTrue(aggregation.partial(df, query).empty)
+        query = aggregation.Query(('winner_cash',), by=('phase',))
+        self.assertTrue(aggregation.partial(df.head(0), query).empty)
+
+    def test_reduce(self):
+        query = aggregation.Query(('PRR_share_price',), by=('phase',))
+        partials = pd.concat([
+            aggregation.partial(df, query) for df in self.tables.values()
+        ])
+        stats = aggregation.reduce(partials, ['phase']).set_index('phase')
+        tables = pd.concat(
+            t[['phase', 'PRR_share_price']] for t in self.tables.values()
+        )
+        expected = tables.groupby(tables.phase.astype(str)).PRR_share_price
+        np.testing.assert_array_equal(
+            expected.count().to_numpy(), stats['count'].to_numpy()
+        )
+        np.testing.assert_allclose(
+            expected.mean().to_numpy(), stats['mean'].to_numpy()
+        )
+        np.testing.assert_allclose(
+            expected.std().to_numpy(), stats['std'].to_numpy()
+        )
+        np.testing.assert_array_equal(
+            expected.max().to_numpy(), stats['max'].to_numpy()
+        )
+
+    def test_reduce_precision(self):
+        query = aggregation.Query(('player1_cash',))
+        rng = np.random.default_rng(0)
+        values = 1e9 + rng.normal(size=(4, 1000))
+        partials = pd.concat([
+            aggregation.partial(pd.DataFrame({'player1_cash': v}), query)
+            for v in values
+        ])
+        stats = aggregation.reduce(partials, [])
+        self.assertEqual(4000, stats['count'].iloc[0])
+        np.testing.assert_allclose(values.mean(), stats['mean'].iloc[0])
+        np.testing.assert_allclose(
+            values.std(ddof=1), stats['std'].iloc[0], rtol=1e-6
+        )
+
+    def test_reduce_empty(self):
+        stats = aggregation.reduce(pd.DataFrame(), ['phase'])
+        self.assertTrue(stats.empty)
+        self.assertListEqual(
+            ['phase', 'column'] + list(aggregation.STATS),
+            list(stats.columns)
+        )
+
+    def test_partial_cache(self):
+        query = aggregation.Query(('player1_cash',), by=('type',))
+        partials = {
+            g: ('key', aggregation.partial(df, query))
+            for g, df in self.tables.items()
+        }
+        partials[1] = (None, partials[179003][1])
+        with tempfile.TemporaryDirectory() as tmp:
+            partial_cache = aggregation.PartialCache(Path(tmp), query)
+            self.assertDictEqual({}, partial_cache.read())
+            partial_cache.write(partials)
+            cached = partial_cache.read()
+            self.assertListEqual(list(self.tables), list(cached))
+            record, df = cached[179005]
+            self.assertEqual('key', record)
+            pd.testing.assert_frame_equal(
+                partials[179005][1], df.reset_index(drop=True)
+            )
+            stale = pd.read_parquet(partial_cache._file)
+            stale.drop(columns='m2').to_parquet(partial_cache._file)
+            self.assertDictEqual({}, partial_cache.read())
+            other = aggregation.Query(('player2_cash',), by=('type',))
+            self.assertNotEqual(query.key(), other.key())
+
+
+if __name__ == '__main__':
+    unittest.main()
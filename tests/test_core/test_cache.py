@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import pickle
+import tempfile
+import unittest
+
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+from datasets18xx.core import cache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_max_items(self):
+        lru = cache.LRUCache(max_items=2)
+        lru.put('a', 1)
+        lru.put('b', 2)
+        self.assertEqual(1, lru.get('a'))
+        lru.put('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(1, lru.get('a'))
+        self.assertEqual(3, lru.get('c'))
+        self.assertDictEqual(
+            {'hits': 3, 'misses': 1, 'items': 2, 'bytes': 0}, lru.info()
+        )
+
+    def test_max_bytes(self):
+        df = pd.DataFrame({'a': range(100)})
+        size = cache.size_of(df)
+        lru = cache.LRUCache(max_items=10, max_bytes=2 * size)
+        for key in range(3):
+            lru.put(key, df)
+        self.assertEqual(2, len(lru))
+        self.assertIsNone(lru.get(0))
+        self.assertEqual(2 * size, lru.info()['bytes'])
+
+        lru.put('large', pd.DataFrame({'a': range(1000)}))
+        self.assertIsNone(lru.get('large'))
+        self.assertEqual(2, len(lru))
+
+    def test_disabled(self):
+        lru = cache.LRUCache(max_items=0)
+        lru.put('a', 1)
+        self.assertIsNone(lru.get('a'))
+
+    def test_clear(self):
+        lru = cache.LRUCache()
+        lru.put('a', 1)
+        lru.clear()
+        self.assertEqual(0, len(lru))
+
+    def test_pickle(self):
+        lru = cache.LRUCache(max_items=2)
+        lru.put('a', 1)
+        copied = pickle.loads(pickle.dumps(lru))
+        self.assertEqual(0, len(copied))
+        self.assertEqual(2, copied.max_items)
+        copied.put('b', 2)
+        self.assertEqual(2, copied.get('b'))
+
+
+class TestSpillCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spill = cache.SpillCache(Path(self.tmp.name))
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_context(self):
+        key = cache.SpillCache.key('abc', '1.0.0')
+        self.assertIsNone(self.spill.get('context', 123, key))
+        self.spill.put('context', 123, key, {'game_id': 123})
+        self.assertDictEqual(
+            {'game_id': 123}, self.spill.get('context', 123, key)
+        )
+
+    def test_result(self):
+        key = cache.SpillCache.key('abc', '1.0.0')
+        table = pa.table({'type': ['Bid', 'Pass'], 'cash': [1, 2]})
+        self.spill.put('result', 123, key, table)
+        self.assertTrue(table.equals(self.spill.get('result', 123, key)))
+
+    def test_outdated(self):
+        old = cache.SpillCache.key('abc', '1.0.0')
+        new = cache.SpillCache.key('abc', '1.0.1')
+        self.assertNotEqual(old, new)
+        self.spill.put('context', 123, old, 'old')
+        self.spill.put('context', 1234, old, 'other')
+        self.spill.put('context', 123, new, 'new')
+        self.assertIsNone(self.spill.get('context', 123, old))
+        self.assertEqual('new', self.spill.get('context', 123, new))
+        self.assertEqual('other', self.spill.get('context', 1234, old))
@@ -60,6 +60,33 @@ class TestDatasetConfig(unittest.TestCase):
         )
         self.assertEqual('BankBroke_PlayerGoesBankrupt', conf.suffix())
 
+    def test_init_wrong_filters(self):
+        with self.assertRaises(AttributeError):
+            # noinspection PyTypeChecker
+            config.DatasetConfig(game_ids=[179000, 179500])
+        with self.assertRaises(ValueError):
+            config.DatasetConfig(winner_score=(3000.5, None))
+        with self.assertRaises(ValueError):
+            # noinspection PyTypeChecker
+            config.DatasetConfig(verified='yes')
+
+    def test_suffix_filters(self):
+        conf = config.DatasetConfig(
+            num_players={4},
+            game_ids=(179000, 179500),
+            winner_score=(3000, None),
+            num_actions=(None, 2000),
+            verified=True,
+            unprocessed=False
+        )
+        self.assertEqual(
+            '4p_id179000-179500_score3000-_actions-2000_verified_clean',
+            conf.suffix()
+        )
+        self.assertEqual(conf, config.DatasetConfig.from_db(
+            f'1830_{conf.suffix()}'
+        ))
+
     def test_suffix_default(self):
         self.assertEqual(str(), config.DefaultDatasetConfig().suffix())
 
@@ -108,3 +135,15 @@ class TestDatasetConfig(unittest.TestCase):
             conf.game_ending
         )
 
+    def test_from_cli_filters(self):
+        conf = config.DatasetConfig.from_cli(
+            np=tuple([4]), ge=tuple(), filters='id179000-_unparsed'
+        )
+        self.assertEqual({4}, conf.num_players)
+        self.assertEqual((179000, None), conf.game_ids)
+        self.assertFalse(conf.parsed)
+        self.assertFalse(conf.needs_metadata())
+
+        with self.assertRaises(ValueError) as e:
+            config.DatasetConfig.from_cli(filters='score-_fast')
+        self.assertEqual('Unknown filter: fast', e.exception.__str__())
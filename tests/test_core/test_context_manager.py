@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import tempfile
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+
+from datasets18xx.core import config, context_manager
+
+
+def mocked_context(game_id: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        raw=Path(f'1830_{game_id}', f'1830_{game_id}.txt'),
+        game_id=game_id,
+        unprocessed_lines=[f'line {game_id}']
+    )
+
+
+class TestContextWriter(unittest.TestCase):
+
+    def test_write(self):
+        with context_manager.ContextWriter(batch_size=2) as writer:
+            for game_id in range(3):
+                writer.write(mocked_context(game_id))
+                self.assertEqual(game_id + 1, len(writer))
+        self.assertEqual(2, len(writer.frames()))
+        df = writer.read()
+        self.assertListEqual([0, 1, 2], df.game_id.tolist())
+        self.assertListEqual(['line 2'], list(df.unprocessed_lines.iloc[2]))
+
+    def test_failed_write(self):
+        with self.assertRaises(RuntimeError):
+            with context_manager.ContextWriter(2) as writer:
+                for game_id in range(3):
+                    writer.write(mocked_context(game_id))
+                raise RuntimeError
+        self.assertListEqual([], writer.frames())
+        self.assertTrue(writer.read().empty)
+
+
+class TestContextManager(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name).joinpath('context.parquet')
+        self.manager = context_manager.ContextManager(self.path)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_stream_context(self):
+        file_list = [mocked_context(i).raw for i in range(3)]
+        contexts = (mocked_context(i) for i in [2, 0, 1])
+        self.manager.stream_context(contexts, file_list)
+        df = self.manager.get_context()
+        self.assertListEqual([0, 1, 2], df.game_id.tolist())
+        files = [p.name for p in self.path.parent.iterdir()]
+        self.assertListEqual(['context.parquet'], files)
+
+        file_list = [mocked_context(i).raw for i in [1, 2, 3]]
+        contexts = (mocked_context(i) for i in [3])
+        self.manager.stream_context(contexts, file_list)
+        df = context_manager.ContextManager(self.path).get_context()
+        self.assertListEqual([1, 2, 3], df.game_id.tolist())
+
+        self.manager.stream_context(iter([]), file_list)
+        df = self.manager.get_context()
+        self.assertListEqual([1, 2, 3], df.game_id.tolist())
+
+        self.manager.stream_context(iter([]), [])
+        df = self.manager.get_context()
+        self.assertTrue(df.empty)
+        self.assertIn('game_id', df.columns)
+
+    def test_stream_context_failed(self):
+        def contexts():
+            yield from (mocked_context(i) for i in range(3))
+            raise RuntimeError
+
+        file_list = [mocked_context(i).raw for i in range(3)]
+        with self.assertRaises(RuntimeError):
+            self.manager.stream_context(contexts(), file_list)
+        self.assertListEqual([], list(self.path.parent.iterdir()))
+        self.manager.stream_context(
+            (mocked_context(i) for i in range(3)), file_list
+        )
+        files = [p.name for p in self.path.parent.iterdir()]
+        self.assertListEqual(['context.parquet'], files)
+
+    def test_legacy_context(self):
+        file_list = [mocked_context(i).raw for i in range(3)]
+        contexts = (mocked_context(i) for i in range(3))
+        self.manager.stream_context(contexts, file_list)
+        legacy = self.path.with_suffix('.csv')
+        self.manager.export_csv(legacy)
+        self.path.unlink()
+
+        manager = context_manager.ContextManager(self.path)
+        self.assertTrue(self.path.exists())
+        df = manager.get_context()
+        self.assertListEqual([0, 1, 2], df.game_id.tolist())
+        self.assertListEqual(['line 1'], list(df.unprocessed_lines.iloc[1]))
+
+
+class TestContextManagerLookup(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name).joinpath('context.parquet')
+        self.manager = context_manager.ContextManager(self.path)
+        self.manager.add_context(pd.DataFrame({
+            'raw': [f'1830_{i}/1830_{i}.txt' for i in range(4)],
+            'game_id': [0, 1, 2, 3],
+            'valid': [True, True, False, True],
+            'num_players': [3, 4, 4, 5],
+            'game_ending': ['BankBroke', 'BankBroke', None, 'NotFinished'],
+            'unprocessed_lines': [[], [], [], []]
+        }))
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_raw_transcript(self):
+        self.assertEqual('1830_1/1830_1.txt', self.manager.raw_transcript(1))
+        self.assertIsNone(self.manager.raw_transcript(2))
+        self.assertIsNone(self.manager.raw_transcript(4))
+
+    def test_raw_transcripts(self):
+        self.assertDictEqual(
+            {3: '1830_3/1830_3.txt', 1: '1830_1/1830_1.txt'},
+            self.manager.raw_transcripts([3, 2, 1, 4])
+        )
+        found = self.manager.raw_transcripts([3, 1])
+        self.assertListEqual([3, 1], list(found))
+
+    def test_concurrent_lookup(self):
+        n = 200000
+        self.manager.add_context(pd.DataFrame({
+            'raw': [f'1830_{i}/1830_{i}.txt' for i in range(n)],
+            'game_id': list(range(n)),
+            'valid': [True] * n,
+            'num_players': [4] * n,
+            'game_ending': ['BankBroke'] * n,
+            'unprocessed_lines': [[]] * n
+        }))
+        conf = config.DatasetConfig(num_players={4})
+        with ThreadPoolExecutor(4) as executor:
+            found = list(executor.map(
+                lambda _: self.manager.raw_transcript(n - 1), range(20)
+            ))
+            masks = list(executor.map(
+                lambda _: self.manager.mask(conf).sum(), range(8)
+            ))
+        self.assertListEqual([f'1830_{n - 1}/1830_{n - 1}.txt'] * 20, found)
+        self.assertListEqual([n] * 8, masks)
+
+    def test_subset_context(self):
+        conf = config.DatasetConfig(
+            num_players={4, 5},
+            game_ending={config.GameEnding.BankBroke}
+        )
+        df = self.manager.subset_context(conf)
+        self.assertListEqual([1], df.game_id.tolist())
+        conf = config.DatasetConfig(num_players={4, 6})
+        df = self.manager.subset_context(conf)
+        self.assertListEqual([1, 2], df.game_id.tolist())
+        conf = config.DatasetConfig(
+            game_ending={config.GameEnding.PlayerGoesBankrupt}
+        )
+        self.assertTrue(self.manager.subset_context(conf).empty)
+
+    def test_invalidate(self):
+        self.assertIsNone(self.manager.raw_transcript(4))
+        df = self.manager.get_context()
+        df.loc[len(df)] = ['1830_4/1830_4.txt', 4, True, 4, 'BankBroke', []]
+        self.manager.add_context(df)
+        self.assertEqual('1830_4/1830_4.txt', self.manager.raw_transcript(4))
+        conf = config.DatasetConfig(num_players={4})
+        df = self.manager.subset_context(conf)
+        self.assertListEqual([1, 2, 4], df.game_id.tolist())
+
+    def test_mask(self):
+        self.manager.add_context(pd.DataFrame({
+            'raw': [f'1830_{i}/1830_{i}.txt' for i in range(4)],
+            'game_id': [10, 11, 12, 13],
+            'valid': [True, True, False, True],
+            'parse_result': ['SUCCESS', 'SUCCESS', 'ParseError', 'SUCCESS'],
+            'verification_result': [True, False, None, True],
+            'unprocessed_lines': [[], ['line'], [], []]
+        }))
+        conf = config.DatasetConfig(game_ids=(11, None), verified=True)
+        self.assertListEqual(
+            [False, False, False, True], self.manager.mask(conf).tolist()
+        )
+        conf = config.DatasetConfig(parsed=False)
+        df = self.manager.subset_context(conf)
+        self.assertListEqual([12], df.game_id.tolist())
+        conf = config.DatasetConfig(unprocessed=False, game_ids=(None, 12))
+        df = self.manager.subset_context(conf)
+        self.assertListEqual([10, 12], df.game_id.tolist())
+
+        conf = config.DatasetConfig(winner_score=(3000, None))
+        with self.assertRaises(ValueError):
+            self.manager.mask(conf)
+        self.manager.set_metadata(pd.DataFrame({
+            'game_id': [13, 11, 10],
+            'winner_score': [2500, 3500, 3000],
+            'num_actions': [900, 1200, 1500]
+        }))
+        df = self.manager.subset_context(conf)
+        self.assertListEqual([10, 11], df.game_id.tolist())
+        conf = config.DatasetConfig(num_actions=(1000, 1400))
+        df = self.manager.subset_context(conf)
+        self.assertListEqual([11], df.game_id.tolist())
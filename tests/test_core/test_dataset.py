@@ -2,14 +2,20 @@
 # -*- coding: utf-8 -*-
 import os
 import shutil
+import tempfile
 import unittest
 
 from collections import Counter
 from pathlib import Path
+from unittest import mock
 
+import pandas as pd
 import transcripts18xx as trx
 
-from datasets18xx.core import dataset, config
+from datasets18xx.core import aggregation, cache, dataset, config
+from datasets18xx.core import metadata_index
+from datasets18xx.io import columnar, io, local
+from datasets18xx.utils import profiling
 
 from tests import context
 
@@ -27,6 +33,11 @@ class TestDataset(unittest.TestCase):
     def setUp(self) -> None:
         self.ds = context.mocked_dataset()
 
+    def tearDown(self) -> None:
+        # Derived files must not leak into the fixtures of other tests.
+        derived = self.ds.root.joinpath(local.DERIVED_DIR)
+        shutil.rmtree(derived, ignore_errors=True)
+
     def test_make(self):
         self.ds.prune()
         n_files_prune = self.count_files_in_dataset(self.ds)
@@ -35,8 +46,47 @@ class TestDataset(unittest.TestCase):
         self.ds.make(force=True)
         n_files_make = self.count_files_in_dataset(self.ds)
         self.assertEqual(20, n_files_make['.txt'])
-        self.assertEqual(20, n_files_make['.json'])
-        self.assertEqual(18, n_files_make['.csv'])
+        self.assertEqual(21, n_files_make['.json'])
+        self.assertEqual(17, n_files_make['.csv'])
+        self.assertEqual(2, n_files_make['.parquet'])
+
+    def test_make_incremental(self):
+        self.ds.make(force=True)
+        result = self.ds.root.joinpath(
+            '1830_179003', '1830_179003_final.csv'
+        )
+        modified = result.stat().st_mtime_ns
+
+        df = self.ds.make()
+        self.assertEqual(modified, result.stat().st_mtime_ns)
+        self.assertEqual(20, df.shape[0])
+
+        raw = self.ds.root.joinpath('1830_179003', '1830_179003.txt')
+        raw.touch()
+        df = self.ds.make()
+        self.assertEqual(modified, result.stat().st_mtime_ns)
+        self.assertEqual(20, df.shape[0])
+
+    def test_make_single_pass(self):
+        self.ds.make()
+        with profiling.profile() as profiler, mock.patch.object(
+                metadata_index, 'read_rows', side_effect=AssertionError
+        ):
+            self.ds.make(force=True)
+        report = profiler.report()
+        self.assertEqual(20, report['counters']['transcripts'])
+        self.assertEqual(20, report['stages']['parse']['calls'])
+        self.assertEqual(20, report['stages']['extract_context']['calls'])
+        self.assertEqual(20, report['stages']['metadata_row']['calls'])
+        meta = self.ds.metadata(valid_only=False)
+        self.assertEqual(20, meta.shape[0])
+        self.assertEqual(17, meta.num_actions.notna().sum())
+
+        with profiling.profile() as profiler:
+            self.ds.make()
+        report = profiler.report()
+        self.assertNotIn('parse', report['stages'])
+        self.assertNotIn('transcripts', report['counters'])
 
     def test_context(self):
         self.ds.make()
@@ -48,6 +98,15 @@ class TestDataset(unittest.TestCase):
         df2 = self.ds.context(valid_only=True)
         self.assertEqual(14, df2.shape[0])
 
+    def test_export_context(self):
+        self.ds.make()
+        file = self.ds.export_context()
+        self.assertEqual('context.csv', file.name)
+        df = pd.read_csv(file)
+        self.assertListEqual(list(self.ds.context().columns), list(df.columns))
+        self.assertEqual(20, df.shape[0])
+        file.unlink()
+
     def test_inspect(self):
         self.ds.make()
         snapshot = self.ds.inspect()
@@ -61,6 +120,19 @@ class TestDataset(unittest.TestCase):
         self.assertTrue('unprocessed_lines' in snapshot['debug'])
         self.assertTrue('parse_errors' in snapshot['debug'])
         self.assertTrue('verify_errors' in snapshot['debug'])
+        self.assertListEqual([], snapshot['debug']['missing_results'])
+
+        raw = Path(self.ds.context(valid_only=True).raw.iloc[0])
+        result = local.result_file(raw)
+        content = result.read_bytes()
+        result.unlink()
+        try:
+            snapshot = self.ds.inspect()
+        finally:
+            result.write_bytes(content)
+        self.assertListEqual(
+            [io.unix_path(raw)], snapshot['debug']['missing_results']
+        )
 
     def test_subset(self):
         self.ds.make()
@@ -71,9 +143,9 @@ class TestDataset(unittest.TestCase):
         new_ds = self.ds.subset(new_conf)
 
         n_files_subset = self.count_files_in_dataset(new_ds)
-        self.assertEqual(6, n_files_subset['.txt'])
-        self.assertEqual(7, n_files_subset['.json'])
-        self.assertEqual(7, n_files_subset['.csv'])
+        self.assertEqual(0, n_files_subset['.txt'])
+        self.assertEqual(2, n_files_subset['.json'])
+        self.assertEqual(2, n_files_subset['.parquet'])
 
         snapshot = new_ds.inspect()
         self.assertEqual(6, snapshot['size'])
@@ -81,8 +153,242 @@ class TestDataset(unittest.TestCase):
         self.assertEqual({4: 3, 3: 2}, snapshot['num_players'])
         self.assertEqual(5, snapshot['game_endings']['BankBroke'])
 
+        raw = set(Path(f) for f in new_ds.context().raw)
+        self.assertTrue(raw.issubset(set(self.ds._raw)))
+        self.assertListEqual(sorted(raw), sorted(new_ds._raw))
+
+        new_ds.prune()
+        self.assertTrue(new_ds.root.joinpath('view.json').exists())
+
+        shutil.rmtree(new_ds.root)
+
+    def test_subset_reload(self):
+        self.ds.make()
+        new_conf = config.DatasetConfig(
+            num_players={3, 4},
+            game_ending={config.GameEnding.BankBroke}
+        )
+        new_ds = self.ds.subset(new_conf)
+        game_id = int(new_ds.context(valid_only=True).game_id.iloc[0])
+
+        ctx = self.ds.context()
+        ctx.loc[ctx.game_id == game_id, 'valid'] = False
+        self.ds._ctx_manager.add_context(ctx)
+        self.ds.make()
+        new_ds = dataset.Dataset18xx(self.ds.db, self.ds.game, new_conf)
+        self.assertNotIn(game_id, new_ds.context(valid_only=True).game_id)
+        self.assertEqual(6, len(new_ds.metadata(valid_only=False)))
+        self.assertEqual(4, io.read_json(new_ds._metadata_path)['valid'])
+        with mock.patch.object(dataset.Dataset18xx, '_slice_view') as sliced:
+            dataset.Dataset18xx(self.ds.db, self.ds.game, new_conf)
+        sliced.assert_not_called()
+
+        shutil.rmtree(new_ds.root)
+
+    def test_subset_materialized(self):
+        self.ds.make()
+        new_conf = config.DatasetConfig(
+            num_players={3, 4},
+            game_ending={config.GameEnding.BankBroke}
+        )
+        new_ds = self.ds.subset(new_conf, materialize='link')
+
+        n_files_subset = self.count_files_in_dataset(new_ds)
+        self.assertEqual(6, n_files_subset['.txt'])
+        self.assertEqual(8, n_files_subset['.json'])
+        self.assertEqual(6, n_files_subset['.csv'])
+        self.assertEqual(2, n_files_subset['.parquet'])
+
+        for file in new_ds.context().raw:
+            self.assertTrue(Path(file).is_relative_to(new_ds.root))
+        self.assertEqual(6, len(new_ds._raw))
+        self.assertEqual(6, new_ds.inspect()['size'])
+
+        shutil.rmtree(new_ds.root)
+
+    def test_read_results(self):
+        self.ds.make(force=True, to_columnar=True)
+        n_files_make = self.count_files_in_dataset(self.ds)
+        self.assertEqual(19, n_files_make['.parquet'])
+
+        df = self.ds.read_results(
+            columns=['player1_cash', 'player2_cash'],
+            game_ids=[179003, 179005]
+        )
+        self.assertListEqual(
+            ['game_id', 'player1_cash', 'player2_cash'], list(df.columns)
+        )
+        self.assertEqual({179003, 179005}, set(df.game_id))
+
+        self.ds.make(force=True)
+        n_files_make = self.count_files_in_dataset(self.ds)
+        self.assertEqual(2, n_files_make['.parquet'])
+
+    def test_pack(self):
+        self.ds.make()
+        expected = self.ds.read_results(game_ids=[179003, 179005])
+        result = self.ds.result(179003)
+        file = self.ds.pack()
+        self.assertTrue(file.exists())
+
+        df = self.ds.read_results(game_ids=[179003, 179005])
+        self.assertEqual(expected.shape[0], df.shape[0])
+        self.assertListEqual(
+            expected.player1_cash.tolist(), df.player1_cash.tolist()
+        )
+
+        with mock.patch.object(columnar, 'read_table', side_effect=OSError):
+            packed = self.ds.result(179003)
+        self.assertListEqual(list(result.columns), list(packed.columns))
+        self.assertListEqual(
+            result.player1_cash.tolist(), packed.player1_cash.tolist()
+        )
+
+        self.ds.make()
+        self.assertFalse(file.exists())
+
+    def test_export_tensors(self):
+        self.ds.make()
+        path = self.ds.export_tensors()
+        bundle = self.ds.read_tensors()
+        game_ids = self.ds.context(valid_only=True).game_id.tolist()
+        self.assertSetEqual(set(game_ids), set(bundle.game_ids()))
+        self.assertEqual(
+            self.ds.read_results(columns=['type']).shape[0],
+            bundle.actions.shape[0]
+        )
+
+        self.ds.make()
+        self.assertFalse(path.exists())
+        with self.assertRaises(IOError):
+            self.ds.read_tensors()
+
+    def test_load_cached(self):
+        self.ds.make()
+        ctx = self.ds.load(179003)
+        self.assertIs(ctx, self.ds.load(179003))
+        self.assertEqual(1, self.ds.cache_info()['hits'])
+        with self.assertRaises(ValueError):
+            self.ds.load(179295)
+
+        df = self.ds.result(179003, columns=['player1_cash', 'missing'])
+        self.assertListEqual(['player1_cash'], list(df.columns))
+        hits = self.ds.cache_info()['hits']
+        df['player1_cash'] = -1
+        cached = self.ds.result(179003, ['player1_cash', 'missing'])
+        self.assertEqual(hits + 1, self.ds.cache_info()['hits'])
+        self.assertFalse((cached.player1_cash == -1).any())
+
+        self.ds.make()
+        self.assertEqual(0, self.ds.cache_info()['items'])
+        self.assertIsNot(ctx, self.ds.load(179003))
+
+    def test_load_spilled(self):
+        self.ds.make()
+        with tempfile.TemporaryDirectory() as tmp:
+            conf = cache.CacheConfig(spill_dir=Path(tmp))
+            ds = dataset.Dataset18xx(
+                self.ds.db, self.ds.game, self.ds.conf, conf
+            )
+            ctx = ds.load(179003)
+            expected = ds.result(179003)
+            self.assertEqual(1, len(list(Path(tmp).rglob('179003-*.pickle'))))
+            self.assertEqual(1, len(list(Path(tmp).rglob('179003-*.arrow'))))
+
+            ds = dataset.Dataset18xx(
+                self.ds.db, self.ds.game, self.ds.conf, conf
+            )
+            with mock.patch.object(
+                    trx.TranscriptContext, 'from_raw', side_effect=OSError
+            ):
+                self.assertEqual(ctx.game_id, ds.load(179003).game_id)
+            pd.testing.assert_frame_equal(expected, ds.result(179003))
+
+    def test_load_many(self):
+        self.ds.make()
+        game_ids = [179003, 179005, 179051]
+        results = dict(self.ds.load_many(game_ids, columns=['player1_cash']))
+        self.assertListEqual(sorted(game_ids), sorted(results))
+        for df in results.values():
+            self.assertListEqual(['player1_cash'], list(df.columns))
+            df.drop(columns='player1_cash', inplace=True)
+        results = dict(self.ds.load_many(game_ids, columns=['player1_cash']))
+        for df in results.values():
+            self.assertListEqual(['player1_cash'], list(df.columns))
+
+        df = self.ds.load_many(game_ids + [179003], concat=True, processes=2)
+        self.assertEqual('game_id', df.columns[0])
+        self.assertListEqual(game_ids, list(df.game_id.unique()))
+        expected = self.ds.read_results(game_ids=game_ids)
+        self.assertEqual(expected.shape[0], df.shape[0])
+
+        with self.assertRaises(ValueError):
+            self.ds.load_many([179003, 179295])
+
+    def test_load_many_parallel(self):
+        self.ds.make()
+        game_ids = self.ds.context(valid_only=True).game_id.tolist()
+        with mock.patch.object(dataset, '_MIN_PARALLEL', 1):
+            df = self.ds.load_many(game_ids, concat=True, processes=2)
+        self.assertEqual(set(game_ids), set(df.game_id))
+
+    def test_metadata(self):
+        self.ds.make()
+        self.assertTrue(self.ds.root.joinpath('metadata.parquet').exists())
+        df = self.ds.metadata()
+        self.assertSetEqual(
+            set(self.ds.context(valid_only=True).game_id), set(df.game_id)
+        )
+        self.assertEqual(20, len(self.ds.metadata(valid_only=False)))
+        conf = config.DatasetConfig(
+            num_players={4}, game_ending={config.GameEnding.BankBroke}
+        )
+        df = self.ds.metadata(conf)
+        self.assertEqual(3, len(df))
+        self.assertTrue((df.winner_cash >= 0).all())
+
+        new_ds = self.ds.subset(conf)
+        self.assertListEqual(
+            df.game_id.tolist(), new_ds.metadata().game_id.tolist()
+        )
         shutil.rmtree(new_ds.root)
 
+    def test_filter_context(self):
+        self.ds.make()
+        meta = self.ds.metadata()
+        conf = config.DatasetConfig(
+            num_actions=(1000, None), game_ids=(179100, None)
+        )
+        df = self.ds.filter_context(conf)
+        expected = meta[(meta.num_actions >= 1000) & (meta.game_id >= 179100)]
+        self.assertSetEqual(set(expected.game_id), set(df.game_id))
+
+        conf = config.DatasetConfig.from_cli(filters='unparsed')
+        self.assertTrue(self.ds.filter_context(conf).empty)
+
+    def test_aggregate(self):
+        self.ds.make()
+        stats = self.ds.aggregate(
+            ['winner_cash'], by=['num_players'], rows='last'
+        )
+        self.assertEqual(14, stats['count'].sum())
+        self.assertListEqual(['winner_cash'], stats.column.unique().tolist())
+
+        with mock.patch.object(
+                aggregation, 'partial_of_file', side_effect=OSError
+        ):
+            cached = self.ds.aggregate(
+                ['winner_cash'], by=['num_players'], rows='last'
+            )
+        pd.testing.assert_frame_equal(stats, cached)
+
+        with self.assertRaises(ValueError):
+            self.ds.aggregate(['winner_cash'], rows='first')
+
+        # The cached partials are not taken for a record.
+        self.assertEqual(20, len(local.find_raw_transcripts(self.ds.root)))
+        self.assertEqual(20, self.ds.make().shape[0])
+
     def test_from_db(self):
         dataset_root = context.mocked_database().joinpath('1830')
         ds = dataset.Dataset18xx.from_db(dataset_root)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+
+import numpy as np
+
+from datasets18xx.core import loader
+
+from tests import context
+
+
+class TestStreamingLoader(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.ds = context.mocked_dataset()
+        self.ds.make()
+        self.rows = self.ds.load_many(
+            self.ds.context(valid_only=True).game_id.tolist(), concat=True
+        ).shape[0]
+
+    def test_batches(self):
+        sl = loader.StreamingLoader(
+            self.ds, 64, columns=['player1_cash', 'type'], prefetch=2
+        )
+        batches = list(sl)
+        self.assertEqual(self.rows, sum(len(b['game_id']) for b in batches))
+        for batch in batches[:-1]:
+            self.assertEqual(64, len(batch['player1_cash']))
+        self.assertEqual(np.float32, batches[0]['player1_cash'].dtype)
+        self.assertEqual(object, batches[0]['type'].dtype)
+        self.assertEqual(
+            sorted(sl.shard()), list(dict.fromkeys(
+                np.concatenate([b['game_id'] for b in batches]).tolist()
+            ))
+        )
+
+        sl.drop_last = True
+        self.assertEqual(self.rows // 64, len(list(sl)))
+
+    def test_shuffle(self):
+        sl = loader.StreamingLoader(
+            self.ds, 32, columns=['player1_cash'], shuffle_buffer=256, seed=1
+        )
+        first = np.concatenate([b['game_id'] for b in sl])
+        self.assertEqual(self.rows, len(first))
+        self.assertListEqual(
+            first.tolist(), np.concatenate([b['game_id'] for b in sl]).tolist()
+        )
+        sl.set_epoch(1)
+        second = np.concatenate([b['game_id'] for b in sl])
+        self.assertListEqual(sorted(first), sorted(second))
+        self.assertNotEqual(first.tolist(), second.tolist())
+
+    def test_shard(self):
+        shards = [
+            loader.StreamingLoader(
+                self.ds, 16, shuffle_buffer=64, rank=rank, world_size=2,
+                worker_id=worker, num_workers=2
+            ).shard() for rank in range(2) for worker in range(2)
+        ]
+        game_ids = sum(shards, [])
+        self.assertEqual(len(game_ids), len(set(game_ids)))
+        self.assertSetEqual(
+            set(self.ds.context(valid_only=True).game_id), set(game_ids)
+        )
+        with self.assertRaises(ValueError):
+            loader.StreamingLoader(self.ds, 16, rank=2, world_size=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import unittest
+
+from pathlib import Path
+from unittest import mock
+
+from datasets18xx.core import manifest
+
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.path = self.root.joinpath('manifest.json')
+        self.files = []
+        for i in range(3):
+            file = self.root.joinpath(f'1830_{i}.txt')
+            file.write_text(f'transcript {i}')
+            self.files.append(file)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def record(self) -> None:
+        records = manifest.Manifest(self.path)
+        records.update(self.files)
+        records.save()
+
+    def test_stale_new(self):
+        records = manifest.Manifest(self.path)
+        self.assertIsNone(records.parser())
+        self.assertListEqual(self.files, records.stale(self.files))
+
+    def test_stale_unchanged(self):
+        self.record()
+        records = manifest.Manifest(self.path)
+        self.assertEqual(manifest.parser_version(), records.parser())
+        self.assertListEqual([], records.stale(self.files))
+
+    def test_stale_changed(self):
+        self.record()
+        os.utime(self.files[0], ns=(0, 0))
+        self.files[1].write_text('changed transcript')
+        new = self.root.joinpath('1830_3.txt')
+        new.write_text('transcript 3')
+        records = manifest.Manifest(self.path)
+        self.assertListEqual(
+            [self.files[1], new], records.stale(self.files + [new])
+        )
+
+    def test_stale_parser_changed(self):
+        self.record()
+        records = manifest.Manifest(self.path)
+        with mock.patch.object(manifest, 'parser_version', return_value='0'):
+            self.assertListEqual(self.files, records.stale(self.files))
+
+    def test_update(self):
+        self.record()
+        records = manifest.Manifest(self.path)
+        digest = records.digest(self.files[0])
+        self.assertEqual(64, len(digest))
+        records.update(self.files[1:])
+        self.assertIsNone(records.digest(self.files[0]))
+
+    def test_hash_once(self):
+        records = manifest.Manifest(self.path)
+        with mock.patch.object(
+                manifest.io, 'file_hash', wraps=manifest.io.file_hash
+        ) as file_hash:
+            records.stale(self.files)
+            records.update(self.files)
+        self.assertEqual(len(self.files), file_hash.call_count)
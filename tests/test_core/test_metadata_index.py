@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import tempfile
+import unittest
+
+from pathlib import Path
+from unittest import mock
+
+from datasets18xx.core import metadata_index
+from datasets18xx.io import columnar, io, local
+
+from tests import context
+
+
+class TestMetadataIndex(unittest.TestCase):
+
+    def setUp(self) -> None:
+        db = context.mocked_database().joinpath('1830')
+        self.raw = local.find_raw_transcripts(db)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name).joinpath('metadata.parquet')
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_flatten(self):
+        raw = [f for f in self.raw if f.stem == '1830_179003'][0]
+        meta = io.read_json(local.metadata_file(raw))
+        row = metadata_index.flatten(meta)
+        self.assertEqual(179003, row['game_id'])
+        self.assertEqual('BankBroke', row['game_ending'])
+        self.assertEqual(meta['winner'], row['winner'])
+        winner = meta['final_state']['players'][meta['winner']]
+        self.assertEqual(winner['cash'], row['winner_cash'])
+        self.assertEqual(1, row[f'{meta["winner"]}_rank'])
+        self.assertEqual(
+            winner['shares']['PRR'], row[f'{meta["winner"]}_shares_PRR']
+        )
+        self.assertEqual(
+            meta['final_state']['companies']['PRR']['trains']['D'],
+            row['PRR_trains_D']
+        )
+        self.assertNotIn('player1_name', row)
+
+    def test_flatten_unmapped(self):
+        raw = {f.stem: f for f in self.raw}
+        meta = io.read_json(local.metadata_file(raw['1830_179212']))
+        row = metadata_index.flatten(meta)
+        self.assertEqual('Sheldon', row['winner'])
+        self.assertEqual(600, row['winner_score'])
+        self.assertNotIn('Sheldon_rank', row)
+        self.assertEqual(4, row['player1_rank'])
+
+        meta = io.read_json(local.metadata_file(raw['1830_179489']))
+        row = metadata_index.flatten(meta)
+        self.assertEqual(3, row['player3_rank'])
+        self.assertEqual(1261, row['player3_score'])
+        self.assertFalse(any(c.startswith('max1player1xx_') for c in row))
+
+        index = metadata_index.MetadataIndex(self.path)
+        index.update(metadata_index.read_rows(self.raw), self.raw)
+        players = {
+            c.split('_')[0] for c in index.get().columns
+            if c.endswith('_rank')
+        }
+        self.assertTrue(all(metadata_index.PLAYER_ID.fullmatch(p)
+                            for p in players))
+
+    def test_read_row(self):
+        raw = [f for f in self.raw if f.stem == '1830_179003'][0]
+        row = metadata_index.read_row(raw)
+        self.assertEqual(io.unix_path(raw), row['raw'])
+        self.assertEqual(1700, row['num_actions'])
+        with mock.patch.object(columnar, 'num_rows') as num_rows:
+            row = metadata_index.read_row(raw, num_actions=1700)
+        num_rows.assert_not_called()
+        self.assertEqual(1700, row['num_actions'])
+
+    def test_update(self):
+        index = metadata_index.MetadataIndex(self.path)
+        self.assertFalse(index.exists())
+        self.assertTrue(index.get().empty)
+        index.update(metadata_index.read_rows(self.raw), self.raw)
+        self.assertTrue(index.exists())
+
+        df = metadata_index.MetadataIndex(self.path).get()
+        self.assertEqual(len(self.raw), len(df))
+        self.assertListEqual(sorted(df.raw), df.raw.tolist())
+        self.assertListEqual(
+            [179005, 179158, 179175, 179190],
+            df.query(
+                "num_players in [4] and game_ending in ['BankBroke']"
+            ).game_id.tolist()
+        )
+
+        index.update([], self.raw[:-1], stale=self.raw[:1])
+        df = metadata_index.MetadataIndex(self.path).get()
+        self.assertEqual(len(self.raw) - 2, len(df))
+        self.assertNotIn(io.unix_path(self.raw[0]), df.raw.tolist())
+
+        index.update([], [])
+        df = metadata_index.MetadataIndex(self.path).get()
+        self.assertTrue(df.empty)
+        self.assertIn('game_id', df.columns)
+
+    def test_merge(self):
+        with metadata_index.RowWriter(batch_size=8) as writer:
+            for row in metadata_index.read_rows(self.raw):
+                writer.write(row)
+        self.assertEqual(len(self.raw), len(writer))
+        self.assertEqual(3, len(writer.frames()))
+        index = metadata_index.MetadataIndex(self.path)
+        index.merge(writer.frames(), self.raw)
+        df = metadata_index.MetadataIndex(self.path).get()
+        self.assertEqual(len(self.raw), len(df))
+        self.assertListEqual(sorted(df.raw), df.raw.tolist())
+
+        with self.assertRaises(RuntimeError):
+            with metadata_index.RowWriter(batch_size=2) as writer:
+                for row in metadata_index.read_rows(self.raw[:3]):
+                    writer.write(row)
+                raise RuntimeError
+        self.assertListEqual([], writer.frames())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import tempfile
+import unittest
+
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as pds
+
+from datasets18xx.io import columnar, local
+
+from tests import context
+
+
+class TestColumnar(unittest.TestCase):
+
+    def setUp(self) -> None:
+        record = context.mocked_database().joinpath('1830', '1830_179003')
+        self.csv = local.result_file(record.joinpath('1830_179003.txt'))
+        self.tmp = tempfile.TemporaryDirectory()
+        self.parquet = Path(self.tmp.name).joinpath('1830_179003.parquet')
+        self.num_rows = columnar.convert(self.csv, self.parquet)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_convert(self):
+        table = columnar.read_table(self.parquet)
+        self.assertEqual(table.num_rows, self.num_rows)
+        self.assertEqual(columnar.read_csv(self.csv).schema, table.schema)
+        for name in columnar.CATEGORICALS + ('player1_privates',):
+            field = table.schema.field(name)
+            self.assertTrue(pa.types.is_dictionary(field.type))
+
+    def test_read_table(self):
+        table = columnar.read_table(
+            self.parquet,
+            columns=['player1_cash', 'player6_cash', 'player7_cash'],
+            filters=pds.field('type') == 'Bid'
+        )
+        self.assertListEqual(['player1_cash', 'player6_cash'],
+                             table.column_names)
+        csv = columnar.read_table(
+            self.csv,
+            columns=['player1_cash', 'player6_cash', 'player7_cash'],
+            filters=pds.field('type') == 'Bid'
+        )
+        self.assertTrue(table.equals(csv))
+
+    def test_num_rows(self):
+        expected = columnar.read_csv(self.csv).num_rows
+        self.assertEqual(expected, columnar.num_rows(self.csv))
+        self.assertEqual(expected, columnar.num_rows(self.parquet))
+
+    def test_read_results(self):
+        files = {179003: self.parquet, 179004: self.csv}
+        df = columnar.read_results(files, columns=['player1_cash'])
+        self.assertListEqual(['game_id', 'player1_cash'], list(df.columns))
+        self.assertEqual({179003, 179004}, set(df.game_id))
+        self.assertFalse(df.empty)
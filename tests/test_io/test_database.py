@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import hashlib
+import io
+import json
+import tarfile
+import tempfile
+import threading
+import unittest
+
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+from datasets18xx.io import database
+
+from tests import context
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Serves files with an ETag and support of `Range: bytes=<start>-`
+    requests, conditional on `If-Range`."""
+
+    ranges = []
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        header = self.headers.get('Range')
+        self.ranges.append(header)
+        content = Path(self.translate_path(self.path)).read_bytes()
+        etag = '"' + hashlib.sha256(content).hexdigest() + '"'
+        if self.headers.get('If-Range', etag) != etag:
+            header = None
+        start = 0
+        if header is not None:
+            start = int(header.removeprefix('bytes=').split('-')[0])
+        if start >= len(content) > 0:
+            self.send_response(416)
+            self.end_headers()
+            return
+        self.send_response(200 if header is None else 206)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(content) - start))
+        self.end_headers()
+        self.wfile.write(content[start:])
+
+
+class TestDatabase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.root = Path(cls.tmp.name)
+        cls.archive = cls.root.joinpath('database.tar.gz')
+        record = context.mocked_database().joinpath('1830', '1830_179003')
+        with tarfile.open(cls.archive, 'w:gz') as tf:
+            tf.add(record, arcname='1830/1830_179003')
+        cls.sha256 = hashlib.sha256(cls.archive.read_bytes()).hexdigest()
+        handler = partial(RangeRequestHandler, directory=cls.tmp.name)
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/database.tar.gz'
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.tmp.cleanup()
+
+    def setUp(self) -> None:
+        self.out = tempfile.TemporaryDirectory()
+        self.out_dir = Path(self.out.name)
+
+    def tearDown(self) -> None:
+        self.out.cleanup()
+
+    def assertExtracted(self):
+        raw = self.out_dir.joinpath('1830', '1830_179003', '1830_179003.txt')
+        self.assertTrue(raw.exists())
+
+    def test_download(self):
+        file = self.out_dir.joinpath('database.tar.gz')
+        database.download(self.url, file, self.sha256)
+        self.assertEqual(self.archive.read_bytes(), file.read_bytes())
+        self.assertFalse(file.with_name(file.name + '.part').exists())
+
+        database.extract(file, self.out_dir)
+        self.assertExtracted()
+
+    def test_download_resume(self):
+        file = self.out_dir.joinpath('database.tar.gz')
+        part = file.with_name(file.name + '.part')
+        stored = part.with_name(part.name + '.validator')
+        etag = '"' + self.sha256 + '"'
+        part.write_bytes(self.archive.read_bytes()[:1000])
+        stored.write_text(etag)
+        database.download(self.url, file, self.sha256)
+        self.assertEqual(self.archive.read_bytes(), file.read_bytes())
+        self.assertEqual('bytes=1000-', RangeRequestHandler.ranges[-1])
+        self.assertFalse(stored.exists())
+
+        part.write_bytes(self.archive.read_bytes())
+        stored.write_text(etag)
+        database.download(self.url, file, self.sha256)
+        self.assertEqual(self.archive.read_bytes(), file.read_bytes())
+
+    def test_download_restart(self):
+        file = self.out_dir.joinpath('database.tar.gz')
+        part = file.with_name(file.name + '.part')
+        stored = part.with_name(part.name + '.validator')
+        part.write_bytes(b'0' * 1000)
+        database.download(self.url, file, self.sha256)
+        self.assertEqual(self.archive.read_bytes(), file.read_bytes())
+        self.assertIsNone(RangeRequestHandler.ranges[-1])
+
+        part.write_bytes(b'0' * 1000)
+        stored.write_text('"outdated"')
+        database.download(self.url, file, self.sha256)
+        self.assertEqual(self.archive.read_bytes(), file.read_bytes())
+        self.assertEqual('bytes=1000-', RangeRequestHandler.ranges[-1])
+        self.assertFalse(stored.exists())
+
+    def test_download_file_url(self):
+        file = self.out_dir.joinpath('database.tar.gz')
+        part = file.with_name(file.name + '.part')
+        part.write_bytes(self.archive.read_bytes()[:1000])
+        database.download(self.archive.as_uri(), file, self.sha256)
+        self.assertEqual(self.archive.read_bytes(), file.read_bytes())
+
+        stat = self.archive.stat()
+        part.write_bytes(self.archive.read_bytes()[:1000])
+        part.with_name(part.name + '.validator').write_text(
+            f'{stat.st_size}-{stat.st_mtime_ns}'
+        )
+        database.download(self.archive.as_uri(), file, self.sha256)
+        self.assertEqual(self.archive.read_bytes(), file.read_bytes())
+
+    def test_download_checksum(self):
+        file = self.out_dir.joinpath('database.tar.gz')
+        with self.assertRaises(IOError):
+            database.download(self.url, file, '0' * 64)
+        self.assertFalse(file.exists())
+        self.assertFalse(file.with_name(file.name + '.part').exists())
+
+    def test_stream_extract(self):
+        database.stream_extract(self.url, self.out_dir, self.sha256)
+        self.assertExtracted()
+        files = [p.name for p in self.out_dir.iterdir()]
+        self.assertListEqual(['1830'], files)
+
+        out = self.out_dir.joinpath('tampered')
+        with self.assertRaises(IOError):
+            database.stream_extract(self.archive.as_uri(), out, '0' * 64)
+        self.assertListEqual([], list(out.iterdir()))
+
+
+class TestDatabaseExtract(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.out = self.root.joinpath('out')
+        self.archive = self.root.joinpath('database.tar.gz')
+        db = context.mocked_database()
+        with tarfile.open(self.archive, 'w:gz') as tf:
+            tf.add(db.joinpath('1830', '1830_179003'), './1830/1830_179003')
+            tf.add(db.joinpath('1830', '1830_179005'), './1830/1830_179005')
+            tf.add(db.joinpath('1830', '1830_179003'), '1889/1889_179003')
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def extracted(self) -> list[str]:
+        return sorted(
+            f.relative_to(self.out).as_posix()
+            for f in self.out.rglob('*') if f.is_file()
+        )
+
+    def test_extract(self):
+        count = database.extract(self.archive, self.out, threads=2)
+        self.assertEqual(len(self.extracted()), count)
+        raw = '1830/1830_179003/1830_179003.txt'
+        self.assertEqual(
+            context.mocked_database().joinpath(raw).read_bytes(),
+            self.out.joinpath(raw).read_bytes()
+        )
+
+    def test_extract_games(self):
+        database.extract(self.archive, self.out, games={'1889'})
+        files = self.extracted()
+        self.assertGreater(len(files), 0)
+        self.assertTrue(all(f.startswith('1889/') for f in files))
+
+    def test_extract_game_ids(self):
+        database.extract(
+            self.archive, self.out, games={'1830'}, game_ids={179005}
+        )
+        files = self.extracted()
+        self.assertGreater(len(files), 0)
+        self.assertTrue(all(f.startswith('1830/1830_179005/') for f in files))
+
+    def test_extract_traversal(self):
+        info = tarfile.TarInfo('../evil.txt')
+        info.size = 4
+        with tarfile.open(self.archive, 'w:gz') as tf:
+            tf.addfile(info, io.BytesIO(b'evil'))
+        with self.assertRaises(IOError):
+            database.extract(self.archive, self.out)
+        self.assertFalse(self.root.joinpath('evil.txt').exists())
+
+
+class TestDatabaseUpdate(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.remote = root.joinpath('remote')
+        self.local = root.joinpath('local')
+        self.names = []
+        for game_id in [179003, 179005, 179051]:
+            name = f'1830/1830_{game_id}/1830_{game_id}.txt'
+            src = context.mocked_database().joinpath(name)
+            for db in [self.remote, self.local]:
+                db.joinpath(name).parent.mkdir(parents=True)
+                db.joinpath(name).write_bytes(src.read_bytes())
+            self.names.append(name)
+        self.remote.joinpath(self.names[1]).write_text('changed transcript')
+        self.local.joinpath(self.names[2]).unlink()
+
+        self.archive = root.joinpath('database.tar.gz')
+        with tarfile.open(self.archive, 'w:gz') as tf:
+            tf.add(self.remote.joinpath('1830'), arcname='1830')
+        manifest = {
+            'transcripts': {
+                n: hashlib.sha256(
+                    self.remote.joinpath(n).read_bytes()
+                ).hexdigest() for n in self.names
+            }
+        }
+        self.manifest = root.joinpath('manifest.json')
+        self.manifest.write_text(json.dumps(manifest))
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def assertUpdated(self, report: dict) -> None:
+        self.assertListEqual([self.names[2]], report['added'])
+        self.assertListEqual([self.names[1]], report['changed'])
+        self.assertListEqual([self.names[0]], report['unchanged'])
+        for name in self.names:
+            self.assertEqual(
+                self.remote.joinpath(name).read_bytes(),
+                self.local.joinpath(name).read_bytes()
+            )
+        report = database.diff(
+            database.read_manifest(self.manifest.as_uri()), self.local
+        )
+        self.assertListEqual(self.names, report['unchanged'])
+
+    def test_diff_cached(self):
+        manifest = database.read_manifest(self.manifest.as_uri())
+        with mock.patch.object(
+                database, 'file_hash', wraps=database.file_hash
+        ) as file_hash:
+            database.diff(manifest, self.local)
+            self.assertEqual(2, file_hash.call_count)
+            file_hash.reset_mock()
+            report = database.diff(manifest, self.local)
+            file_hash.assert_not_called()
+            self.assertListEqual([self.names[1]], report['changed'])
+
+            changed = self.local.joinpath(self.names[1])
+            changed.write_text('changed transcript')
+            report = database.diff(manifest, self.local)
+            file_hash.assert_called_once_with(changed)
+            self.assertListEqual(self.names[:2], report['unchanged'])
+
+    def test_update_files(self):
+        unchanged = self.local.joinpath(self.names[0]).stat().st_mtime_ns
+        report = database.update(
+            self.manifest.as_uri(), self.local,
+            files_url=self.remote.as_uri()
+        )
+        self.assertUpdated(report)
+        self.assertEqual(
+            unchanged, self.local.joinpath(self.names[0]).stat().st_mtime_ns
+        )
+
+    def test_update_archive(self):
+        unchanged = self.local.joinpath(self.names[0]).stat().st_mtime_ns
+        report = database.update(
+            self.manifest.as_uri(), self.local,
+            archive_url=self.archive.as_uri()
+        )
+        self.assertUpdated(report)
+        self.assertEqual(
+            unchanged, self.local.joinpath(self.names[0]).stat().st_mtime_ns
+        )
+
+    def test_update_traversal(self):
+        self.manifest.write_text(json.dumps(
+            {'transcripts': {'../evil.txt': '0' * 64}}
+        ))
+        with self.assertRaises(IOError):
+            database.update(
+                self.manifest.as_uri(), self.local,
+                files_url=self.remote.as_uri()
+            )
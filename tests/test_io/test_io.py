@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import enum
+import tempfile
+import unittest
+
+from dataclasses import dataclass, field
+from pathlib import Path, PureWindowsPath
+
+from datasets18xx.io import io, local
+
+from tests import context
+
+
+class Ending(str, enum.Enum):
+    BankBroke = 'BankBroke'
+
+
+@dataclass
+class Record:
+    raw: Path
+    game_id: int
+    game_ending: Ending
+    names: list[str]
+    parent: 'Path | None' = None
+    extra: dict = field(default_factory=dict)
+
+
+class TestBatchedIO(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_write_read_many(self):
+        files = [self.root.joinpath(f'{i}.json') for i in range(50)]
+        io.write_many((f, {'id': i}) for i, f in enumerate(files))
+        content = io.read_many(files, concurrency=4)
+        self.assertListEqual([{'id': i} for i in range(50)], content)
+        self.assertListEqual(
+            content, io.read_many(files, io.read_json, concurrency=1)
+        )
+
+        with self.assertRaises(FileNotFoundError):
+            io.read_many(files + [self.root.joinpath('missing.json')])
+        with self.assertRaises(ValueError):
+            io.read_many(files, concurrency=0)
+
+    def test_copy_many(self):
+        db = context.mocked_database().joinpath('1830')
+        raw = local.find_raw_transcripts(db)[:5]
+        io.copy_many(raw, self.root.joinpath('copy'))
+        io.copy_many(raw, self.root.joinpath('link'), link=True)
+        for file in raw:
+            for name in ('copy', 'link'):
+                record = self.root.joinpath(name, file.parent.name)
+                self.assertSetEqual(
+                    {f.name for f in file.parent.iterdir()},
+                    {f.name for f in record.iterdir()}
+                )
+
+
+class TestSerialize(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.record = Record(
+            raw=Path('1830', '1830_1', '1830_1.txt'),
+            game_id=1,
+            game_ending=Ending.BankBroke,
+            names=['a//b', 'c/'],
+            parent='1830//1830_1/',
+            extra={'file': PureWindowsPath('1830', '1830_1.txt')}
+        )
+
+    def test_path_fields(self):
+        self.assertSetEqual({'raw', 'parent'}, io.path_fields(Record))
+
+    def test_serialize_record(self):
+        row = io.serialize_record(self.record)
+        self.assertEqual('1830/1830_1/1830_1.txt', row['raw'])
+        self.assertEqual('1830/1830_1', row['parent'])
+        self.assertIs(self.record.names, row['names'])
+        self.assertEqual({'file': '1830/1830_1.txt'}, row['extra'])
+        self.assertIs(str, type(row['game_ending']))
+        old = io.serialize(vars(self.record))
+        self.assertEqual(old['game_ending'], row['game_ending'])
+        self.assertEqual(old['raw'], row['raw'])
+        self.assertEqual(['a/b', 'c'], old['names'])
+
+    def test_serialize_records(self):
+        other = Record(Path('1830_2.txt'), 2, Ending.BankBroke, [])
+        del other.extra
+        columns = io.serialize_records(iter([self.record, other]))
+        self.assertListEqual(
+            ['raw', 'game_id', 'game_ending', 'names', 'parent', 'extra'],
+            list(columns)
+        )
+        self.assertListEqual(
+            ['1830/1830_1/1830_1.txt', '1830_2.txt'], columns['raw']
+        )
+        self.assertListEqual([1, 2], columns['game_id'])
+        self.assertIsNone(columns['extra'][1])
+        self.assertDictEqual(
+            io.serialize_record(self.record),
+            {k: v[0] for k, v in columns.items()}
+        )
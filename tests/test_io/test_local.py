@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from datasets18xx.io import local
+
+
+class TestLocal(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_find_raw_transcripts(self):
+        for game_id in [2, 1]:
+            raw = local.raw_file(self.root, '1830', game_id)
+            raw.parent.mkdir()
+            raw.touch()
+        self.root.joinpath('1830_3').mkdir()
+        local.derived_path(self.root, 'tensors').mkdir(parents=True)
+        self.root.joinpath('aggregates').mkdir()
+        self.root.joinpath('aggregates', 'aggregates.txt').touch()
+        self.root.joinpath('context.parquet').touch()
+        self.assertListEqual(
+            [local.raw_file(self.root, '1830', i) for i in [1, 2]],
+            local.find_raw_transcripts(self.root)
+        )
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import tempfile
+import unittest
+
+from pathlib import Path
+
+import pyarrow.dataset as pds
+
+from datasets18xx.io import columnar, local, pack
+
+from tests import context
+
+
+class TestPack(unittest.TestCase):
+
+    def setUp(self) -> None:
+        db = context.mocked_database().joinpath('1830')
+        self.files = {}
+        for game_id in [179003, 179005, 179051]:
+            raw = db.joinpath(f'1830_{game_id}', f'1830_{game_id}.txt')
+            self.files[game_id] = local.result_file(raw)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.file = Path(self.tmp.name).joinpath('results.arrow')
+        pack.pack(self.files, self.file)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_index(self):
+        packed = pack.PackedResults(self.file)
+        self.assertListEqual(list(self.files), packed.game_ids())
+        self.assertIn(179005, packed)
+        self.assertNotIn(1, packed)
+
+    def test_table(self):
+        packed = pack.PackedResults(self.file)
+        for game_id, file in self.files.items():
+            table = packed.table(game_id)
+            expected = columnar.read_table(file)
+            self.assertEqual(expected.num_rows, table.num_rows)
+            self.assertListEqual(
+                expected.column('player1_cash').to_pylist(),
+                table.column('player1_cash').to_pylist()
+            )
+        with self.assertRaises(KeyError):
+            packed.table(1)
+
+    def test_read(self):
+        packed = pack.PackedResults(self.file)
+        df = packed.read(
+            game_ids=[179005, 1],
+            columns=['player1_cash', 'player7_cash'],
+            filters=pds.field('type') == 'Bid'
+        )
+        self.assertListEqual(['game_id', 'player1_cash'], list(df.columns))
+        self.assertEqual({179005}, set(df.game_id))
+        self.assertEqual(
+            packed.table(179005).num_columns, len(packed.read().columns)
+        )
+
+    def test_result(self):
+        db = context.mocked_database().joinpath('1830')
+        raw = db.joinpath('1830_179358', '1830_179358.txt')
+        parquet = Path(self.tmp.name).joinpath('1830_179003_final.parquet')
+        columnar.convert(self.files[179003], parquet)
+        files = {179003: parquet, 179358: local.result_file(raw)}
+        pack.pack(files, self.file)
+        packed = pack.PackedResults(self.file)
+        for game_id, file in files.items():
+            expected = columnar.read_table(file)
+            table = packed.result(game_id)
+            self.assertListEqual(expected.column_names, table.column_names)
+            self.assertEqual(expected.num_rows, table.num_rows)
+        self.assertNotIn('player3_cash', packed.result(179358).column_names)
+        table = packed.result(179358, ['player1_cash', 'player3_cash'])
+        self.assertListEqual(['player1_cash'], table.column_names)
+        self.assertListEqual([], list(Path(self.tmp.name).glob('tmp*')))
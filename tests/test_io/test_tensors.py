@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import tempfile
+import unittest
+
+from pathlib import Path
+
+import numpy as np
+
+from datasets18xx.io import columnar, local, tensors
+
+from tests import context
+
+
+class TestTensors(unittest.TestCase):
+
+    def setUp(self) -> None:
+        db = context.mocked_database().joinpath('1830')
+        self.files = {}
+        for game_id in [179003, 179005, 179358]:
+            raw = db.joinpath(f'1830_{game_id}', f'1830_{game_id}.txt')
+            self.files[game_id] = local.result_file(raw)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name).joinpath('tensors')
+        self.schema = tensors.export(self.files, self.path)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_schema(self):
+        self.assertEqual(6, self.schema['players'])
+        self.assertIn('PRR', self.schema['companies'])
+        self.assertIn('Camden & Amboy', self.schema['privates'])
+        self.assertIn('shares_PRR', self.schema['player_features'])
+        self.assertIn(
+            'private_Camden & Amboy', self.schema['company_features']
+        )
+        self.assertIn('GameOver', self.schema['vocab']['type'])
+
+    def test_index(self):
+        bundle = tensors.TensorBundle(self.path)
+        self.assertListEqual(list(self.files), bundle.game_ids())
+        self.assertIn(179005, bundle)
+        self.assertNotIn(1, bundle)
+        rows = [columnar.read_table(f).num_rows for f in self.files.values()]
+        self.assertListEqual(rows, bundle.index[:, 2].tolist())
+        self.assertListEqual([0, rows[0], rows[0] + rows[1]],
+                             bundle.index[:, 1].tolist())
+        self.assertListEqual([6, 4, 2], bundle.index[:, 3].tolist())
+        self.assertEqual((sum(rows), 6, len(self.schema['player_features'])),
+                         bundle.players.shape)
+        self.assertIsInstance(bundle.players, np.memmap)
+
+    def test_game(self):
+        bundle = tensors.TensorBundle(self.path)
+        df = columnar.read_table(self.files[179003]).to_pandas()
+        game = bundle.game(179003)
+        features = self.schema['player_features']
+        np.testing.assert_array_equal(
+            df.player1_cash.to_numpy(np.float32),
+            game['players'][:, 0, features.index('cash')]
+        )
+        self.assertEqual(
+            df.player3_privates.astype(str).str.contains('Camden').sum(),
+            game['players'][:, 2, features.index('private_Camden & Amboy')]
+            .sum()
+        )
+        company = self.schema['companies'].index('PRR')
+        president = self.schema['company_features'].index('president')
+        self.assertEqual(4., game['companies'][-1, company, president])
+        vocab = self.schema['vocab']['type']
+        self.assertEqual('GameOver', vocab[game['actions'][-1, 0]])
+
+        game = bundle.game(179358)
+        self.assertFalse(game['players'][:, 2:].any())
+        with self.assertRaises(KeyError):
+            bundle.game(1)
+
+
+if __name__ == '__main__':
+    unittest.main()
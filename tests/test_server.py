@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import threading
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from datasets18xx import client, server
+from datasets18xx.core.config import DefaultDatasetConfig, GameEnding
+
+from tests import context
+
+
+class TestServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        context.mocked_dataset().make()
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.socket = Path(cls.tmp.name).joinpath('dsx.sock')
+        service = server.DatasetService(context.mocked_database())
+        cls.servers = [
+            server.create_server(service, port=0),
+            server.create_server(service, socket_path=cls.socket)
+        ]
+        for srv in cls.servers:
+            threading.Thread(target=srv.serve_forever, daemon=True).start()
+        port = cls.servers[0].server_address[1]
+        cls.url = f'http://127.0.0.1:{port}'
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        for srv in cls.servers:
+            srv.shutdown()
+            srv.server_close()
+        cls.tmp.cleanup()
+
+    def setUp(self) -> None:
+        self.client = client.Client(self.url)
+
+    def tearDown(self) -> None:
+        self.client.close()
+
+    def test_load(self):
+        res = self.client.load(179003, rows=3)
+        self.assertEqual(179003, res['context']['game_id'])
+        self.assertEqual(3, len(res['result']['data']))
+        self.assertEqual(
+            len(res['result']['columns']), len(res['result']['data'][0])
+        )
+        # The connection is kept alive between requests.
+        conn = self.client._conn
+        self.client.load(179005)
+        self.assertIs(conn, self.client._conn)
+
+    def test_load_unix_socket(self):
+        with client.Client(f'unix://{self.socket}') as c:
+            res = c.load(179003, 'G1830')
+        self.assertEqual(179003, res['context']['game_id'])
+
+    def test_load_invalid(self):
+        with self.assertRaises(ValueError):
+            self.client.load(179295)
+        with self.assertRaises(ValueError):
+            self.client.load(179003, game='G0000')
+        with self.assertRaises(ValueError):
+            self.client.request('unknown')
+
+    def test_snapshot(self):
+        snapshot = self.client.snapshot(debug=False)
+        self.assertEqual(20, snapshot['size'])
+        self.assertEqual(14, snapshot['valid'])
+        self.assertNotIn('debug', snapshot)
+
+    def test_filter(self):
+        game_ids = self.client.filter(
+            num_players=[4], game_ending=[GameEnding.BankBroke]
+        )
+        self.assertEqual(3, len(game_ids))
+        self.assertIn(179003, self.client.filter(num_players=[6]))
+
+    def test_datasets(self):
+        self.client.snapshot()
+        roots = self.client.datasets()
+        self.assertTrue(any(r.endswith('1830') for r in roots))
+
+    def test_reload(self):
+        service = server.DatasetService(context.mocked_database())
+        game, conf = context.mocked_dataset().game, DefaultDatasetConfig()
+        ds = service.dataset(game, conf)
+        self.assertIs(ds, service.dataset(game, conf))
+        file = ds.root.joinpath('context.parquet')
+        mtime = file.stat().st_mtime_ns
+        os.utime(file, ns=(mtime, mtime + 1000000))
+        try:
+            reloaded = service.dataset(game, conf)
+            self.assertIsNot(ds, reloaded)
+            self.assertIs(reloaded, service.dataset(game, conf))
+            self.assertEqual(1, len(service.datasets({})['datasets']))
+        finally:
+            os.utime(file, ns=(mtime, mtime))
+
+    def test_concurrent_load(self):
+        service = server.DatasetService(context.mocked_database())
+        params = {'game_id': ['179003'], 'rows': ['1']}
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(
+                lambda _: service.load(params)['context']['game_id'],
+                range(20)
+            ))
+        self.assertListEqual([179003] * 20, results)
+
+        game, conf = context.mocked_dataset().game, DefaultDatasetConfig()
+        with service.using(game, conf):
+            future = ThreadPoolExecutor(1).submit(service.load, params)
+            with self.assertRaises(TimeoutError):
+                future.result(timeout=.2)
+        self.assertEqual(179003, future.result()['context']['game_id'])
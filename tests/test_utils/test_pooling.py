@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+from unittest import mock
+
+from datasets18xx.utils import pooling
+
+
+def square(x: int) -> int:
+    return x * x
+
+
+def pid(_) -> int:
+    return os.getpid()
+
+
+class TestPoolRunner(unittest.TestCase):
+
+    def test_default_processes(self):
+        with mock.patch.object(pooling.mp, 'cpu_count', return_value=1):
+            self.assertEqual(1, pooling.default_processes())
+        with mock.patch.object(pooling.mp, 'cpu_count', return_value=8):
+            self.assertEqual(7, pooling.default_processes())
+
+    def test_chunksize(self):
+        runner = pooling.PoolRunner(square, processes=2)
+        self.assertEqual(1, runner._chunksize(None))
+        self.assertEqual(1, runner._chunksize(3))
+        self.assertEqual(13, runner._chunksize(100))
+        runner = pooling.PoolRunner(square, processes=2, chunksize=5)
+        self.assertEqual(5, runner._chunksize(100))
+
+    def test_run(self):
+        items = list(range(50))
+        runner = pooling.PoolRunner(square, items, processes=2, progress=False)
+        self.assertListEqual([x * x for x in items], runner.run())
+
+    def test_run_unordered(self):
+        items = list(range(50))
+        runner = pooling.PoolRunner(
+            square, items, processes=2, ordered=False, progress=False
+        )
+        self.assertListEqual([x * x for x in items], sorted(runner.run()))
+
+    def test_iterate(self):
+        runner = pooling.PoolRunner(square, processes=2, progress=False)
+        results = runner.iterate(iter(range(5)))
+        self.assertEqual(0, next(results))
+        self.assertListEqual([1, 4, 9, 16], list(results))
+
+    def test_reuse(self):
+        with pooling.PoolRunner(pid, processes=1, progress=False) as runner:
+            first = runner.run(range(3))
+            second = runner.run(range(3))
+        self.assertEqual(1, len(set(first + second)))
+        self.assertIsNone(runner._pool)
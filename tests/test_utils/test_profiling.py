@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from datasets18xx.utils import pooling, profiling
+
+
+def square(x: int) -> int:
+    with profiling.stage('square'):
+        profiling.count('squared')
+        return x * x
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_disabled(self):
+        self.assertIsNone(profiling.active())
+        with profiling.stage('noop'):
+            profiling.count('noop')
+        self.assertIsNone(profiling.active())
+
+    def test_profile(self):
+        with profiling.profile() as profiler:
+            self.assertIs(profiler, profiling.active())
+            with profiling.stage('outer'):
+                profiling.count('items', 3)
+            with profiling.stage('outer'):
+                profiling.count('items', 2)
+        self.assertIsNone(profiling.active())
+        report = profiler.report()
+        self.assertEqual(2, report['stages']['outer']['calls'])
+        self.assertEqual(5, report['counters']['items'])
+        self.assertDictEqual({}, report['workers'])
+
+    def test_profile_workers(self):
+        items = list(range(20))
+        with profiling.profile() as profiler:
+            runner = pooling.PoolRunner(square, processes=2, progress=False)
+            self.assertListEqual([x * x for x in items], runner.run(items))
+        report = profiler.report()
+        self.assertEqual(20, report['stages']['square']['calls'])
+        self.assertEqual(20, report['counters']['squared'])
+        self.assertIn('pool_start', report['stages'])
+        self.assertEqual(
+            20, sum(w['tasks'] for w in report['workers'].values())
+        )
+        for worker in report['workers'].values():
+            self.assertGreaterEqual(worker['idle_seconds'], 0)
+
+    def test_profile_cprofile(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp)
+            with profiling.profile(out):
+                runner = pooling.PoolRunner(square, processes=2, progress=False)
+                runner.run(list(range(10)))
+            self.assertTrue(out.joinpath('main.prof').exists())
+            self.assertEqual(2, len(list(out.glob('worker-*.prof'))))